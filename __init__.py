@@ -1,5 +1,5 @@
 import bpy
-from . import panels, operators
+from . import agents, analysis, panels, operators, thumbnails, utilities
 
 bl_info = {
     "name" : "Citography Camera Navigation",
@@ -14,12 +14,20 @@ bl_info = {
 }
     
 def register():
+    utilities.register()
     panels.register()
     operators.register()
+    thumbnails.register()
+    agents.register()
+    analysis.register()
 
 def unregister():
+    analysis.unregister()
+    agents.unregister()
+    thumbnails.unregister()
     panels.unregister()
     operators.unregister()
+    utilities.unregister()
     
 if __name__ == "__main__":
     register()
\ No newline at end of file
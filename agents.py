@@ -0,0 +1,291 @@
+import math
+import os
+import tempfile
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from . import curves, profiling
+from .utilities import cito_index, cito_unique_name, tag_cito
+
+# Crowds of pedestrians or vehicles moving along Cito paths and user curves. All paths are resampled
+# once into one flat point array, every agent is a row in a few NumPy arrays, and the whole crowd
+# steps at once (speed, spacing to the agent ahead, stops). The simulated frames are stored as one
+# memory-mapped .npy of (frames, agents, 4) = x, y, z, heading. Playback writes one frame into the
+# vertices of a single point mesh, which a geometry-nodes modifier instances a proxy object onto.
+
+HEADING_ATTRIBUTE = "cito_heading"
+AGENT_GROUP_NAME = "Cito_Agent_Instances"
+AGENTS_FILE_PROP = "cito_agents_file"
+AGENTS_START_PROP = "cito_agents_frame_start"
+
+class PathNetwork:
+    # Every path resampled at (about) spacing scene units, stacked into one array.
+    #   points:  (total, 3) float32 world positions
+    #   offsets: (paths + 1,) start row of each path
+    #   lengths / steps / cyclic: per path
+    # An agent's position is then one gather and one lerp, whatever path it is on.
+
+    def __init__(self, curve_objects, spacing=0.5):
+        points, offsets, lengths, steps, cyclic = [], [0], [], [], []
+        self.names = []
+        for obj in curve_objects:
+            table = curves.arc_length_table(obj)
+            if table is None or table.total_length <= 0.0:
+                continue
+            matrix = np.array(obj.matrix_world)
+            world = table.points @ matrix[:3, :3].T + matrix[:3, 3]
+            world_lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(world, axis=0), axis=1))])
+            length = float(world_lengths[-1])
+            count = max(2, math.ceil(length / spacing) + 1)
+            distances = np.linspace(0.0, length, count)
+            points.append(np.stack([np.interp(distances, world_lengths, world[:, axis]) for axis in range(3)], axis=1))
+            offsets.append(offsets[-1] + count)
+            lengths.append(length)
+            steps.append(length / (count - 1))
+            cyclic.append(table.cyclic)
+            self.names.append(obj.name)
+        if not points:
+            raise RuntimeError("No usable paths: select curves or create Cito paths first")
+        self.points = np.concatenate(points).astype(np.float32)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.steps = np.array(steps, dtype=np.float64)
+        self.cyclic = np.array(cyclic, dtype=bool)
+
+    def sample(self, path, distance):
+        # (n, 3) positions and (n,) headings (radians around Z) of agents at distance along path
+        t = distance / self.steps[path]
+        segment = np.clip(t.astype(np.int64), 0, self.offsets[path + 1] - self.offsets[path] - 2)
+        row = self.offsets[path] + segment
+        start = self.points[row]
+        delta = self.points[row + 1] - start
+        positions = start + delta * (t - segment)[:, None].astype(np.float32)
+        return positions, np.arctan2(delta[:, 1], delta[:, 0])
+
+class AgentSimulation:
+    # One row per agent. Speeds in scene units per second, rates per second.
+
+    def __init__(self, network, count, speed=1.4, speed_spread=0.3, min_gap=1.0, acceleration=1.0,
+                 stop_rate=0.0, stop_seconds=5.0, seed=0):
+        self.network = network
+        self.rng = np.random.default_rng(seed)
+        self.min_gap = min_gap
+        self.acceleration = acceleration
+        self.stop_rate = stop_rate
+        self.stop_seconds = stop_seconds
+        # Longer paths get proportionally more agents
+        self.path = self.rng.choice(len(network.lengths), size=count, p=network.lengths / network.lengths.sum())
+        self.distance = self.rng.uniform(0.0, network.lengths[self.path])
+        self.desired = np.maximum(self.rng.normal(speed, speed * speed_spread, count), 0.1 * speed)
+        self.speed = self.desired.copy()
+        self.stop_left = np.zeros(count, dtype=np.float64)
+
+    def gaps(self):
+        # Free distance to the next agent ahead on the same path; around the loop on cyclic paths
+        order = np.lexsort((self.distance, self.path))
+        path = self.path[order]
+        distance = self.distance[order]
+        first = np.empty(len(order), dtype=bool)
+        first[0] = True
+        first[1:] = path[1:] != path[:-1]
+        last = np.empty(len(order), dtype=bool)
+        last[:-1] = first[1:]
+        last[-1] = True
+
+        gap = np.full(len(order), np.inf)
+        gap[:-1] = distance[1:] - distance[:-1]
+        group_first = np.flatnonzero(first)[np.cumsum(first) - 1]
+        wrap = last & self.network.cyclic[path]
+        gap[last] = np.inf
+        gap[wrap] = distance[group_first[wrap]] + self.network.lengths[path[wrap]] - distance[wrap]
+        gaps = np.empty_like(gap)
+        gaps[order] = gap
+        return gaps
+
+    def step(self, dt):
+        count = len(self.path)
+        if self.stop_rate > 0.0:
+            starting = (self.stop_left <= 0.0) & (self.rng.random(count) < self.stop_rate * dt)
+            self.stop_left[starting] = self.rng.exponential(self.stop_seconds, int(starting.sum()))
+        self.stop_left = np.maximum(self.stop_left - dt, 0.0)
+
+        allowed = np.maximum(self.gaps() - self.min_gap, 0.0) / dt
+        target = np.minimum(np.where(self.stop_left > 0.0, 0.0, self.desired), allowed)
+        change = self.acceleration * dt
+        self.speed = np.minimum(self.speed + np.clip(target - self.speed, -change, change), allowed)
+        self.distance += self.speed * dt
+        lengths = self.network.lengths[self.path]
+        cyclic = self.network.cyclic[self.path]
+        self.distance[cyclic] = np.mod(self.distance[cyclic], lengths[cyclic])
+        self.respawn(lengths)
+
+    def respawn(self, lengths):
+        # Agents at the end of an open path wait there until its start is free (no agent within
+        # min_gap), then re-enter at distance 0; one per path and step, so they never stack up
+        arrived = ~self.network.cyclic[self.path] & (self.distance >= lengths)
+        if not arrived.any():
+            return
+        self.distance[arrived] = lengths[arrived]
+        entry = np.full(len(self.network.lengths), np.inf)
+        np.minimum.at(entry, self.path[~arrived], self.distance[~arrived])
+        waiting = np.flatnonzero(arrived)
+        paths, first = np.unique(self.path[waiting], return_index=True)
+        entering = waiting[first][entry[paths] >= self.min_gap]
+        self.distance[entering] = 0.0
+
+    def state(self):
+        positions, heading = self.network.sample(self.path, self.distance)
+        return np.concatenate([positions, heading[:, None].astype(np.float32)], axis=1)
+
+def simulate(simulation, frame_count, fps, filepath, substeps=1):
+    # Streams frame_count frames into a (frames, agents, 4) float32 .npy and returns it memory-mapped
+    frames = np.lib.format.open_memmap(filepath, mode="w+", dtype=np.float32, shape=(frame_count, len(simulation.path), 4))
+    dt = 1.0 / (fps * substeps)
+    for frame in range(frame_count):
+        frames[frame] = simulation.state()
+        for i in range(substeps):
+            simulation.step(dt)
+    frames.flush()
+    del frames
+    return np.load(filepath, mmap_mode="r")
+
+def agents_cache_path(name):
+    directory = bpy.path.abspath("//cito_cache") if bpy.data.filepath else os.path.join(tempfile.gettempdir(), "cito_cache")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{bpy.path.clean_name(name)}.npy")
+
+def _group_socket(group, in_out, name):
+    if hasattr(group, "interface"):
+        # Blender 4.0+
+        group.interface.new_socket(name, in_out=in_out, socket_type='NodeSocketGeometry')
+    else:
+        (group.inputs if in_out == 'INPUT' else group.outputs).new('NodeSocketGeometry', name)
+
+def agent_instance_group():
+    # Instance on Points over the agent vertices, turned by the heading attribute
+    group = bpy.data.node_groups.get(AGENT_GROUP_NAME)
+    if group is not None:
+        return group
+    group = bpy.data.node_groups.new(AGENT_GROUP_NAME, 'GeometryNodeTree')
+    _group_socket(group, 'INPUT', "Geometry")
+    _group_socket(group, 'OUTPUT', "Geometry")
+    nodes, links = group.nodes, group.links
+    group_input = nodes.new('NodeGroupInput')
+    group_output = nodes.new('NodeGroupOutput')
+    instance = nodes.new('GeometryNodeInstanceOnPoints')
+    info = nodes.new('GeometryNodeObjectInfo')
+    heading = nodes.new('GeometryNodeInputNamedAttribute')
+    heading.data_type = 'FLOAT_VECTOR'
+    heading.inputs["Name"].default_value = HEADING_ATTRIBUTE
+    group_input.location, info.location, heading.location = (-400, 0), (-400, -150), (-400, -350)
+    group_output.location = (250, 0)
+    links.new(group_input.outputs[0], instance.inputs["Points"])
+    links.new(info.outputs["Geometry"], instance.inputs["Instance"])
+    links.new(next(socket for socket in heading.outputs if socket.enabled), instance.inputs["Rotation"])
+    links.new(instance.outputs["Instances"], group_output.inputs[0])
+    return group
+
+def agent_proxy(name="Cito_Agent_Proxy", size=0.5):
+    # A small arrow-like wedge pointing along +X, hidden; the geometry nodes instance it per agent
+    obj = bpy.data.objects.get(name)
+    if obj is not None:
+        return obj
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(
+        [(size, 0, 0), (-size, size * 0.5, 0), (-size, -size * 0.5, 0), (-size, 0, size * 2)], [],
+        [(0, 1, 2), (0, 3, 1), (0, 2, 3), (1, 3, 2)],
+    )
+    obj = bpy.data.objects.new(name, mesh)
+    obj.hide_viewport = obj.hide_render = True
+    return obj
+
+def create_agents_object(scene, frames, frame_start, filepath, name=None, proxy=None):
+    name = name or cito_unique_name("Cito_Agents")
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(frames.shape[1])
+    mesh.attributes.new(HEADING_ATTRIBUTE, 'FLOAT_VECTOR', 'POINT')
+    obj = bpy.data.objects.new(name, mesh)
+    scene.collection.objects.link(obj)
+    tag_cito(obj, 'OVERLAY')
+    obj[AGENTS_FILE_PROP] = bpy.path.relpath(filepath) if bpy.data.filepath else filepath
+    obj[AGENTS_START_PROP] = frame_start
+
+    proxy = proxy or agent_proxy()
+    if proxy.name not in scene.objects:
+        scene.collection.objects.link(proxy)
+    group = agent_instance_group()
+    modifier = obj.modifiers.new("Cito Agents", 'NODES')
+    modifier.node_group = group
+    for node in group.nodes:
+        if node.bl_idname == 'GeometryNodeObjectInfo':
+            node.inputs["Object"].default_value = proxy
+    _playbacks[obj.name] = AgentPlayback(frames, frame_start)
+    _playbacks[obj.name].apply(obj, scene.frame_current)
+    return obj
+
+class AgentPlayback:
+    # Writes one simulated frame into the agent mesh: two foreach_set calls, whatever the agent count
+
+    def __init__(self, frames, frame_start):
+        self.frames = frames
+        self.frame_start = frame_start
+        self.rotations = np.zeros((frames.shape[1], 3), dtype=np.float32)
+
+    def apply(self, obj, frame):
+        index = min(max(frame - self.frame_start, 0), len(self.frames) - 1)
+        state = self.frames[index]
+        mesh = obj.data
+        mesh.vertices.foreach_set("co", np.ascontiguousarray(state[:, :3]).ravel())
+        self.rotations[:, 2] = state[:, 3]
+        mesh.attributes[HEADING_ATTRIBUTE].data.foreach_set("vector", self.rotations.ravel())
+        mesh.update()
+
+_playbacks = {}
+
+def agent_playback(obj):
+    # Cached per object; reloaded (memory-mapped) from the stored file after a file load
+    playback = _playbacks.get(obj.name)
+    if playback is None:
+        filepath = bpy.path.abspath(obj.get(AGENTS_FILE_PROP, ""))
+        if not os.path.exists(filepath):
+            return None
+        frames = np.load(filepath, mmap_mode="r")
+        if frames.ndim != 3 or frames.shape[1] != len(obj.data.vertices):
+            return None
+        playback = _playbacks[obj.name] = AgentPlayback(frames, obj.get(AGENTS_START_PROP, 1))
+    return playback
+
+def agent_objects(scene):
+    return [obj for obj in cito_index.items('OVERLAY') if AGENTS_FILE_PROP in obj and obj.name in scene.objects]
+
+# Before the new frame is evaluated, so viewport, F12 renders and the pipelined renderer all see this
+# frame's agents; a post handler would leave them one frame behind
+@persistent
+@profiling.traced("handler")
+def _on_frame_change_pre(scene, *args):
+    for obj in agent_objects(scene):
+        playback = agent_playback(obj)
+        if playback is not None:
+            playback.apply(obj, scene.frame_current)
+
+@persistent
+def _on_load_post(*args):
+    _playbacks.clear()
+
+_handlers = (
+    ("frame_change_pre", _on_frame_change_pre),
+    ("load_post", _on_load_post),
+)
+
+def register():
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    _playbacks.clear()
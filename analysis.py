@@ -0,0 +1,630 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+from functools import partial
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from mathutils import Matrix
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
+from . import curves, workers
+from .utilities import cito_index, cito_role, cito_unique_name, sample_world_matrices, tag_cito
+
+# Static scene geometry is flattened into world-space triangle arrays once, and the BVH built from
+# them is cached (in memory, and as .npz for worker processes) under a key of the mesh objects'
+# names, transforms, mesh datablocks, sizes and modifiers. Edits that keep all of those (moving
+# vertices, changing a modifier setting) show up as geometry updates in depsgraph_update_post, which
+# drop the cache. Analyses then only pay for ray casts / nearest-point queries.
+
+class SceneGeometry:
+    #   vertices:     (V, 3) float32 world-space positions
+    #   triangles:    (T, 3) int32 vertex indices
+    #   tri_object:   (T,)   index into object_names of the object each triangle belongs to
+    #   tri_polygon:  (T,)   polygon index inside that object's evaluated mesh
+    def __init__(self, vertices, triangles, tri_object, tri_polygon, object_names):
+        self.vertices = vertices
+        self.triangles = triangles
+        self.tri_object = tri_object
+        self.tri_polygon = tri_polygon
+        self.object_names = list(object_names)
+
+    def save(self, filepath):
+        np.savez(filepath, vertices=self.vertices, triangles=self.triangles, tri_object=self.tri_object,
+                 tri_polygon=self.tri_polygon, object_names=np.array(self.object_names))
+
+    @classmethod
+    def load(cls, filepath):
+        data = np.load(filepath)
+        return cls(data["vertices"], data["triangles"], data["tri_object"], data["tri_polygon"], data["object_names"].tolist())
+
+    def build_bvh(self):
+        return BVHTree.FromPolygons(self.vertices.tolist(), self.triangles.tolist(), all_triangles=True)
+
+def static_mesh_objects(scene, view_layer=None):
+    # Visible mesh geometry of the scene, without the add-on's own rig objects
+    view_layer = view_layer or scene.view_layers[0]
+    return [obj for obj in scene.objects
+            if obj.type == 'MESH' and obj.visible_get(view_layer=view_layer) and cito_role(obj) is None]
+
+def geometry_key(objects):
+    # Digest of per-object state that is cheap to read: no mesh evaluation, no vertex data
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        mesh = obj.data
+        digest.update(repr((obj.name, mesh.as_pointer(), len(mesh.vertices), len(mesh.polygons),
+                            [(modifier.name, modifier.type, modifier.show_viewport) for modifier in obj.modifiers])).encode())
+        digest.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+def collect_geometry(objects, depsgraph):
+    vertices, triangles, tri_object, tri_polygon = [], [], [], []
+    offset = 0
+    for index, obj in enumerate(objects):
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+        try:
+            mesh.calc_loop_triangles()
+            co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", co)
+            tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", tris)
+            polygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+            mesh.loop_triangles.foreach_get("polygon_index", polygons)
+        finally:
+            obj_eval.to_mesh_clear()
+
+        matrix = np.array(obj_eval.matrix_world, dtype=np.float32)
+        co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+        vertices.append(co)
+        triangles.append(tris.reshape(-1, 3) + offset)
+        tri_object.append(np.full(len(polygons), index, dtype=np.int32))
+        tri_polygon.append(polygons)
+        offset += len(co)
+
+    if not vertices:
+        return SceneGeometry(np.zeros((0, 3), np.float32), np.zeros((0, 3), np.int32),
+                             np.zeros(0, np.int32), np.zeros(0, np.int32), [])
+    return SceneGeometry(np.concatenate(vertices), np.concatenate(triangles), np.concatenate(tri_object),
+                         np.concatenate(tri_polygon), [obj.name for obj in objects])
+
+_bvh_cache = {}
+
+def geometry_cache_path(key):
+    return os.path.join(tempfile.gettempdir(), f"cito_geometry_{key}.npz")
+
+def scene_bvh(scene, depsgraph, view_layer=None):
+    # (bvh, geometry, cache_path); the geometry is only collected and the tree only built when the
+    # key changed or a geometry update dropped the cache
+    objects = static_mesh_objects(scene, view_layer)
+    key = geometry_key(objects)
+    if _bvh_cache.get("key") != key:
+        geometry = collect_geometry(objects, depsgraph)
+        # Written every time, since a dropped cache can come back to the same key with other geometry
+        cache_path = geometry_cache_path(key)
+        geometry.save(cache_path)
+        _bvh_cache.clear()
+        _bvh_cache.update({"key": key, "bvh": geometry.build_bvh(), "geometry": geometry, "path": cache_path})
+    return _bvh_cache["bvh"], _bvh_cache["geometry"], _bvh_cache["path"]
+
+def clear_bvh_cache():
+    _bvh_cache.clear()
+
+@persistent
+def _on_depsgraph_update_post(scene, depsgraph):
+    if "key" not in _bvh_cache:
+        return
+    for update in depsgraph.updates:
+        id_data = getattr(update.id, "original", update.id)
+        # The add-on's own meshes (agents, proxies) are not part of the static geometry
+        if (update.is_updated_geometry and isinstance(id_data, bpy.types.Object) and id_data.type == 'MESH'
+                and cito_role(id_data) is None):
+            _bvh_cache.clear()
+            return
+
+@persistent
+def _on_load_post(*args):
+    _bvh_cache.clear()
+
+_handlers = (
+    ("depsgraph_update_post", _on_depsgraph_update_post),
+    ("load_post", _on_load_post),
+)
+
+def register():
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    _bvh_cache.clear()
+
+def normalized_poses(matrices):
+    # Camera views ignore object scale (our cameras are scaled x100 for visibility in the viewport)
+    poses = np.array(matrices, dtype=np.float64)
+    poses[:, :3, :3] /= np.linalg.norm(poses[:, :3, :3], axis=1, keepdims=True)
+    return poses
+
+def camera_ray_fan(camera, scene, rays_x, rays_y):
+    # Ray origins and directions in camera space covering the camera frame on a rays_x x rays_y grid
+    corners = np.array([tuple(corner) for corner in camera.data.view_frame(scene=scene)])
+    xs = np.linspace(corners[:, 0].min(), corners[:, 0].max(), rays_x)
+    ys = np.linspace(corners[:, 1].min(), corners[:, 1].max(), rays_y)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    points = np.stack((grid_x.ravel(), grid_y.ravel(), np.full(grid_x.size, corners[0, 2])), axis=1)
+    if camera.data.type == 'ORTHO':
+        origins = points * np.array([1.0, 1.0, 0.0])
+        directions = np.tile((0.0, 0.0, -1.0), (len(points), 1))
+    else:
+        origins = np.zeros_like(points)
+        directions = points / np.linalg.norm(points, axis=1, keepdims=True)
+    return origins, directions
+
+def cast_frames(bvh, tri_object, object_count, poses, origins, directions, distance, on_frame=None):
+    # counts[f, o]: rays of frame f that hit object o first; tri_hits[t]: rays that hit triangle t
+    counts = np.zeros((len(poses), object_count), dtype=np.uint32)
+    tri_hits = np.zeros(len(tri_object), dtype=np.uint32)
+    ray_cast = bvh.ray_cast
+    for frame_index, pose in enumerate(poses):
+        rotation = pose[:3, :3]
+        world_origins = (origins @ rotation.T + pose[:3, 3]).tolist()
+        world_directions = (directions @ rotation.T).tolist()
+        hits = []
+        for origin, direction in zip(world_origins, world_directions):
+            index = ray_cast(origin, direction, distance)[2]
+            if index is not None:
+                hits.append(index)
+        if hits:
+            hits = np.array(hits, dtype=np.int64)
+            np.add.at(tri_hits, hits, 1)
+            counts[frame_index] = np.bincount(tri_object[hits], minlength=object_count)
+        if on_frame is not None:
+            on_frame(frame_index)
+    return counts, tri_hits
+
+class VisibilityResult:
+
+    def __init__(self, frames, object_names, counts, tri_hits, rays_per_frame, fps, geometry=None):
+        self.frames = np.asarray(frames)
+        self.object_names = list(object_names)
+        self.counts = counts
+        self.tri_hits = tri_hits
+        self.rays_per_frame = rays_per_frame
+        self.fps = fps
+        # The SceneGeometry the rays were cast against, for the heat overlay
+        self.geometry = geometry
+
+    def seconds_visible(self, frame_step=1):
+        return (self.counts > 0).sum(axis=0) * frame_step / self.fps
+
+    def top_objects(self, count=5, frame_step=1):
+        seconds = self.seconds_visible(frame_step)
+        order = np.argsort(seconds)[::-1][:count]
+        return [(self.object_names[index], float(seconds[index])) for index in order if seconds[index] > 0]
+
+    def export(self, filepath, frame_step=1):
+        np.savez_compressed(filepath, frames=self.frames, object_names=np.array(self.object_names),
+                            counts=self.counts, seconds_visible=self.seconds_visible(frame_step),
+                            rays_per_frame=self.rays_per_frame, fps=self.fps)
+        return filepath
+
+def analyse_visibility(context, camera, frames, rays_x=32, rays_y=18, distance=10000.0, worker_count=1):
+    scene = context.scene
+    depsgraph = context.evaluated_depsgraph_get()
+    bvh, geometry, geometry_path = scene_bvh(scene, depsgraph, context.view_layer)
+    poses = normalized_poses(sample_world_matrices(scene, [camera], frames)[0])
+    origins, directions = camera_ray_fan(camera, scene, rays_x, rays_y)
+    object_count = len(geometry.object_names)
+    fps = scene.render.fps / scene.render.fps_base
+
+    if worker_count <= 1 or len(frames) < 2 * worker_count:
+        counts, tri_hits = cast_frames(bvh, geometry.tri_object, object_count, poses, origins, directions, distance)
+        return VisibilityResult(frames, geometry.object_names, counts, tri_hits, len(origins), fps, geometry)
+
+    # Frames are split across background workers; each loads the cached geometry and builds its own tree once
+    counts = np.zeros((len(frames), object_count), dtype=np.uint32)
+    tri_hits = np.zeros(len(geometry.tri_object), dtype=np.uint32)
+    with workers.work_directory("cito_visibility_") as work_dir:
+        rays_path = os.path.join(work_dir, "rays.npz")
+        np.savez(rays_path, poses=poses, origins=origins, directions=directions)
+        chunks = np.array_split(np.arange(len(frames)), worker_count)
+        jobs = []
+        for chunk_index, chunk in enumerate(chunks):
+            output = os.path.join(work_dir, f"result_{chunk_index}.npz")
+            command = workers.blender_command("analysis", [
+                "--geometry", geometry_path, "--rays", rays_path, "--range", int(chunk[0]), int(chunk[-1]) + 1,
+                "--distance", distance, "--output", output,
+            ], factory_startup=True)
+            jobs.append((command, {"chunk": chunk_index, "output": output}))
+        results = workers.run_workers(jobs, worker_count)
+
+        for result, chunk in zip(results, chunks):
+            if result["returncode"] != 0:
+                raise RuntimeError(f"Visibility worker {result['job']['chunk']} failed")
+            with np.load(result["job"]["output"]) as data:
+                counts[chunk] = data["counts"]
+                tri_hits += data["tri_hits"]
+    return VisibilityResult(frames, geometry.object_names, counts, tri_hits, len(origins), fps, geometry)
+
+def heat_colors(values):
+    # Blue (cold) -> green -> red (hot) for values in 0..1
+    values = np.clip(values, 0.0, 1.0)
+    colors = np.empty((len(values), 4), dtype=np.float32)
+    colors[:, 0] = np.clip(2.0 * values - 1.0, 0.0, 1.0)
+    colors[:, 1] = 1.0 - np.abs(2.0 * values - 1.0)
+    colors[:, 2] = np.clip(1.0 - 2.0 * values, 0.0, 1.0)
+    colors[:, 3] = 1.0
+    return colors
+
+def write_heat_overlay(geometry, tri_hits, attribute_name="Cito_Visibility"):
+    # Per-polygon hit counts as a corner colour attribute on every mesh that was hit
+    if not len(tri_hits) or tri_hits.max() == 0:
+        return 0
+    scale = np.log1p(tri_hits.max())
+    written = 0
+    for index, name in enumerate(geometry.object_names):
+        obj = bpy.data.objects.get(name)
+        mask = geometry.tri_object == index
+        if obj is None or not tri_hits[mask].any():
+            continue
+        mesh = obj.data
+        polygon_hits = np.bincount(geometry.tri_polygon[mask], weights=tri_hits[mask], minlength=len(mesh.polygons))
+        if len(polygon_hits) != len(mesh.polygons):
+            # Modifiers changed the topology; the evaluated polygons do not map onto the original mesh
+            continue
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        colors = heat_colors(np.repeat(np.log1p(polygon_hits) / scale, loop_totals))
+
+        attribute = mesh.color_attributes.get(attribute_name)
+        if attribute is None:
+            attribute = mesh.color_attributes.new(attribute_name, 'FLOAT_COLOR', 'CORNER')
+        attribute.data.foreach_set("color", colors.ravel())
+        mesh.color_attributes.active_color = attribute
+        mesh.update()
+        written += 1
+    return written
+
+# Movement density: every path rig is sampled over the frame range and its positions are binned,
+# each sample weighted by the time spent there (1 / fps), into a grid covering a top-ortho camera's
+# view. Paths are binned one at a time, and only their sparse contribution is kept, so adding or
+# editing one path adds/subtracts that path alone instead of rebuilding the grid.
+
+def _fcurve_digest(digest, id_data, data_path):
+    action = id_data.animation_data.action if id_data.animation_data else None
+    fcurve = action.fcurves.find(data_path) if action else None
+    if fcurve is None:
+        return
+    for attribute in ("co", "handle_left", "handle_right"):
+        values = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+        fcurve.keyframe_points.foreach_get(attribute, values)
+        digest.update(values.tobytes())
+
+def path_digest(curve_obj, oversample, follower=None, constraint=None):
+    # Changes whenever the positions sampled along the path would change
+    curve = curve_obj.data
+    digest = hashlib.blake2b(curves.spline_hash(curve, oversample).encode(), digest_size=16)
+    digest.update(np.array(curve_obj.matrix_world, dtype=np.float32).tobytes())
+    digest.update(repr((curve.path_duration, curve.eval_time)).encode())
+    _fcurve_digest(digest, curve, "eval_time")
+    if constraint is not None:
+        digest.update(repr((constraint.use_fixed_location, constraint.offset, constraint.offset_factor)).encode())
+        _fcurve_digest(digest, follower, curves.offset_factor_path(constraint))
+    return digest.hexdigest()
+
+def _walk_path(curve_obj, frame_count, oversample):
+    # World positions of a path nobody rides yet, walked once at constant speed
+    table = curves.arc_length_table(curve_obj, oversample)
+    local = table.positions_at_distance(np.linspace(0.0, table.total_length, frame_count))
+    matrix = np.array(curve_obj.matrix_world)
+    return local @ matrix[:3, :3].T + matrix[:3, 3]
+
+def movement_sources(frames, oversample=8):
+    # (key, digest, positions) for every Cito camera on a Follow Path, then for every Cito path curve
+    # without a rider. positions is called lazily, so a path that has not changed is never sampled.
+    followed = set()
+    for camera in cito_index.items('CAMERA'):
+        constraint = curves.find_follow_path(camera)
+        if constraint is None or not constraint.target.data.splines:
+            continue
+        followed.add(constraint.target.name_full)
+        yield (camera.name_full, path_digest(constraint.target, oversample, camera, constraint),
+               partial(curves.follow_path_positions, camera, constraint, frames, oversample))
+    for curve_obj in cito_index.items('PATH'):
+        if curve_obj.type != 'CURVE' or curve_obj.name_full in followed or not curve_obj.data.splines:
+            continue
+        yield (curve_obj.name_full, path_digest(curve_obj, oversample),
+               partial(_walk_path, curve_obj, len(frames), oversample))
+
+def heatmap_frame(camera, scene, resolution):
+    # (pose, width, height, pixels_x, pixels_y) of the area a top-ortho camera sees, in scene units
+    pose = normalized_poses([camera.matrix_world])[0]
+    aspect = (scene.render.resolution_x * scene.render.pixel_aspect_x) / (scene.render.resolution_y * scene.render.pixel_aspect_y)
+    scale = camera.data.ortho_scale
+    width, height = (scale, scale / aspect) if aspect >= 1.0 else (scale * aspect, scale)
+    pixels_x, pixels_y = (resolution, max(1, round(resolution / aspect))) if aspect >= 1.0 else (max(1, round(resolution * aspect)), resolution)
+    return pose, width, height, pixels_x, pixels_y
+
+class MovementHeatmap:
+
+    def __init__(self, key, pose, width, height, pixels_x, pixels_y, sample_seconds):
+        self.key = key
+        self.pose = pose
+        self.width = width
+        self.height = height
+        self.shape = (pixels_y, pixels_x)
+        self.sample_seconds = sample_seconds
+        self.grid = np.zeros(pixels_x * pixels_y, dtype=np.float64)
+        self.paths = {}  # key -> (digest, bins, seconds)
+
+    def bin_positions(self, positions):
+        # Sparse (bins, seconds) of world positions inside the camera's view
+        local = (np.asarray(positions, dtype=np.float64) - self.pose[:3, 3]) @ self.pose[:3, :3]
+        pixels_y, pixels_x = self.shape
+        x = np.floor((local[:, 0] / self.width + 0.5) * pixels_x).astype(np.int64)
+        y = np.floor((local[:, 1] / self.height + 0.5) * pixels_y).astype(np.int64)
+        inside = (x >= 0) & (x < pixels_x) & (y >= 0) & (y < pixels_y)
+        bins, samples = np.unique(y[inside] * pixels_x + x[inside], return_counts=True)
+        return bins.astype(np.int32), (samples * self.sample_seconds).astype(np.float32)
+
+    def _remove(self, key):
+        digest, bins, seconds = self.paths.pop(key)
+        self.grid[bins] -= seconds
+
+    def update(self, sources):
+        # Adds new and edited paths, subtracts removed ones; returns (added, removed) counts
+        seen = set()
+        added = 0
+        for key, digest, positions in sources:
+            seen.add(key)
+            previous = self.paths.get(key)
+            if previous is not None and previous[0] == digest:
+                continue
+            if previous is not None:
+                self._remove(key)
+            bins, seconds = self.bin_positions(positions())
+            self.grid[bins] += seconds
+            self.paths[key] = (digest, bins, seconds)
+            added += 1
+        removed = [key for key in self.paths if key not in seen]
+        for key in removed:
+            self._remove(key)
+        np.maximum(self.grid, 0.0, out=self.grid)
+        return added, len(removed)
+
+    def colors(self):
+        # RGBA pixels, log-scaled heat colours, transparent where nobody went
+        grid = self.grid
+        peak = grid.max() if len(grid) else 0.0
+        colors = heat_colors(np.log1p(grid) / np.log1p(peak) if peak > 0 else grid)
+        colors[:, 3] = grid > 0
+        return colors
+
+_heatmaps = {}
+
+def movement_heatmap(context, camera, resolution=512, oversample=8, rebuild=False):
+    # The heatmap of a top-ortho camera over the scene frame range, updated in place where possible
+    scene = context.scene
+    frames = np.arange(scene.frame_start, scene.frame_end + 1)
+    pose, width, height, pixels_x, pixels_y = heatmap_frame(camera, scene, resolution)
+    sample_seconds = scene.render.fps_base / scene.render.fps
+    key = (np.round(pose, 5).tobytes(), width, height, pixels_x, pixels_y, scene.frame_start, scene.frame_end, sample_seconds)
+
+    heatmap = _heatmaps.get(camera.name_full)
+    if rebuild or heatmap is None or heatmap.key != key:
+        heatmap = _heatmaps[camera.name_full] = MovementHeatmap(key, pose, width, height, pixels_x, pixels_y, sample_seconds)
+    added, removed = heatmap.update(movement_sources(frames, oversample))
+    return heatmap, added, removed
+
+def clear_heatmaps():
+    _heatmaps.clear()
+
+def _heatmap_material(name, image):
+    material = bpy.data.materials.get(name) or bpy.data.materials.new(name)
+    material.use_nodes = True
+    material.blend_method = 'BLEND'
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    nodes.clear()
+    texture = nodes.new("ShaderNodeTexImage")
+    texture.image = image
+    texture.interpolation = 'Closest'
+    emission = nodes.new("ShaderNodeEmission")
+    transparent = nodes.new("ShaderNodeBsdfTransparent")
+    mix = nodes.new("ShaderNodeMixShader")
+    output = nodes.new("ShaderNodeOutputMaterial")
+    links.new(texture.outputs["Color"], emission.inputs["Color"])
+    links.new(texture.outputs["Alpha"], mix.inputs["Fac"])
+    links.new(transparent.outputs["BSDF"], mix.inputs[1])
+    links.new(emission.outputs["Emission"], mix.inputs[2])
+    links.new(mix.outputs["Shader"], output.inputs["Surface"])
+    return material
+
+def write_heatmap_plane(context, camera, heatmap, plane_height=0.1):
+    # Image texture of the grid on a plane exactly under the camera's view
+    base = f"Cito_Heatmap_{camera.name}"
+    pixels_y, pixels_x = heatmap.shape
+    image = bpy.data.images.get(base)
+    if image is None:
+        image = bpy.data.images.new(base, pixels_x, pixels_y, alpha=True)
+    elif tuple(image.size) != (pixels_x, pixels_y):
+        image.scale(pixels_x, pixels_y)
+    image.pixels.foreach_set(heatmap.colors().ravel())
+    image.update()
+
+    plane = next((obj for obj in cito_index.items('OVERLAY') if obj.get("cito_heatmap_camera") == camera.name_full), None)
+    if plane is None:
+        mesh = bpy.data.meshes.new(base)
+        plane = bpy.data.objects.new(cito_unique_name("Cito_Heatmap"), mesh)
+        context.scene.collection.objects.link(plane)
+        plane["cito_heatmap_camera"] = camera.name_full
+        tag_cito(plane, 'OVERLAY')
+        plane.hide_render = True
+
+    mesh = plane.data
+    mesh.clear_geometry()
+    half_width, half_height = heatmap.width / 2, heatmap.height / 2
+    mesh.from_pydata([(-half_width, -half_height, 0), (half_width, -half_height, 0), (half_width, half_height, 0), (-half_width, half_height, 0)], [], [(0, 1, 2, 3)])
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set("uv", (0, 0, 1, 0, 1, 1, 0, 1))
+    mesh.materials.clear()
+    mesh.materials.append(_heatmap_material(base, image))
+    mesh.update()
+
+    pose = heatmap.pose.copy()
+    pose[2, 3] = plane_height
+    plane.matrix_world = Matrix(pose.tolist())
+    return plane
+
+# Clearance: the camera path is sampled densely (substeps per frame), straight from the arc-length
+# tables where the rig rides a Follow Path, and every sample is checked against the cached scene BVH
+# for the distance to the nearest surface and for a clear sight line to the camera's target.
+
+def track_target(camera):
+    return next((constraint.target for constraint in camera.constraints
+                 if constraint.type == 'TRACK_TO' and constraint.target is not None), None)
+
+def rig_positions(obj, scene, frames):
+    # World positions of obj at (fractional) frames
+    constraint = curves.find_follow_path(obj)
+    if constraint is not None:
+        return curves.follow_path_positions(obj, constraint, frames)
+    whole = np.arange(int(np.floor(frames[0])), int(np.ceil(frames[-1])) + 1)
+    locations = sample_world_matrices(scene, [obj], whole)[0][:, :3, 3]
+    return np.stack([np.interp(frames, whole, locations[:, axis]) for axis in range(3)], axis=1)
+
+def violation_ranges(frames, mask):
+    # [(first_frame, last_frame)] of every run of consecutive violating samples, in whole frames
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return [(int(np.floor(frames[start])), int(np.ceil(frames[end - 1]))) for start, end in zip(edges[0::2], edges[1::2])]
+
+def format_ranges(ranges, limit=8):
+    text = ", ".join(f"{start}-{end}" for start, end in ranges[:limit])
+    return text + " ..." if len(ranges) > limit else text
+
+class ClearanceResult:
+    #   positions: (n, 3) camera samples; clearance: (n,) distance to the nearest surface, negative
+    #   inside geometry (inf beyond min_clearance); nearest / normals: (n, 3) closest surface point and
+    #   its normal; blocked: (n,) sight line to the target hits geometry
+
+    def __init__(self, frames, positions, clearance, nearest, normals, blocked, min_clearance):
+        self.frames = frames
+        self.positions = positions
+        self.clearance = clearance
+        self.nearest = nearest
+        self.normals = normals
+        self.blocked = blocked
+        self.min_clearance = min_clearance
+
+    @property
+    def too_close(self):
+        return self.clearance < self.min_clearance
+
+    def ranges(self):
+        return violation_ranges(self.frames, self.too_close), violation_ranges(self.frames, self.blocked)
+
+def check_clearance(context, camera, min_clearance=2.0, substeps=4, line_of_sight=True):
+    scene = context.scene
+    bvh = scene_bvh(scene, context.evaluated_depsgraph_get(), context.view_layer)[0]
+    frames = scene.frame_start + np.arange((scene.frame_end - scene.frame_start) * substeps + 1) / substeps
+    positions = rig_positions(camera, scene, frames)
+
+    # mathutils has no batched queries; the search radius keeps each find_nearest local
+    clearance = np.full(len(frames), np.inf)
+    nearest = np.zeros((len(frames), 3))
+    normals = np.zeros((len(frames), 3))
+    find_nearest = bvh.find_nearest
+    for index, co in enumerate(positions.tolist()):
+        location, normal, face, distance = find_nearest(co, min_clearance)
+        if location is None:
+            # Nothing within min_clearance: free, or buried deeper than that inside a building. The
+            # nearest surface at any distance tells them apart by which side of it the sample is on.
+            location, normal, face, distance = find_nearest(co)
+            if location is None or normal.dot(co) >= normal.dot(location):
+                continue
+        clearance[index] = -distance if normal.dot(co) < normal.dot(location) else distance
+        nearest[index] = location
+        normals[index] = normal
+
+    blocked = np.zeros(len(frames), dtype=bool)
+    target = track_target(camera)
+    if line_of_sight and target is not None:
+        offsets = rig_positions(target, scene, frames) - positions
+        # Stop just short of the target, which may sit right on a facade
+        lengths = np.linalg.norm(offsets, axis=1) * 0.999
+        ray_cast = bvh.ray_cast
+        for index, (origin, direction, length) in enumerate(zip(positions.tolist(), offsets.tolist(), lengths.tolist())):
+            if length > 0.0 and ray_cast(origin, direction, length)[0] is not None:
+                blocked[index] = True
+    return ClearanceResult(frames, positions, clearance, nearest, normals, blocked, min_clearance)
+
+def push_path_out(curve_obj, result):
+    # Moves the control point nearest to each too-close sample away from the surface by the missing
+    # clearance (the largest push wins per control point). Returns the number of points moved.
+    violating = np.flatnonzero(result.too_close)
+    if not len(violating):
+        return 0
+    samples = result.positions[violating]
+    away = samples - result.nearest[violating]
+    distance = np.linalg.norm(away, axis=1)
+    normals = result.normals[violating]
+    # Samples inside a building are pushed out through the nearest face, along its normal
+    inside = (distance < 1e-6) | (np.einsum("ij,ij->i", away, normals) < 0.0)
+    direction = np.where(inside[:, None], normals, away / np.maximum(distance, 1e-6)[:, None])
+    amount = np.where(inside, result.min_clearance + distance, result.min_clearance - distance)
+
+    spline = curve_obj.data.splines[0]
+    matrix = np.array(curve_obj.matrix_world)
+    control_points = curves.spline_control_points(spline) @ matrix[:3, :3].T + matrix[:3, 3]
+    tree = KDTree(len(control_points))
+    for index, co in enumerate(control_points.tolist()):
+        tree.insert(co, index)
+    tree.balance()
+    owner = np.array([tree.find(co)[1] for co in samples.tolist()])
+
+    order = np.lexsort((amount, owner))
+    last = np.flatnonzero(np.append(owner[order][1:] != owner[order][:-1], True))
+    chosen = order[last]
+    world_offsets = direction[chosen] * amount[chosen, None]
+    curves.offset_control_points(spline, owner[chosen], world_offsets @ np.linalg.inv(matrix[:3, :3]).T)
+    curve_obj.data.update_tag()
+    return len(chosen)
+
+def mark_violations(scene, too_close, blocked, prefix="Cito"):
+    # Timeline markers at the start of every violating range, replacing the previous check's markers
+    markers = scene.timeline_markers
+    for marker in [marker for marker in markers if marker.name.startswith(f"{prefix} clearance") or marker.name.startswith(f"{prefix} blocked")]:
+        markers.remove(marker)
+    for kind, ranges in (("clearance", too_close), ("blocked", blocked)):
+        for start, end in ranges:
+            markers.new(f"{prefix} {kind} {start}-{end}", frame=start)
+
+def parse_worker_args(argv=None):
+    parser = argparse.ArgumentParser(prog="analysis")
+    parser.add_argument("--geometry", required=True)
+    parser.add_argument("--rays", required=True)
+    parser.add_argument("--range", type=int, nargs=2, required=True)
+    parser.add_argument("--distance", type=float, default=10000.0)
+    parser.add_argument("--output", required=True)
+    return parser.parse_args(workers.script_args(argv))
+
+def main(argv=None):
+    # Worker entry point for analyse_visibility(); not meant to be run by hand
+    args = parse_worker_args(argv)
+    geometry = SceneGeometry.load(args.geometry)
+    rays = np.load(args.rays)
+    start, end = args.range
+    bvh = geometry.build_bvh()
+    counts, tri_hits = cast_frames(bvh, geometry.tri_object, len(geometry.object_names), rays["poses"][start:end],
+                                   rays["origins"], rays["directions"], args.distance,
+                                   on_frame=lambda index: workers.emit("frame", frame=start + index))
+    np.savez(args.output, counts=counts, tri_hits=tri_hits)
+    workers.emit("done", frames=end - start)
+    sys.exit(0)
@@ -0,0 +1,189 @@
+# Headless batch rendering of every Cito animation setup in a .blend file.
+#
+#   blender -b city.blend --python-expr "import Citographer_NAVIGATION.batch_render as b; b.main()" -- \
+#       --output //cito_renders --workers 4 --chunk-size 250
+#
+# The coordinator finds all Cito_Camera_Setup_### and Cito_Curve_Animation_Setup_* collections,
+# turns them into jobs (one per setup, or one per chunk of its frame range) and runs the jobs in a
+# pool of background Blender workers. Progress from all workers is reported on one line, and a
+# machine-readable JSON summary is written when everything is done.
+
+import argparse
+import json
+import os
+import sys
+import time
+import bpy
+from . import rendering, workers
+from .utilities import enable_addon, find_cito_setups, split_frame_range
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="batch_render", description="Render all Cito animation setups in parallel")
+    parser.add_argument("--output", default="//cito_renders", help="Output folder, one subfolder per setup")
+    parser.add_argument("--workers", type=int, default=0, help="Number of worker processes (default: CPU count - 1)")
+    parser.add_argument("--chunk-size", type=int, default=0, help="Frames per job (0 renders each setup as one job)")
+    parser.add_argument("--frames", type=int, nargs=2, metavar=("START", "END"), help="Frame range (default: scene range)")
+    parser.add_argument("--setups", nargs="*", default=[], help="Only render these setup collections")
+    parser.add_argument("--engine", default='BLENDER_WORKBENCH', help="Render engine used by the workers")
+    parser.add_argument("--summary", default="", help="Summary JSON path (default: <output>/cito_batch_summary.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the frame manifests and render everything again")
+    parser.add_argument("--incremental", action="store_true", help="Only re-render frames whose camera/scene state changed")
+    # Worker-only arguments, filled in by the coordinator
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--setup", help=argparse.SUPPRESS)
+    return parser.parse_args(workers.script_args(argv))
+
+def setup_output_directory(output, setup_name):
+    return os.path.join(bpy.path.abspath(output), setup_name)
+
+def frame_filepath(directory, frame):
+    return os.path.join(directory, f"frame_{frame:05d}.png")
+
+def prepare_render(scene, camera, directory, engine):
+    # Final renders through the scene camera; works in background mode, unlike the viewport render
+    scene.camera = camera
+    scene.render.engine = engine
+    scene.render.image_settings.file_format = 'PNG'
+    os.makedirs(directory, exist_ok=True)
+
+def render_frame(scene, frame, filepath):
+    scene.frame_set(frame)
+    scene.render.filepath = filepath
+    bpy.ops.render.render(write_still=True)
+
+def run_worker(args):
+    enable_addon(__package__)
+    scene = bpy.context.scene
+    camera = next((camera for collection, camera in find_cito_setups() if collection.name == args.setup), None)
+    if camera is None:
+        workers.emit("error", setup=args.setup, message="Setup not found")
+        return 1
+
+    frames = range(args.frames[0], args.frames[1] + 1)
+    directory = setup_output_directory(args.output, args.setup)
+
+    # Claim the frame range through a lock file, so coordinators on several machines sharing the
+    # output folder never render the same shard twice
+    lock_path = rendering.claim_shard(directory, frames[0], frames[-1])
+    if lock_path is None:
+        workers.emit("skipped", setup=args.setup, frames=len(frames))
+        return 0
+
+    manifest = rendering.FrameManifest(directory)
+    if args.restart:
+        manifest.frames.clear()
+    prepare_render(scene, camera, directory, args.engine)
+    keys = rendering.compute_frame_keys(scene, camera, frames) if args.incremental else None
+    workers.emit("start", setup=args.setup, frames=len(frames))
+
+    def on_frame(frame, seconds):
+        workers.emit("frame", setup=args.setup, frame=frame, seconds=seconds)
+
+    try:
+        stats = rendering.render_incremental(
+            manifest, frames, lambda frame, filepath: render_frame(scene, frame, filepath),
+            lambda frame: frame_filepath(directory, frame), keys=keys, on_frame=on_frame,
+        )
+    except Exception:
+        rendering.release_shard(lock_path, done=False)
+        raise
+    rendering.release_shard(lock_path)
+    workers.emit("skipped", setup=args.setup, frames=stats["skipped"])
+    workers.emit("done", setup=args.setup, **stats)
+    return 0
+
+class BatchProgress:
+    # Aggregates progress events from every worker and prints them as one status line
+
+    def __init__(self, setups, total_frames):
+        self.total_frames = total_frames
+        self.frames_done = 0
+        self.render_seconds = 0.0
+        self.started = time.perf_counter()
+        self.setups = {name: {"frames": 0, "skipped": 0, "linked": 0, "errors": []} for name in setups}
+
+    def on_event(self, job, event):
+        setup = self.setups[job["setup"]]
+        if event["event"] == "frame":
+            setup["frames"] += 1
+            self.frames_done += 1
+            self.render_seconds += event["seconds"]
+            self.print_status()
+        elif event["event"] == "skipped":
+            # Frames already verified in the manifest, or a shard claimed by another process
+            setup["skipped"] += event["frames"]
+            self.total_frames -= event["frames"]
+            self.print_status()
+        elif event["event"] == "done":
+            setup["linked"] += event.get("linked", 0)
+        elif event["event"] == "error":
+            setup["errors"].append(event.get("message", ""))
+
+    def print_status(self):
+        elapsed = time.perf_counter() - self.started
+        fps = self.frames_done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total_frames - self.frames_done) / fps if fps > 0 else 0.0
+        sys.stdout.write(f"\rCito batch render: {self.frames_done}/{self.total_frames} frames, "
+                         f"{fps:.2f} fps, {remaining:.0f}s left   ")
+        sys.stdout.flush()
+
+def run_coordinator(args):
+    blendfile = bpy.data.filepath
+    if not blendfile:
+        print("Cito batch render: the scene must be saved to a .blend file first")
+        return 1
+
+    scene = bpy.context.scene
+    frame_start, frame_end = args.frames or (scene.frame_start, scene.frame_end)
+    output = bpy.path.abspath(args.output)
+    setups = [collection.name for collection, camera in find_cito_setups() if not args.setups or collection.name in args.setups]
+    if not setups:
+        print("Cito batch render: no Cito animation setups found")
+        return 1
+
+    jobs = []
+    skipped_frames = 0
+    for setup in setups:
+        for start, end in split_frame_range(frame_start, frame_end, args.chunk_size):
+            if not (args.restart or args.incremental) and rendering.shard_is_done(setup_output_directory(output, setup), start, end):
+                skipped_frames += end - start + 1
+                continue
+            options = [flag for flag, enabled in (("--restart", args.restart), ("--incremental", args.incremental)) if enabled]
+            command = workers.blender_command("batch_render", [
+                "--worker", "--setup", setup, "--frames", start, end, "--output", output, "--engine", args.engine, *options,
+            ], blendfile)
+            jobs.append((command, {"setup": setup, "frame_start": start, "frame_end": end}))
+
+    progress = BatchProgress(setups, len(setups) * (frame_end - frame_start + 1) - skipped_frames)
+    results = workers.run_workers(jobs, args.workers or None, progress.on_event)
+    print()
+
+    failed_jobs = [result["job"] for result in results if result["returncode"] != 0]
+    summary = {
+        "blendfile": blendfile,
+        "output": output,
+        "frame_start": frame_start,
+        "frame_end": frame_end,
+        "engine": args.engine,
+        "jobs": len(jobs),
+        "frames_rendered": progress.frames_done,
+        "frames_expected": progress.total_frames,
+        "frames_skipped": skipped_frames + sum(state["skipped"] for state in progress.setups.values()),
+        "wall_seconds": round(time.perf_counter() - progress.started, 3),
+        "render_seconds": round(progress.render_seconds, 3),
+        "setups": {
+            name: {"directory": setup_output_directory(output, name), **state}
+            for name, state in progress.setups.items()
+        },
+        "failed_jobs": failed_jobs,
+    }
+    summary_path = args.summary or os.path.join(output, "cito_batch_summary.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as stream:
+        json.dump(summary, stream, indent=2)
+    print(f"Cito batch render: summary written to {summary_path}")
+    return 1 if failed_jobs or progress.frames_done < progress.total_frames else 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.exit(run_worker(args) if args.worker else run_coordinator(args))
@@ -0,0 +1,239 @@
+# Headless performance benchmarks of the add-on's operators on synthetic city scenes.
+#
+#   blender -b --python-expr "import Citographer_NAVIGATION.benchmark as b; b.main()" -- \
+#       --sizes 1000 10000 100000 --output cito_benchmark.json --baseline cito_baseline.json
+#
+# For every scene size a fresh file is filled with that many box buildings (sharing one mesh), then
+# each case below is timed (median of --repeat runs). The JSON result has one scaling curve per case
+# (seconds per scene size) and its log-log exponent. With --baseline, every case that got slower than
+# the tolerance allows is listed as a regression and the exit code is 1.
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import bpy
+import numpy as np
+from . import batch_render, operators, workers
+from .utilities import enable_addon, find_cito_setups, is_navigation_baked
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark", description="Time the Cito operators on synthetic city scenes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="Buildings per synthetic scene")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument("--stations", type=int, default=1000, help="Cameras created by the batch camera case")
+    parser.add_argument("--render-frames", type=int, default=10, help="Frames rendered by the render throughput case")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[960, 540], metavar=("X", "Y"))
+    parser.add_argument("--engine", default='BLENDER_WORKBENCH', help="Render engine of the render throughput case")
+    parser.add_argument("--output", default="cito_benchmark.json", help="Result JSON path")
+    parser.add_argument("--baseline", default="", help="Earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Slowdowns below this many seconds are noise")
+    return parser.parse_args(workers.script_args(argv))
+
+def new_scene():
+    # Empty file, with the add-on's handlers resetting the name registry and the index
+    bpy.ops.wm.read_homefile(use_empty=True)
+    enable_addon(__package__)
+    return bpy.context.scene
+
+def build_city(scene, count, seed=0):
+    # count box buildings on a square grid, random footprints and heights, all sharing one cube mesh
+    rng = np.random.default_rng(seed)
+    mesh = bpy.data.meshes.new("Cito_Benchmark_Building")
+    mesh.from_pydata(
+        [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], [],
+        [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)],
+    )
+    collection = bpy.data.collections.new("Cito_Benchmark_City")
+    scene.collection.children.link(collection)
+
+    side = math.ceil(math.sqrt(count))
+    index = np.arange(count)
+    x = (index % side - side / 2) * 20.0
+    y = (index // side - side / 2) * 20.0
+    footprint = rng.uniform(4.0, 8.0, (count, 2))
+    height = rng.uniform(5.0, 40.0, count)
+    new_object = bpy.data.objects.new
+    link = collection.objects.link
+    for i, (px, py, sx, sy, sz) in enumerate(zip(x.tolist(), y.tolist(), footprint[:, 0].tolist(), footprint[:, 1].tolist(), height.tolist())):
+        obj = new_object(f"Building_{i}", mesh)
+        obj.location = (px, py, sz)
+        obj.scale = (sx, sy, sz)
+        link(obj)
+    return collection
+
+def write_stations(filepath, count, seed=0):
+    rng = np.random.default_rng(seed)
+    kinds = ("SCALED", "SECTION_ORTHO", "TOP_ORTHO", "IPHONE")
+    with open(filepath, "w", newline="", encoding="utf-8") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(("x", "y", "heading", "type"))
+        for i in range(count):
+            writer.writerow((rng.uniform(-500, 500), rng.uniform(-500, 500), rng.uniform(0, 360), kinds[i % len(kinds)]))
+
+def median_seconds(function, repeat, before=None):
+    times = []
+    for i in range(max(1, repeat)):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+        if isinstance(result, set) and 'FINISHED' not in result:
+            raise RuntimeError(f"operator returned {sorted(result)}")
+    return float(np.median(times))
+
+def select_only(context, obj):
+    for selected in context.selected_objects:
+        selected.select_set(False)
+    obj.select_set(True)
+    context.view_layer.objects.active = obj
+
+def add_curve(scene, name="Cito_Benchmark_Curve"):
+    curve = bpy.data.curves.new(name, 'CURVE')
+    curve.dimensions = '3D'
+    spline = curve.splines.new('BEZIER')
+    spline.bezier_points.add(3)
+    co = np.array([(-300, -300, 30), (300, -300, 30), (300, 300, 30), (-300, 300, 30)], dtype=np.float32)
+    spline.bezier_points.foreach_set("co", co.ravel())
+    for point in spline.bezier_points:
+        point.handle_left_type = point.handle_right_type = 'AUTO'
+    spline.use_cyclic_u = True
+    obj = bpy.data.objects.new(name, curve)
+    scene.collection.objects.link(obj)
+    return obj
+
+def operator_call(idname, **properties):
+    category, name = idname.split(".")
+    function = getattr(getattr(bpy.ops, category), name)
+    return lambda: function(**properties)
+
+def benchmark_cases(context, args, work_dir):
+    # (name, operator idname, function, before, units) per case, run in this order on the same scene.
+    # Operators run through bpy.ops, so their context and undo overhead is part of the timing; the
+    # reported time is per unit (per rendered frame for the render case).
+    scene = context.scene
+    stations_path = os.path.join(work_dir, "stations.csv")
+    write_stations(stations_path, args.stations)
+    curve_obj = add_curve(scene)
+
+    def setup_camera():
+        return find_cito_setups()[0][1]
+
+    def select_setup_camera():
+        camera = setup_camera()
+        if is_navigation_baked(camera):
+            select_only(context, camera)
+            bpy.ops.view3d.cito_unbake_navigation()
+        select_only(context, camera)
+
+    def render_frames():
+        camera = setup_camera()
+        directory = os.path.join(work_dir, "frames")
+        batch_render.prepare_render(scene, camera, directory, args.engine)
+        for frame in range(scene.frame_start, scene.frame_start + args.render_frames):
+            batch_render.render_frame(scene, frame, batch_render.frame_filepath(directory, frame))
+
+    cases = [
+        ("camera_scaled", "view3d.add_camera_scaled_up", None, None, 1),
+        ("camera_section_ortho", "view3d.add_camera_section_ortho", None, None, 1),
+        ("camera_top_ortho", "view3d.add_camera_top_view_ortho", None, None, 1),
+        ("camera_iphone", "view3d.add_iphone_camera", None, None, 1),
+        (f"camera_stations_{args.stations}", "view3d.cito_import_camera_stations", operator_call("view3d.cito_import_camera_stations", filepath=stations_path), None, 1),
+        ("animation_setup", "view3d.cito_create_animation_setup", None, None, 1),
+        ("curve_rig_setup", "view3d.use_selected_curve_to_animate_camera", None, lambda: select_only(context, curve_obj), 1),
+        ("constant_speed_path", "object.cito_constant_speed_path", None, lambda: select_only(context, setup_camera()), 1),
+        ("bake_navigation", "view3d.cito_bake_navigation", None, select_setup_camera, 1),
+        ("render_frame", None, render_frames, None, args.render_frames),
+    ]
+    return [(name, idname, function or operator_call(idname), before, units) for name, idname, function, before, units in cases]
+
+def run_size(args, size):
+    scene = new_scene()
+    scene.render.resolution_x, scene.render.resolution_y = args.resolution
+    scene.render.resolution_percentage = 100
+
+    results = {}
+    errors = {}
+    started = time.perf_counter()
+    build_city(scene, size)
+    results["build_city"] = time.perf_counter() - started
+
+    covered = set()
+    with tempfile.TemporaryDirectory(prefix="cito_benchmark_") as work_dir:
+        for name, idname, function, before, units in benchmark_cases(bpy.context, args, work_dir):
+            covered.add(idname)
+            try:
+                results[name] = median_seconds(function, args.repeat, before) / units
+            except Exception as error:
+                errors[name] = str(error)
+                continue
+            print(f"Cito benchmark: {size} buildings, {name}: {results[name]:.4f}s")
+    return results, errors, covered
+
+def scaling_exponent(sizes, seconds):
+    # Slope of log(seconds) over log(size): ~0 constant, ~1 linear, ~2 quadratic in the scene size
+    points = [(size, value) for size, value in zip(sizes, seconds) if value is not None and value > 0]
+    if len(points) < 2:
+        return None
+    x, y = np.log(np.array(points, dtype=np.float64)).T
+    return round(float(np.polyfit(x, y, 1)[0]), 3)
+
+def find_regressions(results, baseline, tolerance, min_delta):
+    regressions = []
+    for case, curve in results.items():
+        for size, seconds in curve.items():
+            previous = baseline.get("results", {}).get(case, {}).get(size)
+            if previous is None or seconds is None:
+                continue
+            if seconds > previous * (1.0 + tolerance) and seconds - previous > min_delta:
+                regressions.append({"case": case, "size": int(size), "baseline": previous, "seconds": seconds,
+                                    "ratio": round(seconds / previous, 3) if previous > 0 else None})
+    return regressions
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = sorted(set(args.sizes))
+    results = {}
+    errors = {}
+    covered = set()
+    for size in sizes:
+        size_results, size_errors, covered = run_size(args, size)
+        for case, seconds in size_results.items():
+            results.setdefault(case, {})[str(size)] = round(seconds, 6)
+        for case, message in size_errors.items():
+            errors.setdefault(case, {})[str(size)] = message
+
+    report = {
+        "blender": bpy.app.version_string,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sizes": sizes,
+        "repeat": args.repeat,
+        "results": results,
+        "scaling": {case: scaling_exponent(sizes, [curve.get(str(size)) for size in sizes]) for case, curve in results.items()},
+        "errors": errors,
+        # Interactive operators (file browsers, modal sessions, 3D viewport only) and the analyses
+        "not_benchmarked": [cls.bl_idname for cls in operators.classes if cls.bl_idname not in covered],
+        "regressions": [],
+    }
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as stream:
+            report["regressions"] = find_regressions(results, json.load(stream), args.tolerance, args.min_delta)
+        for regression in report["regressions"]:
+            print(f"Cito benchmark: REGRESSION {regression['case']} at {regression['size']} buildings: "
+                  f"{regression['baseline']:.4f}s -> {regression['seconds']:.4f}s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as stream:
+        json.dump(report, stream, indent=2)
+    print(f"Cito benchmark: results written to {args.output}")
+    sys.exit(1 if report["regressions"] else 0)
@@ -0,0 +1,297 @@
+import hashlib
+import bpy
+import numpy as np
+from .utilities import PATH_GROUP, ensure_action, follow_path_constraint, write_fcurve_samples
+
+# Arc-length tables are cached per curve datablock and keyed by a hash of the spline point data,
+# so they are only rebuilt after the curve is edited.
+_arc_length_cache = {}
+
+class ArcLengthTable:
+    # Dense samples of the first spline of a curve (the one Follow Path uses), in curve local space.
+    #   points:  (m, 3) positions along the spline
+    #   lengths: (m,)   cumulative true arc length at each sample
+    #   factors: (m,)   Follow Path factor (0..1) that places the object at each sample
+    # Blender's path is parameterized by length along its own tessellation (resolution_u points per
+    # segment), not along the true curve, so factors and true lengths drift apart where control
+    # points are uneven. Mapping through this table gives motion at true speed.
+
+    def __init__(self, points, lengths, factors, cyclic):
+        self.points = points
+        self.lengths = lengths
+        self.factors = factors
+        self.cyclic = cyclic
+        self.total_length = float(lengths[-1]) if len(lengths) else 0.0
+
+    def _wrap_distance(self, distance):
+        distance = np.asarray(distance, dtype=np.float64)
+        if self.cyclic and self.total_length > 0.0:
+            return np.mod(distance, self.total_length)
+        return np.clip(distance, 0.0, self.total_length)
+
+    def distance_to_factor(self, distance):
+        return np.interp(self._wrap_distance(distance), self.lengths, self.factors)
+
+    def factor_to_distance(self, factor):
+        factor = np.asarray(factor, dtype=np.float64)
+        factor = np.mod(factor, 1.0) if self.cyclic else np.clip(factor, 0.0, 1.0)
+        return np.interp(factor, self.factors, self.lengths)
+
+    def positions_at_distance(self, distance):
+        distance = self._wrap_distance(distance)
+        return np.stack([np.interp(distance, self.lengths, self.points[:, axis]) for axis in range(3)], axis=-1)
+
+    def positions_at_factor(self, factor):
+        return self.positions_at_distance(self.factor_to_distance(factor))
+
+def _cumulative_length(points):
+    lengths = np.zeros(len(points), dtype=np.float64)
+    if len(points) > 1:
+        lengths[1:] = np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))
+    return lengths
+
+def _bezier_control_arrays(spline):
+    count = len(spline.bezier_points)
+    arrays = []
+    for attribute in ("co", "handle_left", "handle_right"):
+        values = np.empty(count * 3, dtype=np.float64)
+        spline.bezier_points.foreach_get(attribute, values)
+        arrays.append(values.reshape(count, 3))
+    return arrays
+
+def _bezier_samples(spline, samples_per_segment):
+    # Evaluates every segment of a Bezier spline in one broadcast over (segments, samples)
+    co, handle_left, handle_right = _bezier_control_arrays(spline)
+    end = np.roll(np.arange(len(co)), -1) if spline.use_cyclic_u else np.arange(1, len(co))
+    if len(end) == 0:
+        return co, np.zeros(len(co))
+    start = np.arange(len(end))
+    p0, p1, p2, p3 = co[start], handle_right[start], handle_left[end], co[end]
+
+    t = (np.arange(samples_per_segment) / samples_per_segment)[None, :, None]
+    mt = 1.0 - t
+    points = (mt ** 3) * p0[:, None] + 3 * (mt ** 2) * t * p1[:, None] + 3 * mt * (t ** 2) * p2[:, None] + (t ** 3) * p3[:, None]
+    points = points.reshape(-1, 3)
+    params = (start[:, None] + t[..., 0]).reshape(-1)
+
+    # Close the polyline: back to the first point on cyclic splines, the last control point otherwise
+    points = np.vstack((points, co[end[-1]]))
+    params = np.append(params, len(end))
+    return points, params
+
+def _nurbs_knots(count, order, endpoint):
+    if endpoint:
+        inner = np.arange(1, count - order + 1, dtype=np.float64)
+        return np.concatenate((np.zeros(order), inner, np.full(order, count - order + 1, dtype=np.float64)))
+    return np.arange(count + order, dtype=np.float64)
+
+def _nurbs_samples(spline, samples_per_segment):
+    # Vectorized Cox-de Boor evaluation of a (rational) NURBS/POLY spline
+    count = len(spline.points)
+    co = np.empty(count * 4, dtype=np.float64)
+    spline.points.foreach_get("co", co)
+    co = co.reshape(count, 4)
+    if spline.type == 'POLY' or count < 2:
+        points = co[:, :3]
+        if spline.use_cyclic_u:
+            points = np.vstack((points, points[:1]))
+        return points, np.arange(len(points), dtype=np.float64)
+
+    order = max(2, min(spline.order_u, count))
+    cyclic = spline.use_cyclic_u
+    if cyclic:
+        co = np.vstack((co, co[:order - 1]))
+    knots = _nurbs_knots(len(co), order, spline.use_endpoint_u and not cyclic)
+    u_start, u_end = knots[order - 1], knots[len(co)]
+
+    segments = count if cyclic else count - 1
+    u = np.linspace(u_start, u_end, segments * samples_per_segment + 1)
+    u[-1] = np.nextafter(u_end, u_start)
+
+    basis = ((knots[:-1][None, :] <= u[:, None]) & (u[:, None] < knots[1:][None, :])).astype(np.float64)
+    for degree in range(1, order):
+        size = len(knots) - 1 - degree
+        left_den = knots[degree:degree + size] - knots[:size]
+        right_den = knots[degree + 1:degree + 1 + size] - knots[1:1 + size]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left = np.where(left_den > 0, (u[:, None] - knots[:size]) / left_den, 0.0)
+            right = np.where(right_den > 0, (knots[degree + 1:degree + 1 + size] - u[:, None]) / right_den, 0.0)
+        basis = left * basis[:, :size] + right * basis[:, 1:size + 1]
+
+    weighted = basis * co[:, 3]
+    points = (weighted @ co[:, :3]) / weighted.sum(axis=1, keepdims=True)
+    params = (u - u_start) / (u_end - u_start) * segments
+    return points, params
+
+def spline_control_points(spline):
+    # (n, 3) control point positions of a spline, in curve local space
+    if spline.type == 'BEZIER':
+        return _bezier_control_arrays(spline)[0]
+    co = np.empty(len(spline.points) * 4, dtype=np.float64)
+    spline.points.foreach_get("co", co)
+    return co.reshape(-1, 4)[:, :3]
+
+def offset_control_points(spline, indices, offsets):
+    # Moves control points (Bezier handles with them) by local offsets, one foreach_set per attribute
+    if spline.type == 'BEZIER':
+        for attribute, values in zip(("co", "handle_left", "handle_right"), _bezier_control_arrays(spline)):
+            values[indices] += offsets
+            spline.bezier_points.foreach_set(attribute, values.astype(np.float32).ravel())
+    else:
+        co = np.empty(len(spline.points) * 4, dtype=np.float32)
+        spline.points.foreach_get("co", co)
+        co = co.reshape(-1, 4)
+        co[indices, :3] += offsets
+        spline.points.foreach_set("co", co.ravel())
+
+def _spline_samples(spline, samples_per_segment):
+    if spline.type == 'BEZIER':
+        return _bezier_samples(spline, samples_per_segment)
+    return _nurbs_samples(spline, samples_per_segment)
+
+def spline_hash(curve, oversample):
+    # Digest of everything that changes the shape or the tessellation of the first spline
+    spline = curve.splines[0]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((spline.type, spline.use_cyclic_u, spline.resolution_u, spline.order_u,
+                        spline.use_endpoint_u, oversample)).encode())
+    if spline.type == 'BEZIER':
+        for values in _bezier_control_arrays(spline):
+            digest.update(values.tobytes())
+    else:
+        co = np.empty(len(spline.points) * 4, dtype=np.float64)
+        spline.points.foreach_get("co", co)
+        digest.update(co.tobytes())
+    return digest.hexdigest()
+
+def build_arc_length_table(curve, oversample=8):
+    spline = curve.splines[0]
+    resolution = max(spline.resolution_u, 1)
+
+    # Blender's own tessellation decides the Follow Path factor ...
+    path_points, path_params = _spline_samples(spline, resolution)
+    path_lengths = _cumulative_length(path_points)
+    path_factors = path_lengths / path_lengths[-1] if path_lengths[-1] > 0 else np.linspace(0.0, 1.0, len(path_lengths))
+
+    # ... while a finer sampling of the same parameter range gives the true arc length
+    points, params = _spline_samples(spline, resolution * max(oversample, 1))
+    lengths = _cumulative_length(points)
+    factors = np.interp(params, path_params, path_factors)
+    return ArcLengthTable(points, lengths, factors, spline.use_cyclic_u)
+
+def arc_length_table(curve, oversample=8):
+    if isinstance(curve, bpy.types.Object):
+        curve = curve.data
+    if not curve.splines:
+        return None
+    key = spline_hash(curve, oversample)
+    cached = _arc_length_cache.get(curve.name_full)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    table = build_arc_length_table(curve, oversample)
+    _arc_length_cache[curve.name_full] = (key, table)
+    return table
+
+def clear_arc_length_cache():
+    _arc_length_cache.clear()
+
+def find_follow_path(obj):
+    constraint = follow_path_constraint(obj)
+    if constraint is not None and constraint.target is not None and constraint.target.type == 'CURVE':
+        return constraint
+    return None
+
+def _evaluate_property(id_data, data_path, frames, default):
+    action = id_data.animation_data.action if id_data.animation_data else None
+    fcurve = action.fcurves.find(data_path) if action else None
+    if fcurve is None:
+        return np.full(len(frames), default, dtype=np.float64)
+    return np.fromiter((fcurve.evaluate(frame) for frame in frames), dtype=np.float64, count=len(frames))
+
+def offset_factor_path(constraint):
+    return f'constraints["{constraint.name}"].offset_factor'
+
+def follow_path_factors(obj, constraint, frames):
+    # Follow Path factor per frame without evaluating the scene. Blender uses offset_factor only
+    # with "Fixed Position" on; otherwise the curve's Evaluation Time drives the object.
+    frames = np.asarray(frames, dtype=np.float64)
+    curve = constraint.target.data
+    if constraint.use_fixed_location:
+        factors = _evaluate_property(obj, offset_factor_path(constraint), frames, constraint.offset_factor)
+    else:
+        eval_time = _evaluate_property(curve, "eval_time", frames, curve.eval_time)
+        factors = (eval_time - constraint.offset) / max(curve.path_duration, 1)
+    cyclic = bool(curve.splines) and curve.splines[0].use_cyclic_u
+    return np.mod(factors, 1.0) if cyclic else np.clip(factors, 0.0, 1.0)
+
+def follow_path_positions(obj, constraint, frames, oversample=8):
+    # World-space positions of a Follow Path rig per frame, from the cached arc-length table
+    table = arc_length_table(constraint.target, oversample)
+    local = table.positions_at_factor(follow_path_factors(obj, constraint, frames))
+    matrix = np.array(constraint.target.matrix_world)
+    return local @ matrix[:3, :3].T + matrix[:3, 3]
+
+def world_length_scale(curve_obj):
+    # Average scale of the curve object, to turn local arc lengths into scene units
+    return float(np.mean(np.linalg.norm(np.array(curve_obj.matrix_world)[:3, :3], axis=0)))
+
+def write_offset_factor_curve(obj, constraint, frames, factors):
+    # Writes a dense offset_factor F-curve in one foreach_set call and switches the constraint
+    # to Fixed Position so the keys actually drive it
+    constraint.use_fixed_location = True
+    action = ensure_action(obj)
+    return write_fcurve_samples(action, offset_factor_path(constraint), 0, frames, factors, group=PATH_GROUP)
+
+def path_target_follower(camera, curve_obj):
+    # The Track To target of a camera when it rides the same path (the curve rig's Cito_Target_Curve)
+    for constraint in camera.constraints:
+        target = getattr(constraint, "target", None)
+        if constraint.type == 'TRACK_TO' and target is not None:
+            follow_path = find_follow_path(target)
+            if follow_path is not None and follow_path.target == curve_obj:
+                return target, follow_path
+    return None, None
+
+# Follow Path forward axes as unit vectors in the path frame
+FORWARD_AXES = {
+    'FORWARD_X': (1.0, 0.0, 0.0), 'FORWARD_Y': (0.0, 1.0, 0.0), 'FORWARD_Z': (0.0, 0.0, 1.0),
+    'TRACK_NEGATIVE_X': (-1.0, 0.0, 0.0), 'TRACK_NEGATIVE_Y': (0.0, -1.0, 0.0), 'TRACK_NEGATIVE_Z': (0.0, 0.0, -1.0),
+}
+
+def end_tangent(table):
+    # Unit direction of the path at its end, in curve local space
+    direction = table.points[-1] - table.points[-2] if len(table.points) > 1 else np.zeros(3)
+    length = np.linalg.norm(direction)
+    return direction / length if length > 0 else np.array((0.0, 1.0, 0.0))
+
+def write_overshoot_curve(obj, constraint, table, frames, overshoot):
+    # Follow Path stops at the end of an open path; the follower's location (which Follow Path applies
+    # in the path frame) carries it on along the end tangent by overshoot local units. Earlier
+    # overshoot keys are dropped when nothing overshoots.
+    action = ensure_action(obj)
+    for fcurve in [fc for fc in action.fcurves if fc.data_path == "location" and fc.group is not None and fc.group.name == PATH_GROUP]:
+        action.fcurves.remove(fcurve)
+    if not overshoot.any():
+        return
+    direction = np.array(FORWARD_AXES[constraint.forward_axis]) if constraint.use_curve_follow else end_tangent(table)
+    location = overshoot[:, None] * direction
+    for index in range(3):
+        write_fcurve_samples(action, "location", index, frames, location[:, index], group=PATH_GROUP)
+
+def drive_at_distances(camera, constraint, frames, distances, target_lead=1.0, oversample=8):
+    # Drives the camera (and a target on the same path, target_lead units ahead) so that at each frame
+    # it sits at the given true arc-length distance, in scene units, along the path. Near the end of
+    # an open path the target keeps its lead past the end, so Track To never looks at the camera itself.
+    curve_obj = constraint.target
+    table = arc_length_table(curve_obj, oversample)
+    scale = world_length_scale(curve_obj) or 1.0
+    local_distances = np.asarray(distances, dtype=np.float64) / scale
+    write_offset_factor_curve(camera, constraint, frames, table.distance_to_factor(local_distances))
+
+    target, target_path = path_target_follower(camera, curve_obj)
+    if target is not None:
+        lead_distances = local_distances + target_lead / scale
+        write_offset_factor_curve(target, target_path, frames, table.distance_to_factor(lead_distances))
+        overshoot = np.zeros(len(lead_distances)) if table.cyclic else np.maximum(lead_distances - table.total_length, 0.0)
+        write_overshoot_curve(target, target_path, table, frames, overshoot)
+    return table
@@ -1,7 +1,11 @@
+import os
+import time
 import bpy
-from bpy.types import Operator
-from bpy.props import StringProperty, FloatProperty, IntProperty, EnumProperty
+import numpy as np
+from bpy.types import Operator, OperatorFileListElement
+from bpy.props import StringProperty, FloatProperty, IntProperty, EnumProperty, BoolProperty, CollectionProperty
 from .utilities import *
+from . import agents, analysis, curves, profiling, rendering, routing, sections, speed_profiles, thumbnails, tiles, trajectories, trajectory_io
 
 # Properties to register
 properties = {
@@ -29,6 +33,16 @@ properties = {
         max=3.1416,   # 180 degrees
         update=update_camera_rotation
     ),
+    "camera_broadcast_mode": EnumProperty(
+        name="Apply To",
+        description="Which cameras the ortho scale, Z position, rotation and zoom settings change",
+        items=[
+            ('ACTIVE', "Active Camera", "Only the scene camera, updated live"),
+            ('SELECTED', "Selected Cito Cameras", "All selected Cito cameras, written once the slider settles"),
+            ('GROUP', "Camera Group", "All Cito cameras in the active camera's collection, written once the slider settles"),
+        ],
+        default='ACTIVE',
+    ),
     "iphone_camera_zoom_mode": EnumProperty(
         name="Zoom Mode",
         description="Choose zoom mode for the iPhone camera",
@@ -79,6 +93,79 @@ properties = {
         ],
         default='FRAMES'
     ),
+    "render_resume": BoolProperty(
+        name="Resume",
+        description="Skip frames already listed in the output folder's frame manifest",
+        default=True
+    ),
+    "render_incremental": BoolProperty(
+        name="Incremental",
+        description="Only re-render frames whose camera, render settings or visible objects changed; with one camera, identical frames are hard-linked",
+        default=False
+    ),
+    "render_writer_format": EnumProperty(
+        name="Writer Format",
+        description="How the pipelined render writes frames",
+        items=[
+            ('PNG', "PNG Frames", "Encode each frame as PNG on the writer threads"),
+            ('RAW', "Raw (memory-mapped)", "Store all frames uncompressed in one memory-mapped .npy file"),
+        ],
+        default='PNG'
+    ),
+    "render_writer_threads": IntProperty(
+        name="Writer Threads",
+        description="Threads encoding and writing frames while the next frame is drawn",
+        default=4,
+        min=1,
+        max=32
+    ),
+    "render_writer_queue": IntProperty(
+        name="Queue Depth",
+        description="Frames that may wait for a writer before drawing pauses",
+        default=8,
+        min=1,
+        max=64
+    ),
+    "render_png_compression": IntProperty(
+        name="PNG Compression",
+        description="zlib compression level of the PNG frames (0 = fastest, 9 = smallest)",
+        default=6,
+        min=0,
+        max=9
+    ),
+    "render_tick_budget": IntProperty(
+        name="Tick Budget (ms)",
+        description="Time the background render may use per timer tick before giving control back to the UI",
+        default=100,
+        min=10,
+        max=2000
+    ),
+    "render_cameras": EnumProperty(
+        name="Cameras",
+        description="Cameras the frame renders draw; every frame is evaluated once for all of them",
+        items=[
+            ('SCENE', "Scene Camera", "Render the scene camera only"),
+            ('SELECTED', "Scene + Selected", "Render the scene camera and every selected camera, each into its own subfolder"),
+        ],
+        default='SCENE'
+    ),
+    "show_camera_thumbnails": BoolProperty(
+        name="Thumbnails",
+        description="Show a preview of every Cito camera's view in the camera list, rendered in the background",
+        default=False
+    ),
+    "camera_thumbnail_cache_mb": IntProperty(
+        name="Thumbnail Cache (MB)",
+        description="Memory the camera thumbnails may use before the least recently shown ones are dropped",
+        default=32,
+        min=1,
+        max=1024
+    ),
+    "render_verify_checksums": BoolProperty(
+        name="Verify Checksums",
+        description="Check each finished frame against its recorded checksum before skipping it (slower)",
+        default=False
+    ),
 }
 
 class AddCameraScaledUp(Operator):
@@ -86,21 +173,14 @@ class AddCameraScaledUp(Operator):
     bl_label = "Add Scaled Camera"
     
     def execute(self, context):
-        # Base name for the camera
-        base_name = "Cito_camera"
-        suffix = 0
-        
-        # Check if a camera named "Cito_camera" exists
-        cam = bpy.data.objects.get(base_name)
-        
-        # If it exists, find the next available name (e.g., "Cito_camera_001", "Cito_camera_002", etc.)
-        while bpy.data.objects.get(f"{base_name}_{suffix:03}") is not None:
-            suffix += 1
+        # Next free name: "Cito_camera" first, then "Cito_camera_001", "Cito_camera_002", etc.
+        name = cito_unique_name("Cito_camera", bare_first=True)
         
         # Add a new camera
         bpy.ops.object.camera_add(location=(0, 0, 200))
         cam = bpy.context.active_object
-        cam.name = f"{base_name}_{suffix:03}" if suffix > 0 else base_name
+        cam.name = name
+        tag_cito(cam, 'CAMERA', 'SCALED')
         
         # Scale up the camera object (camera objects have no visual geometry, but this scales its icon in the viewport)
         cam.scale = (100, 100, 100)
@@ -109,7 +189,7 @@ class AddCameraScaledUp(Operator):
         context.scene.camera = cam
         
         # Change the view to the newly created camera
-        bpy.ops.view3d.object_as_camera()
+        view_through_camera(context)
         
         self.report({'INFO'}, f"Camera '{cam.name}' added, scaled, and set as the active view camera.")
     
@@ -121,22 +201,20 @@ class AddCameraSectionOrtho(Operator):
     bl_label = "Add Section-Ortho Camera"
 
     def execute(self, context):
-        base_name = "Cito_section_camera"
-        suffix = 0
-        while bpy.data.objects.get(f"{base_name}_{suffix:03}") is not None:
-            suffix += 1
+        name = cito_unique_name("Cito_section_camera", bare_first=True)
         
         # Add a new camera positioned for section view
         bpy.ops.object.camera_add(location=(0, 0, 0))
         cam = bpy.context.active_object
-        cam.name = f"{base_name}_{suffix:03}" if suffix > 0 else base_name
+        cam.name = name
+        tag_cito(cam, 'CAMERA', 'SECTION_ORTHO')
         cam.data.type = 'ORTHO'  # Set to orthographic mode
         cam.rotation_euler[0] = 1.5708
         cam.scale = (100, 100, 100)
         cam.data.ortho_scale = 50
         
         context.scene.camera = cam
-        bpy.ops.view3d.object_as_camera()
+        view_through_camera(context)
 
         return {'FINISHED'}
     
@@ -145,20 +223,18 @@ class AddCameraTopViewOrtho(bpy.types.Operator):
     bl_label = "Add Top-Ortho Camera"
 
     def execute(self, context):
-        base_name = "Cito_top_camera"
-        suffix = 0
-        while bpy.data.objects.get(f"{base_name}_{suffix:03}") is not None:
-            suffix += 1
+        name = cito_unique_name("Cito_top_camera", bare_first=True)
 
         bpy.ops.object.camera_add(location=(0, 0, 200))
         cam = bpy.context.active_object
-        cam.name = f"{base_name}_{suffix:03}" if suffix > 0 else base_name
+        cam.name = name
+        tag_cito(cam, 'CAMERA', 'TOP_ORTHO')
         cam.data.type = 'ORTHO'
         cam.scale = (100, 100, 100)
         cam.rotation_euler = (0, 0, 0)  # Top-down view
         cam.data.ortho_scale = 50
         context.scene.camera = cam
-        bpy.ops.view3d.object_as_camera()
+        view_through_camera(context)
         
         return {'FINISHED'}
 
@@ -171,14 +247,10 @@ class AddIphoneCamera(bpy.types.Operator):
         bpy.ops.object.camera_add(enter_editmode=False, align='VIEW', location=(0, 0, 5))
         cam = bpy.context.object
         cam.name = "Cito_iPhone_Camera"
+        tag_cito(cam, 'CAMERA', 'IPHONE')
         
         # Set lens based on the currently selected zoom mode
-        if scene.iphone_camera_zoom_mode == 'WIDE':
-            cam.data.lens = scene.iphone_camera_wide_zoom
-        elif scene.iphone_camera_zoom_mode == 'ULTRA_WIDE':
-            cam.data.lens = scene.iphone_camera_ultra_wide_zoom
-        elif scene.iphone_camera_zoom_mode == 'TELEPHOTO':
-            cam.data.lens = scene.iphone_camera_telephoto_zoom
+        cam.data.lens = iphone_lens(scene)
 
         # Set this camera as the active camera
         scene.camera = cam
@@ -192,7 +264,7 @@ class ToggleIphoneCameraOrientation(Operator):
     def execute(self, context):
         cam = context.scene.camera
         scene = context.scene
-        if cam and cam.name.startswith("Cito_"):
+        if is_cito_camera(cam):
             # Toggle orientation based on the custom property
             if cam.get("is_vertical", False):  # Currently in portrait mode
                 # Switch to landscape orientation
@@ -224,46 +296,92 @@ class CitoViewSelectedCamera(bpy.types.Operator):
     bl_idname = "view3d.cito_view_selected_camera"
     bl_label = "View from Selected Camera"
     
+    camera_name: StringProperty(
+        name="Camera",
+        description="Camera to view from (default: the active object)",
+        default="",
+    )
+
     def execute(self, context):
-        # Check if the selected object is a camera
-        obj = context.object
+        # Check if the selected object (or the named camera) is a camera
+        obj = bpy.data.objects.get(self.camera_name) if self.camera_name else context.object
         if obj and obj.type == 'CAMERA':
             context.scene.camera = obj
-            bpy.ops.view3d.object_as_camera()
+            view_through_camera(context)
             self.report({'INFO'}, f"Switched to view from '{obj.name}'")
         else:
             self.report({'WARNING'}, "No camera selected!")
         return {'FINISHED'}
 
+class VIEW3D_OT_CitoRefreshThumbnails(Operator):
+    bl_idname = "view3d.cito_refresh_thumbnails"
+    bl_label = "Refresh Thumbnails"
+    bl_description = "Render every camera thumbnail again, e.g. after the scene geometry changed"
+
+    def execute(self, context):
+        # Thumbnails are keyed by the camera view only; the panel queues them again on its next draw
+        thumbnails.thumbnail_cache.clear()
+        for area in context.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoImportCameraStations(Operator):
+    bl_idname = "view3d.cito_import_camera_stations"
+    bl_label = "Import Camera Stations"
+    bl_description = "Create many Cito cameras at once from a CSV/JSON station list (x, y, z, heading, type)"
+
+    filepath: StringProperty(subtype='FILE_PATH')
+    filter_glob: StringProperty(default="*.csv;*.json", options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            stations = list(read_camera_stations(self.filepath))
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, f"Could not read camera stations: {error}")
+            return {'CANCELLED'}
+
+        if not stations:
+            self.report({'WARNING'}, "No camera stations found in file.")
+            return {'CANCELLED'}
+
+        # Use the lens of the current iPhone zoom mode, like the single iPhone camera operator
+        scene = context.scene
+        cameras = create_camera_stations(stations, scene=scene, iphone_lens=iphone_lens(scene))
+        self.report({'INFO'}, f"Created {len(cameras)} camera stations in '{cameras[0].users_collection[0].name}'.")
+        return {'FINISHED'}
+
 class VIEW3D_OT_CitoCreateAnimationSetup(Operator):
     bl_idname = "view3d.cito_create_animation_setup"
     bl_label = "Create Animation Setup"
     bl_description = "Creates a circular path animation with a camera and an empty target, organized within a single collection"
 
     def execute(self, context):
-        # Define base name for the collection
-        base_collection_name = "Cito_Camera_Setup"
-        suffix = 1
-
-        # Find a new name for the collection by incrementing the suffix
-        while bpy.data.collections.get(f"{base_collection_name}_{suffix:03}"):
-            suffix += 1
+        # Next free index for the collection, shared by the target, path and camera names
+        suffix = cito_unique_index("Cito_Camera_Setup", kind="collections")
 
         # Create the new collection for this animation setup
-        collection_name = f"{base_collection_name}_{suffix:03}"
+        collection_name = f"Cito_Camera_Setup_{suffix:03}"
         camera_collection = bpy.data.collections.new(collection_name)
+        tag_cito(camera_collection, 'SETUP')
         context.scene.collection.children.link(camera_collection)
 
         # Create an empty object as the camera target and link it to the camera collection
         bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0))
         target_empty = context.active_object
         target_empty.name = f"Cito_Target_{suffix:03}"
+        tag_cito(target_empty, 'TARGET')
         camera_collection.objects.link(target_empty)
 
         # Create a circular curve path in the XY plane and link it to the camera collection
         bpy.ops.curve.primitive_bezier_circle_add(radius=100, location=(0, 0, 0))
         path = context.active_object
         path.name = f"Cito_Camera_Path_{suffix:03}"
+        tag_cito(path, 'PATH')
         path.rotation_euler = (0, 0, 0)  # Ensure path lies in XY plane
         camera_collection.objects.link(path)
 
@@ -271,6 +389,7 @@ class VIEW3D_OT_CitoCreateAnimationSetup(Operator):
         bpy.ops.object.camera_add(location=(0, 0, 0))
         camera = context.active_object
         camera.name = f"Cito_Animated_Camera_{suffix:03}"
+        tag_cito(camera, 'CAMERA', 'ANIMATED')
         camera_collection.objects.link(camera)
 
         # Unlink the objects from the scene collection if they are automatically added there
@@ -285,6 +404,7 @@ class VIEW3D_OT_CitoCreateAnimationSetup(Operator):
         follow_path = camera.constraints.new(type='FOLLOW_PATH')
         follow_path.target = path
         follow_path.use_curve_follow = True
+        tag_follow_path(camera, follow_path)
 
         track_to = camera.constraints.new(type='TRACK_TO')
         track_to.target = target_empty
@@ -316,11 +436,7 @@ class OBJECT_OT_AnimateFollowPath(Operator):
             self.report({'ERROR'}, "No active object selected.")
             return {'CANCELLED'}
 
-        follow_path = None
-        for constraint in obj.constraints:
-            if constraint.type == 'FOLLOW_PATH':
-                follow_path = constraint
-                break
+        follow_path = follow_path_constraint(obj)
 
         if follow_path is None:
             self.report({'ERROR'}, "No 'Follow Path' constraint found.")
@@ -342,68 +458,189 @@ class VIEW3D_OT_UseSelectedCurveToAnimateCamera(Operator):
             self.report({'ERROR'}, "Please select a curve (NURBS, Bezier, etc.)")
             return {'CANCELLED'}
 
-        # Create a unique collection for organizing elements
-        collection_name = f"Cito_Curve_Animation_Setup_{len(bpy.data.collections)}"
-        animation_collection = bpy.data.collections.new(collection_name)
-        context.scene.collection.children.link(animation_collection)
+        # Set frame range for the animation; the rig makes one trip along the curve over it
+        context.scene.frame_start = 1
+        context.scene.frame_end = 250
+        collection = create_curve_rig(selected_obj, context.scene, 1, 250)[0]
 
-        # Create the camera
-        bpy.ops.object.camera_add(location=(0, 0, 0))
-        camera = context.active_object
-        camera.name = "Cito_Animated_Curve_Camera"
+        self.report({'INFO'}, f"Animation setup created with curve path in collection {collection.name}.")
+        return {'FINISHED'}
 
-        # Ensure the camera is first in the Scene Collection
-        if camera.name not in context.scene.collection.objects:
-            context.scene.collection.objects.link(camera)
+    
+class VIEW3D_OT_CitoImportTracks(Operator):
+    bl_idname = "view3d.cito_import_tracks"
+    bl_label = "Import GPS Tracks"
+    bl_description = "Import GPX/CSV/GeoJSON tracks as simplified path curves, optionally with a camera rig each. Esc cancels"
 
-        # Link the camera to the new animation collection
-        if camera.name not in animation_collection.objects:
-            animation_collection.objects.link(camera)
-        
-        # Unlink the camera from the Scene Collection if necessary
-        context.scene.collection.objects.unlink(camera)
+    files: CollectionProperty(type=OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'})
+    directory: StringProperty(subtype='DIR_PATH')
+    filter_glob: StringProperty(default="*.gpx;*.csv;*.txt;*.geojson;*.json", options={'HIDDEN'})
+    tolerance: FloatProperty(name="Tolerance", description="Douglas-Peucker tolerance in metres; points closer than this to the simplified line are dropped", default=1.0, min=0.0)
+    scale: FloatProperty(name="Scale", description="Scene units per metre", default=1.0, min=0.0001)
+    use_elevation: BoolProperty(name="Elevation", description="Use the recorded elevation for Z, otherwise flatten the tracks", default=True)
+    add_rig: BoolProperty(name="Camera Rigs", description="Add a camera rig to every track, timed by its timestamps", default=False)
 
-        # Add a Follow Path constraint to the camera
-        follow_path = camera.constraints.new(type='FOLLOW_PATH')
-        follow_path.target = selected_obj
-        follow_path.use_curve_follow = True  # Follow curve orientation
-        follow_path.forward_axis = 'FORWARD_X'
-        follow_path.up_axis = 'UP_Y'
+    _timer = None
+    _import = None
+    _collection = None
+    _frame_end = 0
 
-        # Create a target in front of the camera, attached to the path
-        bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0))
-        target_empty = context.active_object
-        target_empty.name = "Cito_Target_Curve"
-        animation_collection.objects.link(target_empty)
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
 
-        # Attach the target to the same path (optional: offset it slightly forward)
-        target_constraint = target_empty.constraints.new(type='FOLLOW_PATH')
-        target_constraint.target = selected_obj
-        target_constraint.use_curve_follow = True
-        target_constraint.offset = -0.1  # Offset target slightly in front of the camera
+    def execute(self, context):
+        filepaths = [os.path.join(self.directory, file.name) for file in self.files if file.name.lower().endswith(trajectories.TRACK_EXTENSIONS)]
+        if not filepaths:
+            self.report({'ERROR'}, "No GPX, CSV or GeoJSON files selected.")
+            return {'CANCELLED'}
 
-        # Make the camera track the empty target
-        track_to = camera.constraints.new(type='TRACK_TO')
-        track_to.target = target_empty
-        track_to.track_axis = 'TRACK_NEGATIVE_Z'
-        track_to.up_axis = 'UP_Y'
+        # Parsing runs on a worker thread; curves are built from the timer so Blender stays responsive
+        self._import = trajectories.TrackImport(filepaths, trajectories.geo_origin(context.scene), self.tolerance, self.scale, self.use_elevation)
+        self._collection = bpy.data.collections.new(cito_unique_name("Cito_Tracks", kind="collections"))
+        context.scene.collection.children.link(self._collection)
+        self._frame_end = context.scene.frame_end
+        self._timer = context.window_manager.event_timer_add(0.05, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
 
-        # Set frame range for the animation
-        context.scene.frame_start = 1
-        context.scene.frame_end = 250
-        selected_obj.data.path_duration = 250  # Set the path duration for a smooth loop
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish(context, cancelled=True)
 
-        # Keyframe the Follow Path constraint's offset_factor for a complete loop
-        follow_path.offset_factor = 0  # Start of the path
-        follow_path.keyframe_insert(data_path="offset_factor", frame=context.scene.frame_start)
-        
-        follow_path.offset_factor = 1  # End of the path (full circle)
-        follow_path.keyframe_insert(data_path="offset_factor", frame=context.scene.frame_end)
+        if event.type == 'TIMER':
+            scene = context.scene
+            for name, points, times in self._import.finished_tracks(scene.render_tick_budget / 1000.0):
+                if "cito_geo_origin" not in scene:
+                    scene["cito_geo_origin"] = list(self._import.origin)
+                curve_obj = trajectories.create_track_curve(trajectories.track_curve_name(name), points, times, self._collection)
+                if self.add_rig:
+                    self._frame_end = max(self._frame_end, trajectories.rig_track(curve_obj, scene)[1])
+            stats = self._import.stats
+            context.workspace.status_text_set(f"Cito tracks: {stats['tracks']} imported from {stats['files']} file(s), "
+                                              f"{stats['kept']}/{stats['points']} points kept. Esc to cancel")
+            if self._import.done:
+                return self.finish(context, cancelled=False)
+
+        return {'PASS_THROUGH'}
 
-        self.report({'INFO'}, f"Animation setup created with curve path in collection {collection_name}.")
+    def finish(self, context, cancelled):
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+        self._import.cancel()
+        context.scene.frame_end = self._frame_end
+        stats = self._import.stats
+        for error in stats["errors"]:
+            self.report({'WARNING'}, f"Skipped {error}")
+        message = f"{stats['tracks']} track(s) in '{self._collection.name}', {stats['kept']} of {stats['points']} points kept."
+        if cancelled:
+            self.report({'WARNING'}, f"Import cancelled: {message}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Imported {message}")
+        return {'FINISHED'}
+
+def route_network(context):
+    obj = context.active_object
+    return obj if obj is not None and obj.type in {'CURVE', 'MESH'} else None
+
+class VIEW3D_OT_CitoFindRoute(Operator):
+    bl_idname = "view3d.cito_find_route"
+    bl_label = "Find Route"
+    bl_description = "Shortest route over the active street network (curve or mesh) from the 3D cursor to every other selected object, as path curves with a camera rig each"
+
+    speed: FloatProperty(name="Speed", description="Travel speed in scene units per second; sets the rig's frame range", default=1.4, min=0.01)
+    merge_distance: FloatProperty(name="Merge Distance", description="Street ends closer than this are joined into one crossing", default=0.01, min=0.0001)
+    add_rig: BoolProperty(name="Camera Rig", description="Add a camera rig to every route", default=True)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        network = route_network(context)
+        destinations = [obj for obj in context.selected_objects if obj != network]
+        if network is None or not destinations:
+            self.report({'ERROR'}, "Make the street network (curve or mesh) active and select the destination objects; the route starts at the 3D cursor.")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        try:
+            graph = routing.route_graph(network, context.evaluated_depsgraph_get(), self.merge_distance)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        origin = tuple(scene.cursor.location)
+        ends = [tuple(obj.matrix_world.translation) for obj in destinations]
+        origin_node = graph.nearest_node(origin)
+        if len(ends) == 1:
+            routes = [routing.shortest_path(graph, origin_node, graph.nearest_node(ends[0]))]
+        else:
+            routes = routing.solve_routes(graph, [(origin_node, graph.nearest_node(end)) for end in ends])
+
+        found = 0
+        for destination, end, (nodes, length) in zip(destinations, ends, routes):
+            if nodes is None:
+                self.report({'WARNING'}, f"No route to '{destination.name}': it is not connected to the cursor's part of the network")
+                continue
+            points = routing.route_points(graph, nodes, origin, end)
+            curve_obj = routing.create_route_curve(cito_unique_name("Cito_Route"), points, self.speed)
+            if self.add_rig:
+                scene.frame_end = max(scene.frame_end, trajectories.rig_track(curve_obj, scene)[1])
+            found += 1
+        if not found:
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{found} route(s) over {graph.node_count} nodes / {graph.edge_count} streets")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoRouteBatch(Operator):
+    bl_idname = "view3d.cito_route_batch"
+    bl_label = "Batch Routes"
+    bl_description = "Solve many origin-destination pairs from a CSV (ox, oy, [oz,] dx, dy, [dz]) over the active street network and write their lengths to a CSV next to it"
+
+    filepath: StringProperty(subtype='FILE_PATH')
+    filter_glob: StringProperty(default="*.csv;*.txt", options={'HIDDEN'})
+    speed: FloatProperty(name="Speed", description="Travel speed in scene units per second, timing the route curves", default=1.4, min=0.01)
+    merge_distance: FloatProperty(name="Merge Distance", description="Street ends closer than this are joined into one crossing", default=0.01, min=0.0001)
+    add_curves: BoolProperty(name="Route Curves", description="Add a path curve for every route found", default=True)
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        network = route_network(context)
+        if network is None:
+            self.report({'ERROR'}, "Make the street network (curve or mesh) the active object first.")
+            return {'CANCELLED'}
+        try:
+            pairs = routing.read_od_pairs(bpy.path.abspath(self.filepath))
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, f"Could not read the origin-destination pairs: {error}")
+            return {'CANCELLED'}
+        if not pairs:
+            self.report({'ERROR'}, "No origin-destination pairs found in the file.")
+            return {'CANCELLED'}
+        try:
+            graph = routing.route_graph(network, context.evaluated_depsgraph_get(), self.merge_distance)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        routes = routing.solve_routes(graph, [(graph.nearest_node(origin), graph.nearest_node(end)) for origin, end in pairs])
+        names = [None] * len(pairs)
+        if self.add_curves:
+            collection = bpy.data.collections.new(cito_unique_name("Cito_Routes", kind="collections"))
+            context.scene.collection.children.link(collection)
+            for i, ((origin, end), (nodes, length)) in enumerate(zip(pairs, routes)):
+                if nodes is not None:
+                    points = routing.route_points(graph, nodes, origin, end)
+                    names[i] = routing.create_route_curve(cito_unique_name("Cito_Route"), points, self.speed, collection).name
+
+        table_path = os.path.splitext(bpy.path.abspath(self.filepath))[0] + "_routes.csv"
+        routing.write_route_table(table_path, pairs, routes, names)
+        found = sum(1 for nodes, length in routes if nodes is not None)
+        self.report({'INFO'}, f"{found} of {len(pairs)} routes found, lengths written to {table_path}")
         return {'FINISHED'}
 
-    
 class OBJECT_OT_AnimateNURBSPath(Operator):
     """Animate Camera Along NURBS Path"""
     bl_idname = "object.animate_nurbs_path"
@@ -417,11 +654,7 @@ class OBJECT_OT_AnimateNURBSPath(Operator):
             return {'CANCELLED'}
 
         # Find the 'Follow Path' constraint
-        follow_path = None
-        for constraint in obj.constraints:
-            if constraint.type == 'FOLLOW_PATH':
-                follow_path = constraint
-                break
+        follow_path = follow_path_constraint(obj)
 
         if follow_path is None:
             self.report({'ERROR'}, "No 'Follow Path' constraint found.")
@@ -432,6 +665,233 @@ class OBJECT_OT_AnimateNURBSPath(Operator):
         self.report({'INFO'}, "Path animation applied.")
         return {'FINISHED'}
 
+class OBJECT_OT_CitoConstantSpeedPath(Operator):
+    bl_idname = "object.cito_constant_speed_path"
+    bl_label = "Constant Speed"
+    bl_description = "Re-time the active camera's Follow Path so it moves at true constant speed along the curve"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    speed: FloatProperty(
+        name="Speed",
+        description="Travel speed in scene units per second (0 keeps the current frame range)",
+        default=0.0,
+        min=0.0,
+    )
+    target_lead: FloatProperty(
+        name="Target Lead",
+        description="Distance the path target stays ahead of the camera",
+        default=1.0,
+        min=0.0,
+    )
+    oversample: IntProperty(
+        name="Oversample",
+        description="Extra samples per tessellated curve point used to measure the true arc length",
+        default=8,
+        min=1,
+        max=64,
+    )
+
+    def execute(self, context):
+        obj = context.active_object
+        if obj is None:
+            self.report({'ERROR'}, "No active object selected.")
+            return {'CANCELLED'}
+
+        follow_path = curves.find_follow_path(obj)
+        if follow_path is None:
+            self.report({'ERROR'}, "No 'Follow Path' constraint with a curve target found.")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        table = curves.arc_length_table(follow_path.target, self.oversample)
+        if table is None or table.total_length <= 0.0:
+            self.report({'ERROR'}, "The path curve has no length.")
+            return {'CANCELLED'}
+        total_length = table.total_length * curves.world_length_scale(follow_path.target)
+
+        # The frame range follows from the travel time when a speed is given
+        if self.speed > 0.0:
+            fps = scene.render.fps / scene.render.fps_base
+            scene.frame_end = scene.frame_start + max(1, round(total_length / self.speed * fps))
+
+        frames = np.arange(scene.frame_start, scene.frame_end + 1)
+        distances = np.linspace(0.0, total_length, len(frames))
+        curves.drive_at_distances(obj, follow_path, frames, distances, self.target_lead, self.oversample)
+
+        self.report({'INFO'}, f"'{obj.name}' re-timed: {total_length:.1f} units over {len(frames)} frames.")
+        return {'FINISHED'}
+
+class OBJECT_OT_CitoSpeedProfile(Operator):
+    bl_idname = "object.cito_speed_profile"
+    bl_label = "Speed Profile"
+    bl_description = "Re-time the active camera's Follow Path from a speed profile (cruise speed with stops and acceleration limits, or recorded GPS speeds). The frame range becomes the travel time"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    profile: EnumProperty(
+        name="Profile",
+        items=[
+            ('WALK', "Walking", "Walking pace, 1.4 units per second"),
+            ('CRUISE', "Cruise Speed", "Travel at the given speed"),
+            ('GPS', "GPS Timestamps", "Speeds recorded in an imported GPS track"),
+        ],
+        default='WALK',
+    )
+    speed: FloatProperty(name="Speed", description="Cruise speed in scene units per second", default=5.0, min=0.01)
+    acceleration: FloatProperty(name="Acceleration", description="Largest speed gain per second (0 = instant)", default=0.5, min=0.0)
+    braking: FloatProperty(name="Braking", description="Largest speed loss per second (0 = instant)", default=0.8, min=0.0)
+    stop_seconds: FloatProperty(name="Stop Duration", description="Seconds spent at every stop marked on the path", default=10.0, min=0.0)
+    from_rest: BoolProperty(name="Start and End at Rest", description="Accelerate from a standstill and brake to one at the end", default=True)
+    target_lead: FloatProperty(name="Target Lead", description="Distance the path target stays ahead of the camera", default=1.0, min=0.0)
+
+    def execute(self, context):
+        obj = context.active_object
+        follow_path = curves.find_follow_path(obj) if obj is not None else None
+        if follow_path is None:
+            self.report({'ERROR'}, "The active object needs a 'Follow Path' constraint with a curve target.")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        curve_obj = follow_path.target
+        table = curves.arc_length_table(curve_obj)
+        if table is None or table.total_length <= 0.0:
+            self.report({'ERROR'}, "The path curve has no length.")
+            return {'CANCELLED'}
+        length = table.total_length * curves.world_length_scale(curve_obj)
+
+        if self.profile == 'GPS':
+            try:
+                profile = speed_profiles.gps_profile(curve_obj, self.acceleration, self.braking)
+            except ValueError as error:
+                self.report({'ERROR'}, str(error))
+                return {'CANCELLED'}
+        else:
+            speed = 1.4 if self.profile == 'WALK' else self.speed
+            profile = speed_profiles.cruise_profile(length, speed, speed_profiles.path_stops(curve_obj), self.stop_seconds,
+                                                    self.acceleration, self.braking, self.from_rest)
+
+        fps = scene.render.fps / scene.render.fps_base
+        frames, distances = speed_profiles.frame_distances(*profile, fps, scene.frame_start)
+        scene.frame_end = int(frames[-1])
+        curves.drive_at_distances(obj, follow_path, frames, distances, self.target_lead)
+        self.report({'INFO'}, f"'{obj.name}' re-timed: {length:.1f} units in {profile[0][-1]:.1f}s ({len(frames)} frames).")
+        return {'FINISHED'}
+
+class OBJECT_OT_CitoPathStop(Operator):
+    bl_idname = "object.cito_path_stop"
+    bl_label = "Path Stop"
+    bl_description = "Mark a stop on the active camera's path (or the active curve) at the point closest to the 3D cursor, or clear its stops"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    action: EnumProperty(
+        items=[
+            ('ADD', "Add", "Add a stop at the path point closest to the 3D cursor"),
+            ('CLEAR', "Clear", "Remove every stop from the path"),
+        ],
+    )
+
+    def execute(self, context):
+        obj = context.active_object
+        follow_path = curves.find_follow_path(obj) if obj is not None else None
+        curve_obj = follow_path.target if follow_path is not None else obj
+        if curve_obj is None or curve_obj.type != 'CURVE':
+            self.report({'ERROR'}, "Select a camera riding a path, or the path curve itself.")
+            return {'CANCELLED'}
+
+        if self.action == 'CLEAR':
+            speed_profiles.clear_path_stops(curve_obj)
+            self.report({'INFO'}, f"Stops cleared on '{curve_obj.name}'.")
+        else:
+            distance = speed_profiles.add_path_stop(curve_obj, context.scene.cursor.location)
+            self.report({'INFO'}, f"Stop added {distance:.1f} units along '{curve_obj.name}' ({len(speed_profiles.path_stops(curve_obj))} in total).")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoBakeNavigation(Operator):
+    bl_idname = "view3d.cito_bake_navigation"
+    bl_label = "Bake Navigation"
+    bl_description = "Evaluate the selected camera rigs once over the frame range, write dense keyframes and turn the constraints off"
+
+    def execute(self, context):
+        objects = context.selected_objects or ([context.active_object] if context.active_object else [])
+        rig = navigation_rig_objects(objects)
+        if not rig:
+            self.report({'ERROR'}, "Select a camera rig with Follow Path / Track To constraints.")
+            return {'CANCELLED'}
+
+        baked = bake_navigation(context.scene, rig)
+        if not baked:
+            self.report({'WARNING'}, "Selected rigs are already baked, or their location/rotation is keyed by hand.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Baked {len(baked)} object(s) over frames {context.scene.frame_start}-{context.scene.frame_end}.")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoUnbakeNavigation(Operator):
+    bl_idname = "view3d.cito_unbake_navigation"
+    bl_label = "Unbake Navigation"
+    bl_description = "Remove baked keyframes and bring the live Follow Path / Track To rig back"
+
+    def execute(self, context):
+        objects = context.selected_objects or ([context.active_object] if context.active_object else [])
+        # Unbake the targets together with their cameras, like the bake did
+        restored = unbake_navigation(set(objects) | set(navigation_rig_objects(objects)))
+        if not restored:
+            self.report({'WARNING'}, "No baked navigation found on the selection.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Restored live rig on {len(restored)} object(s).")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoExportTrajectories(Operator):
+    bl_idname = "view3d.cito_export_trajectories"
+    bl_label = "Export Trajectories"
+    bl_description = "Write the per-frame position, rotation, lens and target of the selected cameras (or every Cito rig) over the frame range to one binary file"
+
+    filepath: StringProperty(subtype='FILE_PATH', default="cito_trajectories" + trajectory_io.EXTENSION)
+    filter_glob: StringProperty(default="*" + trajectory_io.EXTENSION, options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        scene = context.scene
+        cameras = [obj for obj in context.selected_objects if obj.type == 'CAMERA'] or [camera for _, camera in find_cito_setups()]
+        if not cameras:
+            self.report({'ERROR'}, "Select cameras, or create a Cito animation setup first.")
+            return {'CANCELLED'}
+        filepath = bpy.path.ensure_ext(bpy.path.abspath(self.filepath), trajectory_io.EXTENSION)
+        try:
+            count = trajectory_io.export_trajectories(scene, cameras, filepath, scene.frame_start, scene.frame_end)
+        except OSError as error:
+            self.report({'ERROR'}, f"Could not write the trajectories: {error}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Wrote {count} frames of {len(cameras)} camera(s) to {filepath}")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoImportTrajectories(Operator):
+    bl_idname = "view3d.cito_import_trajectories"
+    bl_label = "Import Trajectories"
+    bl_description = "Create baked cameras (and targets) from a trajectory file and set the frame range to it"
+
+    filepath: StringProperty(subtype='FILE_PATH')
+    filter_glob: StringProperty(default="*" + trajectory_io.EXTENSION, options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        scene = context.scene
+        try:
+            cameras, frame_start, frame_end = trajectory_io.import_trajectories(bpy.path.abspath(self.filepath), scene)
+        except (OSError, ValueError, KeyError) as error:
+            self.report({'ERROR'}, f"Could not read the trajectories: {error}")
+            return {'CANCELLED'}
+        scene.frame_start = frame_start
+        scene.frame_end = frame_end
+        if cameras:
+            scene.camera = cameras[0]
+        self.report({'INFO'}, f"Imported {len(cameras)} camera(s), frames {frame_start}-{frame_end}")
+        return {'FINISHED'}
+
 # Operator for Viewport Render Animation with .avi output and JPEG codec
 class VIEW3D_OT_CitoViewportRenderAnimation(bpy.types.Operator):
     bl_idname = "view3d.cito_viewport_render_animation"
@@ -446,8 +906,11 @@ class VIEW3D_OT_CitoViewportRenderAnimation(bpy.types.Operator):
         
         # Check the user's selection for output type
         if scene.animation_output_type == 'FRAMES':
-            # Set output format to PNG sequence
+            # Set output format to PNG sequence, rendered frame by frame so it can resume after a crash
             scene.render.image_settings.file_format = 'PNG'
+            if len(rendering.render_cameras(context)) > 1:
+                return self.render_multi_camera(context)
+            return self.render_frames(context)
         elif scene.animation_output_type == 'AVI':
             # Set output format to AVI with JPEG codec
             scene.render.image_settings.file_format = 'AVI_JPEG'
@@ -458,6 +921,449 @@ class VIEW3D_OT_CitoViewportRenderAnimation(bpy.types.Operator):
         self.report({'INFO'}, f"Viewport animation rendering started as {scene.animation_output_type}")
         return {'FINISHED'}
 
+    def render_frames(self, context):
+        scene = context.scene
+        directory = bpy.path.abspath(scene.frame_output_directory)
+        manifest = rendering.FrameManifest(directory)
+        frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+        if not scene.render_resume and not scene.render_incremental:
+            manifest.frames.clear()
+
+        keys = None
+        if scene.render_incremental and scene.camera is not None:
+            keys = rendering.compute_frame_keys(scene, scene.camera, frames, context.view_layer)
+
+        def render_frame(frame, filepath):
+            scene.frame_set(frame)
+            bpy.ops.render.opengl()
+            bpy.data.images["Render Result"].save_render(filepath, scene=scene)
+
+        frame_current = scene.frame_current
+        try:
+            # Same file names the animation render would use
+            stats = rendering.render_incremental(
+                manifest, frames, render_frame, lambda frame: scene.render.frame_path(frame=frame),
+                keys=keys, checksum=scene.render_verify_checksums,
+            )
+        finally:
+            scene.frame_set(frame_current)
+
+        self.report({'INFO'}, f"Rendered {stats['rendered']} frame(s), linked {stats['linked']}, {stats['skipped']} already finished.")
+        return {'FINISHED'}
+
+    def render_multi_camera(self, context):
+        # One scene evaluation per frame, drawn offscreen from every camera; PNG frames per camera subfolder
+        # whatever the writer format, since the Frames output promises PNG. Incremental renders key each
+        # camera's frames in its own manifest.
+        try:
+            job = rendering.PipelinedRenderJob(context, writer_format='PNG', incremental=context.scene.render_incremental)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        try:
+            while not job.finished:
+                job.render_next(context.evaluated_depsgraph_get())
+        finally:
+            stats = finish_render_job(self, job)
+        if stats is None:
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Rendered {job.drawn} view(s) of {len(job.frames)} frame(s) from {len(job.cameras)} cameras.")
+        return {'FINISHED'}
+
+
+def finish_render_job(operator, job):
+    # Writer errors surface when the job finishes; the frames written before them are kept
+    try:
+        return job.finish()
+    except Exception as error:
+        operator.report({'ERROR'}, f"Frames could not be written: {error}")
+        return None
+
+class VIEW3D_OT_CitoPipelinedRenderAnimation(bpy.types.Operator):
+    bl_idname = "view3d.cito_pipelined_render_animation"
+    bl_label = "Pipelined Render Animation"
+    bl_description = "Render the scene camera (and the selected cameras) offscreen while writer threads encode and store earlier frames"
+
+    def execute(self, context):
+        try:
+            job = rendering.PipelinedRenderJob(context)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        try:
+            while not job.finished:
+                job.render_next(context.evaluated_depsgraph_get())
+        finally:
+            stats = finish_render_job(self, job)
+        if stats is None:
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Rendered {job.drawn} view(s) of {len(job.frames)} frame(s) from {len(job.cameras)} camera(s): writers {stats['fps']:.1f} fps, {stats['mb_per_second']:.1f} MB/s, "
+                              f"drawing waited {stats['wait_seconds']:.1f}s on the queue.")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoModalRenderAnimation(bpy.types.Operator):
+    bl_idname = "view3d.cito_modal_render_animation"
+    bl_label = "Render Animation (Background)"
+    bl_description = "Render the animation a few frames per timer tick, keeping Blender responsive. Esc cancels"
+
+    _timer = None
+    _job = None
+
+    def invoke(self, context, event):
+        if rendering.render_progress.get("running"):
+            self.report({'WARNING'}, "A Cito render is already running.")
+            return {'CANCELLED'}
+        try:
+            self._job = rendering.PipelinedRenderJob(context)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        rendering.render_progress.clear()
+        rendering.render_progress.update({"running": True, "paused": False, "cancel": False, **self._job.progress()})
+        self._timer = context.window_manager.event_timer_add(0.02, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        progress = rendering.render_progress
+        if event.type == 'ESC' or progress.get("cancel"):
+            return self.finish(context, cancelled=True)
+
+        if event.type == 'TIMER' and not progress.get("paused"):
+            # Render frames until this tick's time budget is used up, then give the UI back
+            budget = context.scene.render_tick_budget / 1000.0
+            started = time.perf_counter()
+            while not self._job.finished and time.perf_counter() - started < budget:
+                self._job.render_next(context.evaluated_depsgraph_get())
+            progress.update(self._job.progress())
+            progress["queued"] = self._job.writer.pending()
+            for area in context.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+            if self._job.finished:
+                return self.finish(context, cancelled=False)
+
+        return {'PASS_THROUGH'}
+
+    def finish(self, context, cancelled):
+        # The timer and the progress state are reset even when the writers failed, or every later
+        # render would be refused as "already running"
+        try:
+            stats = finish_render_job(self, self._job)
+        finally:
+            context.window_manager.event_timer_remove(self._timer)
+            rendering.render_progress.update({"running": False, "paused": False, "cancel": False})
+        done = self._job.index
+        if stats is None:
+            return {'CANCELLED'}
+        if cancelled:
+            self.report({'WARNING'}, f"Render cancelled after {done} frame(s); finished frames are kept.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Rendered {done} frame(s) at {stats['fps']:.1f} fps.")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoRenderControl(bpy.types.Operator):
+    bl_idname = "view3d.cito_render_control"
+    bl_label = "Render Control"
+    bl_description = "Pause, resume or cancel the running background render"
+
+    action: EnumProperty(
+        items=[
+            ('PAUSE', "Pause", "Pause after the current frame"),
+            ('RESUME', "Resume", "Continue rendering"),
+            ('CANCEL', "Cancel", "Stop rendering and keep the finished frames"),
+        ],
+    )
+
+    def execute(self, context):
+        progress = rendering.render_progress
+        if not progress.get("running"):
+            return {'CANCELLED'}
+        if self.action == 'CANCEL':
+            progress["cancel"] = True
+        else:
+            progress["paused"] = self.action == 'PAUSE'
+        return {'FINISHED'}
+
+
+class VIEW3D_OT_CitoSectionStack(Operator):
+    bl_idname = "view3d.cito_section_stack"
+    bl_label = "Render Section Stack"
+    bl_description = "Sweep the section-ortho camera's cut plane along its view axis and render one image per slice"
+
+    count: IntProperty(name="Slices", description="Number of parallel sections", default=50, min=1, max=5000)
+    start: FloatProperty(name="First Cut", description="Distance of the first cut plane in front of the camera", default=0.0, min=0.0, unit='LENGTH')
+    step: FloatProperty(name="Step", description="Distance between neighbouring cut planes", default=1.0, min=0.001, unit='LENGTH')
+    depth: FloatProperty(name="View Depth", description="How far each section looks beyond its cut plane", default=100.0, min=0.001, unit='LENGTH')
+    renderer: EnumProperty(
+        name="Renderer",
+        items=[
+            ('VIEWPORT', "Viewport", "OpenGL viewport render, in this session"),
+            ('FINAL', "Render Engine", "The scene's render engine, in this session or split across workers"),
+        ],
+        default='VIEWPORT',
+    )
+    workers: IntProperty(name="Workers", description="Background processes the slices are split across when using the render engine (1 = in this session)", default=1, min=1, max=64)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        camera = context.active_object
+        if camera is None or camera.type != 'CAMERA' or camera.data.type != 'ORTHO':
+            section_cameras = cito_index.items('CAMERA', 'SECTION_ORTHO')
+            camera = section_cameras[0] if section_cameras else None
+        if camera is None:
+            self.report({'ERROR'}, "Select an orthographic camera or add a Section-Ortho camera first.")
+            return {'CANCELLED'}
+
+        directory = os.path.join(bpy.path.abspath(context.scene.frame_output_directory), f"sections_{bpy.path.clean_name(camera.name)}")
+        try:
+            index_path, rendered = sections.render_section_stack(context, camera, self.start, self.step, self.count, self.depth, directory,
+                                                                     self.workers, self.renderer)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Rendered {rendered} sections from '{camera.name}', index saved to {index_path}")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoTiledRender(Operator):
+    bl_idname = "view3d.cito_tiled_render"
+    bl_label = "Render Tiled Map"
+    bl_description = "Render an orthographic camera as a grid of tiles in background processes and stitch them into one large image. Unchanged tiles are reused"
+
+    scale: IntProperty(name="Scale", description="Output size as a multiple of the scene resolution", default=4, min=1, max=256)
+    columns: IntProperty(name="Columns", description="Tiles across the frame", default=4, min=1, max=512)
+    rows: IntProperty(name="Rows", description="Tiles down the frame", default=4, min=1, max=512)
+    workers: IntProperty(name="Workers", description="Background processes the tiles are split across", default=4, min=1, max=64)
+    restart: BoolProperty(name="Restart", description="Render every tile again instead of reusing finished ones", default=False)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        camera = context.active_object
+        if camera is None or camera.type != 'CAMERA' or camera.data.type != 'ORTHO':
+            top_cameras = cito_index.items('CAMERA', 'TOP_ORTHO')
+            camera = top_cameras[0] if top_cameras else None
+        if camera is None:
+            self.report({'ERROR'}, "Select an orthographic camera or add a Top-Ortho camera first.")
+            return {'CANCELLED'}
+
+        output = bpy.path.abspath(context.scene.frame_output_directory)
+        stem = f"map_{bpy.path.clean_name(camera.name)}"
+        try:
+            filepath, rendered, total = tiles.render_tiled(
+                context, camera, self.scale, self.columns, self.rows, os.path.join(output, f"{stem}_tiles"),
+                os.path.join(output, f"{stem}.png"), self.workers, self.restart,
+            )
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Map saved to {filepath} ({rendered} of {total} tiles rendered, the rest reused)")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoSimulateAgents(Operator):
+    bl_idname = "view3d.cito_simulate_agents"
+    bl_label = "Simulate Agents"
+    bl_description = "Simulate pedestrians or vehicles moving along the selected curves (or all Cito paths) over the scene frame range, played back as instanced points"
+
+    count: IntProperty(name="Agents", description="Number of simulated agents", default=1000, min=1, max=1000000)
+    speed: FloatProperty(name="Speed", description="Mean desired speed in scene units per second (1.4 walking, 10 city traffic)", default=1.4, min=0.01)
+    speed_spread: FloatProperty(name="Speed Spread", description="Standard deviation of the desired speed, as a fraction of the mean", default=0.3, min=0.0, max=2.0)
+    min_gap: FloatProperty(name="Spacing", description="Distance kept to the agent ahead on the same path", default=1.0, min=0.0)
+    acceleration: FloatProperty(name="Acceleration", description="Largest speed change per second", default=1.0, min=0.01)
+    stops_per_minute: FloatProperty(name="Stops / Minute", description="How often an agent stops, on average", default=0.0, min=0.0)
+    stop_seconds: FloatProperty(name="Stop Duration", description="Mean length of a stop in seconds", default=5.0, min=0.0)
+    seed: IntProperty(name="Seed", default=0, min=0)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        paths = [obj for obj in context.selected_objects if obj.type == 'CURVE']
+        paths = paths or [obj for obj in cito_index.items('PATH') if obj.type == 'CURVE']
+        try:
+            network = agents.PathNetwork(paths)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        simulation = agents.AgentSimulation(
+            network, self.count, self.speed, self.speed_spread, self.min_gap, self.acceleration,
+            self.stops_per_minute / 60.0, self.stop_seconds, self.seed,
+        )
+        name = cito_unique_name("Cito_Agents")
+        frame_count = scene.frame_end - scene.frame_start + 1
+        frames = agents.simulate(simulation, frame_count, scene.render.fps / scene.render.fps_base, agents.agents_cache_path(name))
+        obj = agents.create_agents_object(scene, frames, scene.frame_start, frames.filename, name)
+        self.report({'INFO'}, f"Simulated {self.count} agents on {len(network.names)} path(s) over {frame_count} frames into '{obj.name}'")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoVisibilityAnalysis(Operator):
+    bl_idname = "view3d.cito_visibility_analysis"
+    bl_label = "Visibility Analysis"
+    bl_description = "Cast ray fans from each camera pose along the animation and record which objects are visible, and for how long"
+
+    rays_x: IntProperty(name="Rays X", description="Rays across the camera frame", default=32, min=2, max=512)
+    rays_y: IntProperty(name="Rays Y", description="Rays down the camera frame", default=18, min=2, max=512)
+    frame_step: IntProperty(name="Frame Step", description="Analyse every n-th frame", default=1, min=1)
+    distance: FloatProperty(name="Max Distance", description="Longest sight line", default=10000.0, min=1.0)
+    workers: IntProperty(name="Workers", description="Background processes the frames are split across (1 = in this session)", default=1, min=1, max=64)
+    heat_overlay: BoolProperty(name="Heat Overlay", description="Write a 'Cito_Visibility' colour attribute on every visible mesh", default=False)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        camera = context.active_object if context.active_object and context.active_object.type == 'CAMERA' else scene.camera
+        if camera is None:
+            self.report({'ERROR'}, "Select a camera or set a scene camera.")
+            return {'CANCELLED'}
+
+        frames = list(range(scene.frame_start, scene.frame_end + 1, self.frame_step))
+        try:
+            result = analysis.analyse_visibility(context, camera, frames, self.rays_x, self.rays_y, self.distance, self.workers)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        directory = bpy.path.abspath(scene.frame_output_directory)
+        os.makedirs(directory, exist_ok=True)
+        filepath = result.export(os.path.join(directory, f"cito_visibility_{bpy.path.clean_name(camera.name)}.npz"), self.frame_step)
+        if self.heat_overlay:
+            analysis.write_heat_overlay(result.geometry, result.tri_hits)
+
+        top = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in result.top_objects(3, self.frame_step))
+        self.report({'INFO'}, f"Visibility over {len(frames)} frames saved to {filepath}. Most visible: {top or 'nothing'}")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoMovementHeatmap(Operator):
+    bl_idname = "view3d.cito_movement_heatmap"
+    bl_label = "Movement Heatmap"
+    bl_description = "Accumulate where all camera paths spend their time into a heatmap under the top-ortho camera. Only new or edited paths are sampled again"
+
+    resolution: IntProperty(name="Resolution", description="Heatmap pixels along the longer side", default=512, min=16, max=8192)
+    plane_height: FloatProperty(name="Plane Height", description="Height of the heatmap plane", default=0.1)
+    rebuild: BoolProperty(name="Rebuild", description="Sample every path again instead of updating the existing heatmap", default=False)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        camera = context.active_object
+        if camera is None or cito_camera_kind(camera) != 'TOP_ORTHO':
+            top_cameras = cito_index.items('CAMERA', 'TOP_ORTHO')
+            camera = top_cameras[0] if top_cameras else None
+        if camera is None:
+            self.report({'ERROR'}, "Add a Top-Ortho camera first, the heatmap covers its view.")
+            return {'CANCELLED'}
+
+        heatmap, added, removed = analysis.movement_heatmap(context, camera, self.resolution, rebuild=self.rebuild)
+        if not heatmap.paths:
+            self.report({'WARNING'}, "No camera paths found.")
+            return {'CANCELLED'}
+        analysis.write_heatmap_plane(context, camera, heatmap, self.plane_height)
+        self.report({'INFO'}, f"Heatmap of {len(heatmap.paths)} paths under {camera.name} ({added} sampled, {removed} removed)")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoClearanceCheck(Operator):
+    bl_idname = "view3d.cito_clearance_check"
+    bl_label = "Clearance Check"
+    bl_description = "Check the animated camera path against the scene geometry for minimum clearance and a clear view of its target. Optionally push the path out"
+
+    min_clearance: FloatProperty(name="Min Clearance", description="Closest the camera may get to any surface", default=2.0, min=0.0)
+    substeps: IntProperty(name="Substeps", description="Samples per frame", default=4, min=1, max=64)
+    line_of_sight: BoolProperty(name="Line of Sight", description="Also check that nothing blocks the view of the camera's target", default=True)
+    fix_path: BoolProperty(name="Push Path Out", description="Move the offending control points of the camera's path away from the geometry", default=False)
+    iterations: IntProperty(name="Iterations", description="Check/push passes when fixing the path", default=3, min=1, max=20)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        camera = context.active_object if context.active_object and context.active_object.type == 'CAMERA' else scene.camera
+        if camera is None:
+            self.report({'ERROR'}, "Select a camera or set a scene camera.")
+            return {'CANCELLED'}
+
+        follow_path = curves.find_follow_path(camera)
+        if self.fix_path and follow_path is None:
+            self.report({'ERROR'}, f"'{camera.name}' does not ride a path curve, nothing to push out.")
+            return {'CANCELLED'}
+
+        moved = 0
+        for iteration in range(self.iterations if self.fix_path else 1):
+            result = analysis.check_clearance(context, camera, self.min_clearance, self.substeps, self.line_of_sight)
+            if not self.fix_path or not result.too_close.any():
+                break
+            moved += analysis.push_path_out(follow_path.target, result)
+        if self.fix_path and moved:
+            result = analysis.check_clearance(context, camera, self.min_clearance, self.substeps, self.line_of_sight)
+
+        too_close, blocked = result.ranges()
+        analysis.mark_violations(scene, too_close, blocked)
+        if moved:
+            self.report({'INFO'}, f"Moved {moved} control point(s) of '{follow_path.target.name}'.")
+        if not too_close and not blocked:
+            self.report({'INFO'}, f"'{camera.name}' keeps {self.min_clearance:g} clearance with a clear view over the whole animation.")
+            return {'FINISHED'}
+
+        if too_close:
+            self.report({'WARNING'}, f"Closer than {self.min_clearance:g} at frames {analysis.format_ranges(too_close)}")
+        if blocked:
+            self.report({'WARNING'}, f"Target hidden at frames {analysis.format_ranges(blocked)}")
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoProfiling(Operator):
+    bl_idname = "view3d.cito_profiling"
+    bl_label = "Profiling"
+    bl_description = "Record the time spent in Cito operators, property updates, depsgraph updates and render/write frames"
+
+    action: EnumProperty(
+        items=[
+            ('ENABLE', "Enable", "Start recording"),
+            ('DISABLE', "Disable", "Stop recording and keep what was recorded"),
+            ('RESET', "Reset", "Clear the recorded spans and stats"),
+        ],
+    )
+
+    def execute(self, context):
+        if self.action == 'ENABLE':
+            profiling.enable(classes)
+        elif self.action == 'DISABLE':
+            profiling.disable()
+        else:
+            profiling.reset()
+        return {'FINISHED'}
+
+class VIEW3D_OT_CitoExportTrace(Operator):
+    bl_idname = "view3d.cito_export_trace"
+    bl_label = "Export Trace"
+    bl_description = "Save the recorded spans as a Chrome trace JSON (open in chrome://tracing or Perfetto)"
+
+    filepath: StringProperty(subtype='FILE_PATH', default="cito_trace.json")
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        filepath = bpy.path.ensure_ext(bpy.path.abspath(self.filepath), ".json")
+        try:
+            count = profiling.export_chrome_trace(filepath)
+        except OSError as error:
+            self.report({'ERROR'}, f"Could not write the trace: {error}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Wrote {count} trace events to {filepath}")
+        return {'FINISHED'}
 
 # List of classes operators
 classes = [
@@ -468,11 +1374,34 @@ classes = [
     ToggleIphoneCameraOrientation,
     CitoRenderViewport,
     CitoViewSelectedCamera,
+    VIEW3D_OT_CitoRefreshThumbnails,
+    VIEW3D_OT_CitoSectionStack,
+    VIEW3D_OT_CitoTiledRender,
+    VIEW3D_OT_CitoSimulateAgents,
+    VIEW3D_OT_CitoImportCameraStations,
     VIEW3D_OT_CitoCreateAnimationSetup,
     OBJECT_OT_AnimateFollowPath,
     VIEW3D_OT_UseSelectedCurveToAnimateCamera,
+    VIEW3D_OT_CitoImportTracks,
+    VIEW3D_OT_CitoFindRoute,
+    VIEW3D_OT_CitoRouteBatch,
     OBJECT_OT_AnimateNURBSPath,
+    OBJECT_OT_CitoConstantSpeedPath,
+    OBJECT_OT_CitoSpeedProfile,
+    OBJECT_OT_CitoPathStop,
+    VIEW3D_OT_CitoBakeNavigation,
+    VIEW3D_OT_CitoUnbakeNavigation,
+    VIEW3D_OT_CitoExportTrajectories,
+    VIEW3D_OT_CitoImportTrajectories,
     VIEW3D_OT_CitoViewportRenderAnimation,
+    VIEW3D_OT_CitoPipelinedRenderAnimation,
+    VIEW3D_OT_CitoModalRenderAnimation,
+    VIEW3D_OT_CitoRenderControl,
+    VIEW3D_OT_CitoVisibilityAnalysis,
+    VIEW3D_OT_CitoMovementHeatmap,
+    VIEW3D_OT_CitoClearanceCheck,
+    VIEW3D_OT_CitoProfiling,
+    VIEW3D_OT_CitoExportTrace,
 ]
 
 def register():
@@ -486,6 +1415,9 @@ def register():
 
 
 def unregister():
+    # Put the original execute() methods back before the classes go
+    profiling.disable()
+
     # Unregister classes
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
@@ -2,6 +2,7 @@ import bpy
 from bpy.types import Panel
 from .operators import *
 from .utilities import *
+from . import profiling, rendering, thumbnails
 
 class Panel_PT_CitoAddCamera(bpy.types.Panel):
     bl_label = "CITOGRAPHY - Camera"
@@ -18,6 +19,45 @@ class Panel_PT_CitoAddCamera(bpy.types.Panel):
         layout.label(text="Add Your Camera!", icon="COLOR")  # Pink hint with "COLOR" icon
         layout.operator("view3d.add_camera_scaled_up", text="Add Camera 🎥", icon="CAMERA_DATA")
         layout.operator("view3d.cito_view_selected_camera", text="View from Selected Camera", icon="OUTLINER_DATA_CAMERA")
+        layout.operator("view3d.cito_import_camera_stations", text="Import Camera Stations", icon="IMPORT")
+
+class SubPanel_PT_CitoCameraList(Panel):
+    bl_label = "🗂 CITO CAMERAS:"
+    bl_idname = "C_PT_CitoCameraList"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAddCamera"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        # Served from the live Cito index, so this stays cheap with hundreds of rigs
+        layout.label(text=f"Setups {cito_index.count('SETUP')}  Paths {cito_index.count('PATH')}  Targets {cito_index.count('TARGET')}")
+        active = context.scene.camera
+        column = layout.column(align=True)
+        for cam in cito_index.items('CAMERA'):
+            row = column.row(align=True)
+            row.label(text=cam.name, icon="VIEW_CAMERA" if cam == active else "OUTLINER_DATA_CAMERA")
+            row.label(text=(cito_camera_kind(cam) or "").replace("_", " ").title())
+            row.operator("view3d.cito_view_selected_camera", text="", icon="HIDE_OFF").camera_name = cam.name
+
+        row = layout.row(align=True)
+        row.prop(context.scene, "show_camera_thumbnails", toggle=True, icon="IMAGE_DATA")
+        if not context.scene.show_camera_thumbnails:
+            return
+        row.prop(context.scene, "camera_thumbnail_cache_mb", text="MB")
+        row.operator("view3d.cito_refresh_thumbnails", text="", icon="FILE_REFRESH")
+        # Cached previews of each camera's view; missing ones render in the background and appear on redraw
+        grid = layout.grid_flow(columns=2, even_columns=True, even_rows=True, align=True)
+        for cam in cito_index.items('CAMERA'):
+            cell = grid.column(align=True)
+            icon = thumbnails.thumbnail_cache.icon(cam, context.scene)
+            if icon:
+                cell.template_icon(icon_value=icon, scale=5.0)
+            else:
+                cell.label(text="Rendering...", icon="TIME")
+            cell.operator("view3d.cito_view_selected_camera", text=cam.name, depress=cam == active).camera_name = cam.name
 
 class Panel_PT_CitographyExploreFrame(Panel):
     bl_label = "CITOGRAPHY - Image"
@@ -58,6 +98,9 @@ class SubPanel_PT_OrthoCamera(Panel):
         layout = self.layout
         layout.operator("view3d.add_camera_section_ortho", text="Add Section-Ortho Camera", icon="CAMERA_DATA")
         layout.operator("view3d.add_camera_top_view_ortho", text="Add Top-Ortho Camera", icon="CAMERA_DATA")
+        layout.operator("view3d.cito_section_stack", text="Render Section Stack", icon="MOD_ARRAY")
+        layout.operator("view3d.cito_tiled_render", text="Render Tiled Map", icon="MESH_GRID")
+        layout.prop(context.scene, "camera_broadcast_mode", text="Apply To")
         layout.prop(context.scene, "camera_ortho_scale", text="Ortho Scale")
         layout.prop(context.scene, "camera_z_position", text="Z Position")
         layout.prop(context.scene, "camera_rotation", text="Rotation")
@@ -79,6 +122,8 @@ class SubPanel_PT_IphoneCamera(bpy.types.Panel):
         layout.operator("view3d.add_iphone_camera", text="Add iPhone Camera 📱", icon="CAMERA_DATA")
         layout.operator("view3d.toggle_iphone_camera_orientation", text="Toggle Orientation", icon="ORIENTATION_LOCAL")
         
+        layout.prop(scene, "camera_broadcast_mode", text="Apply To")
+
         # Zoom mode dropdown with label
         layout.prop(scene, "iphone_camera_zoom_mode", text="Zoom Mode")
 
@@ -134,6 +179,35 @@ class SubPanel_PT_SelectedPath(Panel):
         layout = self.layout
         layout.operator("view3d.use_selected_curve_to_animate_camera", text="Selected Path Animation", icon="CURVE_NCURVE")
         layout.operator("object.animate_nurbs_path", text="Animate Path", icon="ANIM")
+        layout.operator("object.cito_constant_speed_path", text="Constant Speed", icon="IPO_LINEAR")
+        layout.operator("object.cito_speed_profile", text="Speed Profile", icon="IPO_EASE_IN_OUT")
+        row = layout.row(align=True)
+        row.operator("object.cito_path_stop", text="Add Stop at Cursor", icon="PAUSE").action = 'ADD'
+        row.operator("object.cito_path_stop", text="", icon="X").action = 'CLEAR'
+        layout.operator("view3d.cito_import_tracks", text="Import GPS Tracks", icon="IMPORT")
+        row = layout.row(align=True)
+        row.operator("view3d.cito_find_route", text="Find Route", icon="TRACKING")
+        row.operator("view3d.cito_route_batch", text="Batch Routes", icon="FILE_TEXT")
+
+class SubPanel_PT_BakeNavigation(Panel):
+    bl_label = "⚡ BAKE NAVIGATION:"
+    bl_idname = "C_PT_CitocBakeNavigation"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoExploreAnimation"  
+    bl_options = {"DEFAULT_CLOSED"} 
+    
+    def draw(self, context):
+        layout = self.layout
+        obj = context.active_object
+        if obj is not None and is_navigation_baked(obj):
+            layout.label(text=f"'{obj.name}' is baked", icon="KEYTYPE_KEYFRAME_VEC")
+        layout.operator("view3d.cito_bake_navigation", text="Bake Navigation", icon="KEY_HLT")
+        layout.operator("view3d.cito_unbake_navigation", text="Unbake (Live Rig)", icon="CONSTRAINT")
+        row = layout.row(align=True)
+        row.operator("view3d.cito_export_trajectories", text="Export", icon="EXPORT")
+        row.operator("view3d.cito_import_trajectories", text="Import", icon="IMPORT")
 
 class SubPanel_PT_RenderAnimation(Panel):
     bl_label = "🎥 RENDER ANIMATION:"
@@ -150,15 +224,152 @@ class SubPanel_PT_RenderAnimation(Panel):
         
         # Directory selection for output frames
         layout.prop(scene, "frame_output_directory", text="Output Folder")
+        # Scene camera only, or one subfolder per camera (frames and pipelined renders)
+        layout.prop(scene, "render_cameras", text="Cameras")
 
         # Dropdown for output type (Frames or AVI)
         layout.prop(scene, "animation_output_type", text="Output Type")
+        if scene.animation_output_type == 'FRAMES':
+            row = layout.row()
+            row.prop(scene, "render_resume")
+            row.prop(scene, "render_incremental")
+            layout.prop(scene, "render_verify_checksums")
         
         # Button to trigger viewport render animation
         layout.operator("view3d.cito_viewport_render_animation", text="Render Animation", icon="RENDER_ANIMATION")
 
+        # Pipelined offscreen render: drawing and PNG/raw writing overlap
+        box = layout.box()
+        box.label(text="Pipelined Render", icon="SORTTIME")
+        box.prop(scene, "render_writer_format", text="Format")
+        row = box.row()
+        row.prop(scene, "render_writer_threads", text="Threads")
+        row.prop(scene, "render_writer_queue", text="Queue")
+        if scene.render_writer_format == 'PNG':
+            box.prop(scene, "render_png_compression", text="Compression")
+        box.operator("view3d.cito_pipelined_render_animation", text="Pipelined Render", icon="RENDER_ANIMATION")
+
+        # Non-blocking render with progress, pause/resume and cancel
+        progress = rendering.render_progress
+        if progress.get("running"):
+            box.label(text=f"Frames {progress['done']}/{progress['total']}  {progress['fps']:.1f} fps  {progress['eta']:.0f}s left", icon="TIME")
+            row = box.row()
+            if progress.get("paused"):
+                row.operator("view3d.cito_render_control", text="Resume", icon="PLAY").action = 'RESUME'
+            else:
+                row.operator("view3d.cito_render_control", text="Pause", icon="PAUSE").action = 'PAUSE'
+            row.operator("view3d.cito_render_control", text="Cancel", icon="CANCEL").action = 'CANCEL'
+        else:
+            box.prop(scene, "render_tick_budget")
+            box.operator("view3d.cito_modal_render_animation", text="Render in Background", icon="RENDER_ANIMATION")
+        stats = rendering.writer_stats
+        if stats:
+            box.label(text=f"Queue {stats['queued']}/{stats['queue_depth']}  Written {stats['written']}  Errors {stats['errors']}")
+            if "mb_per_second" in stats:
+                box.label(text=f"Writers {stats['fps']:.1f} fps, {stats['mb_per_second']:.1f} MB/s, waited {stats['wait_seconds']:.1f}s")
+
+class Panel_PT_CitographyAnalysis(Panel):
+    bl_label = "CITOGRAPHY - Analysis"
+    bl_idname = "C_PT_CitoAnalysis"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Cito CAMERA"
+    bl_context = "objectmode"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Navigation Analysis", icon="VIEWZOOM")
+
+class SubPanel_PT_Visibility(Panel):
+    bl_label = "👁 VISIBILITY:"
+    bl_idname = "C_PT_CitoVisibility"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAnalysis"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Results go to the Output Folder", icon="FILE_FOLDER")
+        layout.operator("view3d.cito_visibility_analysis", text="Visibility Along Path", icon="HIDE_OFF")
+
+class SubPanel_PT_MovementHeatmap(Panel):
+    bl_label = "🔥 MOVEMENT HEATMAP:"
+    bl_idname = "C_PT_CitoMovementHeatmap"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAnalysis"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Covers the Top-Ortho camera view", icon="VIEW_ORTHO")
+        layout.operator("view3d.cito_movement_heatmap", text="Update Heatmap", icon="IMAGE_DATA")
+
+class SubPanel_PT_Agents(Panel):
+    bl_label = "🚶 AGENTS:"
+    bl_idname = "C_PT_CitoAgents"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAnalysis"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Moves along selected curves or Cito paths", icon="CURVE_PATH")
+        layout.operator("view3d.cito_simulate_agents", text="Simulate Agents", icon="COMMUNITY")
+
+class SubPanel_PT_Clearance(Panel):
+    bl_label = "🧱 CLEARANCE:"
+    bl_idname = "C_PT_CitoClearance"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAnalysis"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Violations are marked on the timeline", icon="MARKER_HLT")
+        layout.operator("view3d.cito_clearance_check", text="Check Clearance", icon="MOD_PHYSICS")
+
+class SubPanel_PT_Profiling(Panel):
+    bl_label = "🐞 PROFILING:"
+    bl_idname = "C_PT_CitoProfiling"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Cito CAMERA"
+    bl_parent_id = "C_PT_CitoAnalysis"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        row = layout.row(align=True)
+        if profiling.is_enabled():
+            row.operator("view3d.cito_profiling", text="Stop", icon="PAUSE").action = 'DISABLE'
+        else:
+            row.operator("view3d.cito_profiling", text="Record", icon="REC").action = 'ENABLE'
+        row.operator("view3d.cito_profiling", text="Reset", icon="TRASH").action = 'RESET'
+        row.operator("view3d.cito_export_trace", text="Trace", icon="EXPORT")
+
+        stats = profiling.rolling_stats()
+        layout.label(text=f"Depsgraph updates: {profiling.depsgraph_update_count()}", icon="MODIFIER")
+        if not stats:
+            return
+        # Recent window per span, in milliseconds, most total time first
+        box = layout.box()
+        column = box.column(align=True)
+        column.label(text="Span  calls  mean / p95 / max ms")
+        for name, calls, mean, p95, peak in stats[:12]:
+            column.label(text=f"{name}  {calls}  {mean * 1000:.1f} / {p95 * 1000:.1f} / {peak * 1000:.1f}")
+
 classes = [
     Panel_PT_CitoAddCamera,
+    SubPanel_PT_CitoCameraList,
     Panel_PT_CitographyExploreFrame,
     SubPanel_PT_OrthoCamera,
     SubPanel_PT_IphoneCamera,
@@ -166,7 +377,14 @@ classes = [
     Panel_PT_CitographyExploreAnimation,
     SubPanel_PT_CircularPath,
     SubPanel_PT_SelectedPath,
+    SubPanel_PT_BakeNavigation,
     SubPanel_PT_RenderAnimation,
+    Panel_PT_CitographyAnalysis,
+    SubPanel_PT_Visibility,
+    SubPanel_PT_MovementHeatmap,
+    SubPanel_PT_Agents,
+    SubPanel_PT_Clearance,
+    SubPanel_PT_Profiling,
 ]
 
 def register():
@@ -0,0 +1,164 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+import bpy
+from bpy.app.handlers import persistent
+
+# Opt-in instrumentation. While profiling is on, operator calls, scene property update
+# callbacks, per-frame render/draw/write work and depsgraph updates are recorded as timed spans. The
+# debug panel shows rolling stats per span name, and the spans export as a Chrome trace
+# (chrome://tracing, Perfetto). While it is off, traced code pays one flag check.
+
+ROLLING_WINDOW = 200
+MAX_EVENTS = 200000
+
+_state = {"enabled": False, "started": time.perf_counter(), "depsgraph_updates": 0}
+# (name, category, start, duration, thread id, args); duration None marks a counter sample
+_events = deque(maxlen=MAX_EVENTS)
+_recent = {}    # name -> deque of the latest durations
+_totals = {}    # name -> [calls, seconds]
+_lock = threading.Lock()
+_original_methods = {}    # (operator class, method name) -> the unwrapped method
+
+def is_enabled():
+    return _state["enabled"]
+
+def record(name, category, start, duration, **args):
+    # Render writers record from their own threads
+    with _lock:
+        _events.append((name, category, start, duration, threading.get_ident(), args))
+        recent = _recent.get(name)
+        if recent is None:
+            recent = _recent[name] = deque(maxlen=ROLLING_WINDOW)
+            _totals[name] = [0, 0.0]
+        recent.append(duration)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += duration
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start", "updates")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.updates = _state["depsgraph_updates"]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        record(self.name, self.category, self.start, duration, depsgraph_updates=_state["depsgraph_updates"] - self.updates, **self.args)
+        return False
+
+_NO_SPAN = contextlib.nullcontext()
+
+def span(name, category="cito", **args):
+    # Times the with-block while profiling is on; a shared no-op context otherwise
+    return _Span(name, category, args) if _state["enabled"] else _NO_SPAN
+
+def traced(category):
+    # Decorator for functions Blender calls back into (property updates, timers)
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return function(*args, **kwargs)
+            with _Span(function.__name__, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _traced_method(cls, name, method):
+    span_name = cls.bl_idname if name == "execute" else f"{cls.bl_idname}.{name}"
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        with _Span(span_name, "operator", {}):
+            return method(self, *args)
+    return wrapper
+
+@persistent
+def _on_depsgraph_update_post(scene, depsgraph):
+    _state["depsgraph_updates"] += 1
+    with _lock:
+        _events.append(("depsgraph_updates", "depsgraph", time.perf_counter(), None, threading.get_ident(),
+                        {"total": _state["depsgraph_updates"], "ids": len(depsgraph.updates)}))
+
+def enable(operator_classes):
+    # Blender looks the callbacks up on the class at every call, so registered operators can be wrapped
+    # in place. Modal operators without execute() are timed through invoke() and modal() instead.
+    if _state["enabled"]:
+        return
+    try:
+        for cls in operator_classes:
+            names = ("execute",) if getattr(cls, "execute", None) is not None else ("invoke", "modal")
+            for name in names:
+                method = getattr(cls, name, None)
+                if method is not None and (cls, name) not in _original_methods:
+                    setattr(cls, name, _traced_method(cls, name, method))
+                    _original_methods[(cls, name)] = method
+    except Exception:
+        _restore_methods()
+        raise
+    if _on_depsgraph_update_post not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update_post)
+    _state["enabled"] = True
+
+def _restore_methods():
+    for (cls, name), method in _original_methods.items():
+        setattr(cls, name, method)
+    _original_methods.clear()
+
+def disable():
+    _restore_methods()
+    if _on_depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update_post)
+    _state["enabled"] = False
+
+def reset():
+    with _lock:
+        _events.clear()
+        _recent.clear()
+        _totals.clear()
+    _state["started"] = time.perf_counter()
+    _state["depsgraph_updates"] = 0
+
+def rolling_stats():
+    # (name, calls, mean, p95, max) per span name, seconds over the recent window, most total time first
+    with _lock:
+        items = [(name, list(recent), _totals[name]) for name, recent in _recent.items()]
+    rows = []
+    for name, durations, (calls, seconds) in sorted(items, key=lambda item: item[2][1], reverse=True):
+        durations.sort()
+        rows.append((name, calls, sum(durations) / len(durations), durations[int(0.95 * (len(durations) - 1))], durations[-1]))
+    return rows
+
+def depsgraph_update_count():
+    return _state["depsgraph_updates"]
+
+def export_chrome_trace(filepath):
+    # Trace Event Format: complete ("X") events for spans, counter ("C") events for depsgraph updates
+    with _lock:
+        events = list(_events)
+    pid = os.getpid()
+    started = _state["started"]
+    trace = []
+    for name, category, start, duration, thread, args in events:
+        event = {"name": name, "cat": category, "ts": round((start - started) * 1e6, 1), "pid": pid, "tid": thread, "args": args}
+        if duration is None:
+            event["ph"] = "C"
+        else:
+            event["ph"] = "X"
+            event["dur"] = round(duration * 1e6, 1)
+        trace.append(event)
+    with open(filepath, "w", encoding="utf-8") as stream:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms",
+                   "otherData": {"blender": bpy.app.version_string, "file": bpy.data.filepath}}, stream)
+    return len(trace)
@@ -0,0 +1,672 @@
+import hashlib
+import json
+import os
+import shutil
+import socket
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import bpy
+import numpy as np
+from . import profiling
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Finished frames are recorded in an append-only JSON-lines manifest next to the frames. A crash can
+# at worst leave one truncated last line, which is ignored on load, so a restart only re-renders
+# frames that are missing or no longer match their recorded size/checksum.
+MANIFEST_NAME = "cito_manifest.jsonl"
+
+def file_sha256(filepath, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as stream:
+        for block in iter(lambda: stream.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class FrameManifest:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.frames = {}
+        # Writer threads record frames concurrently; only the append itself is serialised
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.frames.clear()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.frames[int(record["frame"])] = record
+
+    def record(self, frame, filepath, **extra):
+        record = {
+            "frame": int(frame),
+            "file": os.path.relpath(filepath, self.directory),
+            "size": os.path.getsize(filepath),
+            "sha256": file_sha256(filepath),
+            "time": time.time(),
+            **extra,
+        }
+        # One write per record on an O_APPEND handle, so concurrent shard workers never interleave lines
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as stream:
+                stream.write(json.dumps(record) + "\n")
+                stream.flush()
+                os.fsync(stream.fileno())
+            self.frames[int(frame)] = record
+        return record
+
+    def verify(self, frame, checksum=True):
+        record = self.frames.get(int(frame))
+        if record is None:
+            return False
+        filepath = os.path.join(self.directory, record["file"])
+        try:
+            if os.path.getsize(filepath) != record["size"]:
+                return False
+        except OSError:
+            return False
+        return not checksum or file_sha256(filepath) == record["sha256"]
+
+    def pending(self, frames, checksum=False):
+        return [frame for frame in frames if not self.verify(frame, checksum)]
+
+# Lock path -> open lock file of the shards this process holds
+_shard_locks = {}
+
+def _shard_stem(directory, frame_start, frame_end):
+    return os.path.join(directory, f"cito_shard_{frame_start:05d}_{frame_end:05d}")
+
+def shard_is_done(directory, frame_start, frame_end):
+    return os.path.exists(_shard_stem(directory, frame_start, frame_end) + ".done")
+
+def _lock_file(stream):
+    # Non-blocking exclusive OS lock; False when another process holds it
+    try:
+        if fcntl is not None:
+            fcntl.lockf(stream.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(stream.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def claim_shard(directory, frame_start, frame_end):
+    # Claims a frame range for this process through an OS lock on the shard's lock file, held until
+    # release_shard(). The OS drops the lock when a worker dies, so a crashed worker's shard is free
+    # again right away and there is no stale-lock takeover for two workers to race on. Returns the
+    # lock path, or None when another process holds the shard or it is already done.
+    os.makedirs(directory, exist_ok=True)
+    lock_path = _shard_stem(directory, frame_start, frame_end) + ".lock"
+    stream = open(lock_path, "a+", encoding="utf-8")
+    stream.seek(0)
+    if not _lock_file(stream) or shard_is_done(directory, frame_start, frame_end):
+        stream.close()
+        return None
+    # Who holds it, for people looking at the output folder
+    stream.truncate(0)
+    json.dump({"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()}, stream)
+    stream.flush()
+    _shard_locks[lock_path] = stream
+    return lock_path
+
+def release_shard(lock_path, done=True):
+    # The lock file stays: deleting it would let a process that opened it just before lock a file
+    # that no longer exists, while another creates and locks a new one
+    if done:
+        open(lock_path[:-len(".lock")] + ".done", "w").close()
+    stream = _shard_locks.pop(lock_path, None)
+    if stream is not None:
+        stream.close()
+
+# Incremental rendering: every frame gets a key that hashes what ends up in the picture (evaluated
+# camera, lens/ortho scale, resolution, render engine settings and the visible objects with their
+# modifiers and materials). Keys are stored in the manifest and only frames whose key changed are
+# rendered again; frames sharing a key with an image that already exists (a paused camera, an
+# unchanged stretch) are filled by hard-linking that image.
+
+def _is_dynamic(obj):
+    # Objects whose transform or shape can differ between frames; everything else is hashed once
+    if obj.animation_data is not None or len(obj.constraints):
+        return True
+    data = obj.data
+    if data is not None and (getattr(data, "animation_data", None) is not None or getattr(data, "shape_keys", None) is not None):
+        return True
+    return obj.parent is not None and _is_dynamic(obj.parent)
+
+def _mesh_digest(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return hashlib.blake2b(co.tobytes(), digest_size=16).digest()
+
+def _rna_value(value):
+    # Hashable, session-independent form of an RNA or ID property value
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if hasattr(value, "to_dict"):
+        return sorted(value.to_dict().items())
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    if hasattr(value, "__len__") and not isinstance(value, str):
+        return np.asarray(value).ravel().tolist()
+    return value
+
+# Editor-only settings that never change the picture
+_UI_PROPERTIES = frozenset((
+    "location", "width", "height", "select", "hide", "label", "parent", "use_custom_color", "color",
+    "show_options", "show_preview", "show_texture", "show_expanded", "show_in_editmode", "show_on_cage",
+    "is_active", "use_fake_user", "tag", "name",
+))
+
+def _rna_state(struct, skip=()):
+    # The struct's own editable property values; nested structs and collections are left to the caller
+    values = []
+    for prop in struct.bl_rna.properties:
+        identifier = prop.identifier
+        if (identifier == "rna_type" or identifier in _UI_PROPERTIES or identifier in skip
+                or prop.is_readonly or prop.type == 'COLLECTION'):
+            continue
+        value = getattr(struct, identifier, None)
+        if prop.type == 'POINTER' and not isinstance(value, bpy.types.ID):
+            continue
+        values.append((identifier, _rna_value(value)))
+    return repr(values).encode()
+
+def _node_tree_digest(tree, cache):
+    # Node settings, unlinked socket values and links, with node groups followed
+    key = ("node_tree", tree.name)
+    if key in cache:
+        return cache[key]
+    cache[key] = b""    # a group nested in itself
+    digest = hashlib.blake2b(digest_size=16)
+    for node in tree.nodes:
+        digest.update(node.name.encode())
+        digest.update(_rna_state(node))
+        for socket in node.inputs:
+            if hasattr(socket, "default_value"):
+                digest.update(repr(_rna_value(socket.default_value)).encode())
+        if getattr(node, "node_tree", None) is not None:
+            digest.update(_node_tree_digest(node.node_tree, cache))
+    for link in tree.links:
+        digest.update(repr((link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier)).encode())
+    # Animated trees change between frames and are hashed again every time
+    cache[key] = digest.digest()
+    return cache[key] if tree.animation_data is None else cache.pop(key)
+
+def _material_digest(material, cache):
+    key = ("material", material.name)
+    if key not in cache:
+        digest = hashlib.blake2b(_rna_state(material), digest_size=16)
+        if material.node_tree is not None:
+            digest.update(_node_tree_digest(material.node_tree, cache))
+        cache[key] = digest.digest()
+        if material.animation_data is not None or (material.node_tree is not None and material.node_tree.animation_data is not None):
+            return cache.pop(key)
+    return cache[key]
+
+def _object_state(obj, digest, cache):
+    digest.update(obj.name.encode())
+    digest.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    data = obj.data
+    if data is not None:
+        digest.update(data.name.encode())
+        if obj.type == 'MESH':
+            if data.name not in cache:
+                cache[data.name] = _mesh_digest(data)
+            digest.update(cache[data.name])
+        shape_keys = getattr(data, "shape_keys", None)
+        if shape_keys is not None:
+            digest.update(repr([(block.name, block.value, block.mute) for block in shape_keys.key_blocks]).encode())
+    # Modifiers change the evaluated shape without touching the mesh; geometry-nodes inputs are ID properties
+    for modifier in obj.modifiers:
+        digest.update(_rna_state(modifier))
+        digest.update(repr(sorted((key, _rna_value(modifier[key])) for key in modifier.keys())).encode())
+        if getattr(modifier, "node_group", None) is not None:
+            digest.update(_node_tree_digest(modifier.node_group, cache))
+    for slot in obj.material_slots:
+        if slot.material is not None:
+            digest.update(_material_digest(slot.material, cache))
+
+# Per-engine settings structs, as paths on the scene
+_ENGINE_SETTINGS = {
+    'CYCLES': ("cycles",),
+    'BLENDER_EEVEE': ("eevee",),
+    'BLENDER_EEVEE_NEXT': ("eevee",),
+    'BLENDER_WORKBENCH': ("display", "display.shading"),
+}
+
+def _render_state(scene, digest, cache):
+    # Engine, its sampling/quality settings, colour management and the world
+    digest.update(_rna_state(scene.render, skip=("filepath",)))
+    for path in _ENGINE_SETTINGS.get(scene.render.engine, ()) + ("view_settings", "display_settings"):
+        try:
+            digest.update(_rna_state(scene.path_resolve(path)))
+        except ValueError:
+            pass
+    world = scene.world
+    if world is not None:
+        digest.update(_rna_state(world))
+        if world.node_tree is not None:
+            digest.update(_node_tree_digest(world.node_tree, cache))
+
+def _camera_state(camera, scene, digest):
+    render = scene.render
+    cam = camera.data
+    digest.update(camera.name.encode())
+    digest.update(np.array(camera.matrix_world, dtype=np.float32).tobytes())
+    digest.update(repr((cam.type, cam.lens, cam.ortho_scale, cam.shift_x, cam.shift_y, cam.clip_start, cam.clip_end,
+                        cam.sensor_width, cam.sensor_fit, render.resolution_x, render.resolution_y,
+                        render.resolution_percentage, render.film_transparent)).encode())
+
+def compute_frame_keys(scene, camera, frames, view_layer=None):
+    # One scene evaluation per frame; static objects are hashed once for the whole range
+    view_layer = view_layer or scene.view_layers[0]
+    visible = [obj for obj in scene.objects if obj.visible_get(view_layer=view_layer)]
+    dynamic = [obj for obj in visible if _is_dynamic(obj)]
+    # Mesh, material and node-tree digests, shared by every object and frame that uses them
+    cache = {}
+
+    static_digest = hashlib.blake2b(digest_size=16)
+    _render_state(scene, static_digest, cache)
+    for obj in sorted((obj for obj in visible if not _is_dynamic(obj)), key=lambda obj: obj.name):
+        _object_state(obj, static_digest, cache)
+    static_digest = static_digest.digest()
+
+    keys = {}
+    frame_current = scene.frame_current
+    try:
+        for frame in frames:
+            scene.frame_set(frame)
+            digest = hashlib.blake2b(static_digest, digest_size=16)
+            _camera_state(camera, scene, digest)
+            for obj in dynamic:
+                digest.update(b"1" if obj.visible_get(view_layer=view_layer) else b"0")
+                _object_state(obj, digest, cache)
+            keys[frame] = digest.hexdigest()
+    finally:
+        scene.frame_set(frame_current)
+    return keys
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def _remove(filepath):
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+
+def render_incremental(manifest, frames, render_frame, frame_path, keys=None, checksum=False, on_frame=None):
+    # Renders the frames that are not finished yet. render_frame(frame, filepath) draws and writes one frame.
+    # Without keys this is a plain resume; with keys a finished frame is kept only when its stored key still
+    # matches, and a frame whose key already has an image is hard-linked to it instead of rendered.
+    # key -> an image with that key, and back, kept current as frames are written
+    sources = {}
+    source_keys = {}
+    if keys is not None:
+        wanted = set(keys.values())
+        for record in manifest.frames.values():
+            key = record.get("key")
+            if key in wanted and key not in sources and manifest.verify(record["frame"], checksum):
+                sources[key] = os.path.join(manifest.directory, record["file"])
+                source_keys[sources[key]] = key
+
+    stats = {"rendered": 0, "linked": 0, "skipped": 0}
+    for frame in frames:
+        key = keys.get(frame) if keys is not None else None
+        record = manifest.frames.get(frame)
+        if record is not None and (keys is None or record.get("key") == key) and manifest.verify(frame, checksum):
+            stats["skipped"] += 1
+            continue
+
+        # Never write through a hard link shared with other frames: unlink first, and stop using
+        # this file as the source of its old key
+        filepath = frame_path(frame)
+        _remove(filepath)
+        old_key = source_keys.pop(filepath, None)
+        if old_key is not None:
+            del sources[old_key]
+
+        started = time.perf_counter()
+        source = sources.get(key) if key is not None else None
+        if source is not None:
+            with profiling.span("link_frame", "io", frame=frame):
+                link_or_copy(source, filepath)
+            stats["linked"] += 1
+        else:
+            with profiling.span("render_frame", "render", frame=frame):
+                render_frame(frame, filepath)
+            stats["rendered"] += 1
+            if key is not None:
+                sources[key] = filepath
+                source_keys[filepath] = key
+        manifest.record(frame, filepath, **({"key": key} if key is not None else {}))
+        if on_frame is not None:
+            on_frame(frame, time.perf_counter() - started)
+    return stats
+
+# Pipelined rendering: the main thread draws each frame into a GPU offscreen buffer and reads it back
+# into one reused pixel buffer; encoding (zlib releases the GIL) and disk writes run on a bounded
+# thread pool while the next frame is drawn.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+def _png_header(width, height):
+    return _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+def _png_scanlines(pixels):
+    height, width = pixels.shape[:2]
+    rows = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 0] = 0  # filter type "None" for every scanline
+    rows[:, 1:] = pixels.reshape(height, width * 4)
+    return rows.tobytes()
+
+def encode_png(pixels, level=6):
+    # pixels: (height, width, 4) uint8, top row first
+    height, width = pixels.shape[:2]
+    return b"".join((PNG_SIGNATURE, _png_header(width, height), _png_chunk(b"IDAT", zlib.compress(_png_scanlines(pixels), level)), _png_chunk(b"IEND", b"")))
+
+def write_png(filepath, pixels, level=6, band_rows=256):
+    # Same image as encode_png(), compressed band by band so pixels can be a memory map larger than RAM
+    height, width = pixels.shape[:2]
+    compressor = zlib.compressobj(level)
+    with open(filepath, "wb") as stream:
+        stream.write(PNG_SIGNATURE + _png_header(width, height))
+        for top in range(0, height, band_rows):
+            data = compressor.compress(_png_scanlines(np.ascontiguousarray(pixels[top:top + band_rows])))
+            if data:
+                stream.write(_png_chunk(b"IDAT", data))
+        stream.write(_png_chunk(b"IDAT", compressor.flush()) + _png_chunk(b"IEND", b""))
+
+# Stats of the last/active writer pool, read by the render panel
+writer_stats = {}
+
+class FrameWriterPool:
+    # Bounded pool of writer threads. submit() copies the frame into one of queue_depth preallocated
+    # buffers and returns immediately; when all buffers are in flight it blocks, and that wait time is
+    # reported, so a disk-bound pipeline is easy to spot.
+
+    def __init__(self, width, height, threads=4, queue_depth=8, png_level=6, raw_path=None, raw_frames=0, on_written=None):
+        self.width = width
+        self.height = height
+        self.png_level = png_level
+        self.on_written = on_written
+        self.queue_depth = max(1, queue_depth)
+        self._free = [np.empty((height, width, 4), dtype=np.uint8) for i in range(self.queue_depth)]
+        self._slots = threading.Semaphore(self.queue_depth)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="cito_writer")
+        self._errors = []
+        # Raw mode: all frames go into one memory-mapped (frames, height, width, 4) array
+        self.raw = None
+        if raw_path is not None:
+            self.raw = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.uint8, shape=(raw_frames, height, width, 4))
+        self.stats = writer_stats
+        self.stats.clear()
+        self.stats.update({
+            "queued": 0, "written": 0, "bytes": 0, "write_seconds": 0.0, "wait_seconds": 0.0,
+            "queue_depth": self.queue_depth, "started": time.perf_counter(), "errors": 0,
+        })
+
+    def submit(self, frame, pixels, target, bottom_up=True):
+        # target: file path (PNG) or frame index into the raw memmap
+        started = time.perf_counter()
+        with profiling.span("writer_wait", "io", frame=frame):
+            self._slots.acquire()
+        with self._lock:
+            buffer = self._free.pop()
+            self.stats["wait_seconds"] += time.perf_counter() - started
+            self.stats["queued"] += 1
+        np.copyto(buffer, pixels[::-1] if bottom_up else pixels)
+        self._executor.submit(self._write, frame, buffer, target)
+
+    def _write(self, frame, buffer, target):
+        started = time.perf_counter()
+        size = 0
+        try:
+            with profiling.span("write_frame", "io", frame=frame):
+                if self.raw is not None:
+                    self.raw[target] = buffer
+                    size = buffer.nbytes
+                else:
+                    data = encode_png(buffer, self.png_level)
+                    with open(target, "wb") as stream:
+                        stream.write(data)
+                    size = len(data)
+            # Hashing and recording the frame run in parallel across writers; the manifest locks its append
+            if self.on_written is not None:
+                self.on_written(frame, target)
+        except Exception as error:
+            # Kept for close(), so a failed early frame is not lost with its future
+            with self._lock:
+                self.stats["errors"] += 1
+                self._errors.append(error)
+        finally:
+            with self._lock:
+                self._free.append(buffer)
+                self.stats["queued"] -= 1
+                self.stats["written"] += 1
+                self.stats["bytes"] += size
+                self.stats["write_seconds"] += time.perf_counter() - started
+            self._slots.release()
+
+    def pending(self):
+        return self.stats["queued"]
+
+    def throughput(self):
+        # (frames per second, MB per second) of the writers since the pool started
+        elapsed = max(time.perf_counter() - self.stats["started"], 1e-6)
+        return self.stats["written"] / elapsed, self.stats["bytes"] / elapsed / 1e6
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        errors = list(self._errors)
+        if self.raw is not None:
+            self.raw.flush()
+        fps, mb_per_second = self.throughput()
+        self.stats.update({"fps": fps, "mb_per_second": mb_per_second})
+        if errors:
+            raise errors[0]
+        return self.stats
+
+def view3d_space_and_region(context):
+    # SpaceView3D and its WINDOW region, also when called from the sidebar (UI region)
+    areas = [context.area] if context.area is not None and context.area.type == 'VIEW_3D' else []
+    areas += [area for area in context.screen.areas if area.type == 'VIEW_3D'] if context.screen else []
+    for area in areas:
+        region = next((region for region in area.regions if region.type == 'WINDOW'), None)
+        if region is not None:
+            return area.spaces.active, region
+    return None, None
+
+def render_size(scene):
+    render = scene.render
+    return (max(1, render.resolution_x * render.resolution_percentage // 100),
+            max(1, render.resolution_y * render.resolution_percentage // 100))
+
+class OffscreenCapture:
+    # Draws a camera's view into a GPUOffScreen and reads it back into one reused pixel buffer.
+    # The returned array is a view of that buffer (bottom row first) and is overwritten by the next draw.
+
+    def __init__(self, context, width, height):
+        import gpu
+        self.gpu = gpu
+        self.width = width
+        self.height = height
+        self.space, self.region = view3d_space_and_region(context)
+        if self.space is None:
+            raise RuntimeError("A 3D Viewport is needed for offscreen rendering")
+        self.offscreen = gpu.types.GPUOffScreen(width, height)
+        self.buffer = gpu.types.Buffer('UBYTE', width * height * 4)
+        self.pixels = np.frombuffer(self.buffer, dtype=np.uint8).reshape(height, width, 4)
+
+    def draw(self, scene, view_layer, camera, depsgraph):
+        camera_eval = camera.evaluated_get(depsgraph)
+        view_matrix = camera_eval.matrix_world.inverted()
+        projection_matrix = camera_eval.calc_matrix_camera(
+            depsgraph, x=self.width, y=self.height,
+            scale_x=scene.render.pixel_aspect_x, scale_y=scene.render.pixel_aspect_y,
+        )
+        return self.draw_matrices(scene, view_layer, view_matrix, projection_matrix)
+
+    def draw_matrices(self, scene, view_layer, view_matrix, projection_matrix):
+        with profiling.span("draw_frame", "render"):
+            self.offscreen.draw_view3d(scene, view_layer, self.space, self.region, view_matrix, projection_matrix,
+                                       do_color_management=True)
+        with profiling.span("read_pixels", "render"), self.offscreen.bind():
+            framebuffer = self.gpu.state.active_framebuffer_get()
+            framebuffer.read_color(0, 0, self.width, self.height, 4, 0, 'UBYTE', data=self.buffer)
+        return self.pixels
+
+    def free(self):
+        self.offscreen.free()
+
+# Progress of the running pipelined/modal render, read by the render panel
+render_progress = {}
+
+def render_cameras(context):
+    # The scene camera, plus every selected camera when the render is set to selected cameras
+    scene = context.scene
+    cameras = [scene.camera] if scene.camera is not None else []
+    if scene.render_cameras == 'SELECTED':
+        cameras += sorted((obj for obj in context.selected_objects if obj.type == 'CAMERA' and obj not in cameras), key=lambda obj: obj.name)
+    return cameras
+
+def camera_folder_names(cameras):
+    # clean_name() maps different camera names ("Cam.001", "Cam_001") to the same folder; later ones get a suffix
+    names = []
+    used = set()
+    for camera in cameras:
+        base = name = bpy.path.clean_name(camera.name)
+        suffix = 1
+        while name.lower() in used:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+class PipelinedRenderJob:
+    # One pipelined render over the scene frame range, using the writer settings from the Render
+    # Animation panel. render_next() evaluates one frame once and draws every camera from that same
+    # evaluated state, so the job can run in a blocking loop or be time-boxed from a modal operator.
+    # With several cameras, each one renders into its own subfolder (and frame manifest). writer_format
+    # overrides the panel's writer format. incremental (PNG only) keys every camera's frames like
+    # render_incremental() does and draws only the frames whose key is not on disk yet; repeated
+    # states are drawn again rather than hard-linked, since their source may still be in the writers.
+
+    def __init__(self, context, cameras=None, writer_format=None, incremental=False):
+        scene = context.scene
+        self.scene = scene
+        self.view_layer = context.view_layer
+        self.cameras = list(cameras) if cameras is not None else render_cameras(context)
+        if not self.cameras:
+            raise RuntimeError("The scene has no active camera")
+        # Normalized, so writer callbacks find each camera's manifest by the folder of the written file
+        self.directory = os.path.normpath(bpy.path.abspath(scene.frame_output_directory))
+        width, height = render_size(scene)
+        frames = list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+
+        multiple = len(self.cameras) > 1
+        self.directories = ([os.path.join(self.directory, name) for name in camera_folder_names(self.cameras)] if multiple
+                            else [self.directory])
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+        self.capture = OffscreenCapture(context, width, height)
+        self.manifests = {}
+        self.keys = {}
+        if (writer_format or scene.render_writer_format) == 'RAW':
+            # One (frames * cameras, height, width, 4) array, camera-major within each frame
+            self.writer = FrameWriterPool(width, height, scene.render_writer_threads, scene.render_writer_queue,
+                                          raw_path=os.path.join(self.directory, "cito_frames.npy"), raw_frames=len(frames) * len(self.cameras))
+            with open(os.path.join(self.directory, "cito_frames.json"), "w", encoding="utf-8") as stream:
+                json.dump({"frames": frames, "cameras": [camera.name for camera in self.cameras]}, stream)
+            pending = {frame: list(range(len(self.cameras))) for frame in frames}
+        else:
+            # PNG frames are recorded in their camera's manifest as soon as they are on disk, so they resume like FRAMES renders
+            pending = {}
+            for index, (camera, directory) in enumerate(zip(self.cameras, self.directories)):
+                manifest = self.manifests[directory] = FrameManifest(directory)
+                if incremental:
+                    keys = self.keys[directory] = compute_frame_keys(scene, camera, frames, self.view_layer)
+                    camera_frames = [frame for frame in frames
+                                     if manifest.frames.get(frame, {}).get("key") != keys[frame]
+                                     or not manifest.verify(frame, scene.render_verify_checksums)]
+                elif scene.render_resume:
+                    camera_frames = manifest.pending(frames, checksum=scene.render_verify_checksums)
+                else:
+                    camera_frames = frames
+                for frame in camera_frames:
+                    pending.setdefault(frame, []).append(index)
+            self.writer = FrameWriterPool(width, height, scene.render_writer_threads, scene.render_writer_queue,
+                                          png_level=scene.render_png_compression, on_written=self._record)
+        self.frames = sorted(pending)
+        self.pending = pending
+        self.raw_index = {frame: index for index, frame in enumerate(frames)}
+        self.index = 0
+        self.drawn = 0
+        self.frame_current = scene.frame_current
+        self.started = time.perf_counter()
+
+    def _record(self, frame, filepath):
+        directory = os.path.dirname(filepath)
+        keys = self.keys.get(directory)
+        self.manifests[directory].record(frame, filepath, **({"key": keys[frame]} if keys is not None else {}))
+
+    @property
+    def finished(self):
+        return self.index >= len(self.frames)
+
+    def frame_target(self, frame, camera_index):
+        if not self.manifests:
+            return self.raw_index[frame] * len(self.cameras) + camera_index
+        # Same file names the animation render would use, inside the camera's folder
+        return os.path.join(self.directories[camera_index], os.path.basename(self.scene.render.frame_path(frame=frame)))
+
+    def render_next(self, depsgraph):
+        frame = self.frames[self.index]
+        # Constraint and depsgraph evaluation of the frame, once for all cameras
+        with profiling.span("frame_set", "depsgraph", frame=frame):
+            self.scene.frame_set(frame)
+        for camera_index in self.pending[frame]:
+            pixels = self.capture.draw(self.scene, self.view_layer, self.cameras[camera_index], depsgraph)
+            self.writer.submit(frame, pixels, self.frame_target(frame, camera_index))
+            self.drawn += 1
+        self.index += 1
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        fps = self.index / elapsed if elapsed > 0 else 0.0
+        remaining = (len(self.frames) - self.index) / fps if fps > 0 else 0.0
+        return {"done": self.index, "total": len(self.frames), "fps": fps, "eta": remaining}
+
+    def finish(self):
+        # Waits for the writers; every frame drawn so far ends up on disk (and in the manifest)
+        self.capture.free()
+        self.scene.frame_set(self.frame_current)
+        return self.writer.close()
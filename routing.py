@@ -0,0 +1,275 @@
+import csv
+import hashlib
+import heapq
+import bpy
+import numpy as np
+from mathutils import kdtree
+from .trajectories import create_track_curve
+
+try:
+    # Not bundled with Blender; batch routing uses its compiled Dijkstra when it is installed
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as scipy_dijkstra
+except ImportError:
+    scipy_dijkstra = None
+
+# Navigation graphs over street networks drawn as curves (every spline a street) or meshes (edges).
+# The network is tessellated, endpoints closer than the merge distance are welded into one node, and
+# the graph is stored as CSR arrays: the neighbours of node i are indices[indptr[i]:indptr[i + 1]],
+# with the edge lengths in weights. Graphs are cached per object and keyed by a digest of the
+# evaluated network, so they are only rebuilt after the network (or its modifiers) changes.
+
+SCIPY_CHUNK_BYTES = 256 * 1024 * 1024
+
+_graph_cache = {}
+
+class RouteGraph:
+
+    def __init__(self, coords, indptr, indices, weights):
+        self.coords = coords
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._kd = None
+        self._adjacency = None
+
+    @property
+    def node_count(self):
+        return len(self.coords)
+
+    @property
+    def edge_count(self):
+        return len(self.indices) // 2
+
+    def nearest_node(self, point):
+        if self._kd is None:
+            self._kd = kdtree.KDTree(self.node_count)
+            for i, co in enumerate(self.coords.tolist()):
+                self._kd.insert(co, i)
+            self._kd.balance()
+        return self._kd.find(point)[1]
+
+    def adjacency(self):
+        # Python lists of the CSR arrays; the heap searches index them per edge, which numpy scalars make slow
+        if self._adjacency is None:
+            self._adjacency = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        return self._adjacency
+
+def build_csr(coords, edges):
+    # Undirected edges (m, 2) -> CSR arrays with both directions; duplicate edges keep the shortest
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    lengths = np.linalg.norm(coords[edges[:, 0]] - coords[edges[:, 1]], axis=1)
+    source = np.concatenate([edges[:, 0], edges[:, 1]])
+    target = np.concatenate([edges[:, 1], edges[:, 0]])
+    weight = np.concatenate([lengths, lengths])
+    order = np.lexsort((weight, target, source))
+    source, target, weight = source[order], target[order], weight[order]
+    unique = np.ones(len(source), dtype=bool)
+    unique[1:] = (source[1:] != source[:-1]) | (target[1:] != target[:-1])
+    source, target, weight = source[unique], target[unique], weight[unique]
+    indptr = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=len(coords)), out=indptr[1:])
+    return indptr, target.astype(np.int32), weight
+
+def network_digest(co, edges):
+    # Digest of the evaluated (tessellated, modifier-applied) network the graph is built from, so
+    # modifier, resolution or curve-setting edits rebuild it like edits of the source data do
+    digest = hashlib.blake2b(co.astype(np.float32).tobytes(), digest_size=16)
+    digest.update(edges.astype(np.int32).tobytes())
+    return digest.hexdigest()
+
+def network_edges(obj, depsgraph):
+    # World-space vertices and edges of the tessellated network
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", co)
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int64)
+        mesh.edges.foreach_get("vertices", edges)
+    finally:
+        obj_eval.to_mesh_clear()
+    matrix = np.array(obj.matrix_world)
+    return co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3], edges.reshape(-1, 2)
+
+def weld_nodes(co, merge_distance):
+    # Streets drawn as separate splines meet at coincident endpoints. Vertices closer than the merge
+    # distance (also through chains of such vertices) become one node, found by union-find over
+    # KD-tree range queries. Returns the node of every vertex and the node coordinates (cluster means).
+    tree = kdtree.KDTree(len(co))
+    for i, point in enumerate(co.tolist()):
+        tree.insert(point, i)
+    tree.balance()
+    parent = list(range(len(co)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, point in enumerate(co.tolist()):
+        for _, j, _ in tree.find_range(point, merge_distance):
+            if j > i:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+    roots, node = np.unique([find(i) for i in range(len(co))], return_inverse=True)
+    node = node.ravel()
+    coords = np.stack([np.bincount(node, weights=co[:, axis]) for axis in range(3)], axis=1)
+    return node, coords / np.bincount(node)[:, None]
+
+def build_route_graph(co, edges, merge_distance=0.01):
+    node, coords = weld_nodes(co, max(merge_distance, 1e-6))
+    indptr, indices, weights = build_csr(coords, node[edges])
+    return RouteGraph(coords, indptr, indices, weights)
+
+def route_graph(obj, depsgraph, merge_distance=0.01):
+    co, edges = network_edges(obj, depsgraph)
+    if not len(edges):
+        raise RuntimeError(f"'{obj.name}' has no edges to route along")
+    key = (network_digest(co, edges), merge_distance)
+    cached = _graph_cache.get(obj.name_full)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    graph = build_route_graph(co, edges, merge_distance)
+    _graph_cache[obj.name_full] = (key, graph)
+    return graph
+
+def clear_route_cache():
+    _graph_cache.clear()
+
+def _walk_back(predecessors, source, target):
+    nodes = [target]
+    while nodes[-1] != source:
+        previous = predecessors[nodes[-1]]
+        if previous < 0:
+            return None
+        nodes.append(previous)
+    return nodes[::-1]
+
+def shortest_path(graph, source, target):
+    # A* with the straight-line distance to the target as heuristic; (nodes, length) or (None, inf)
+    indptr, indices, weights = graph.adjacency()
+    heuristic = np.linalg.norm(graph.coords - graph.coords[target], axis=1).tolist()
+    distance = {source: 0.0}
+    predecessors = {source: -1}
+    done = set()
+    heap = [(heuristic[source], source)]
+    while heap:
+        estimate, node = heapq.heappop(heap)
+        if node == target:
+            return _walk_back(predecessors, source, target), distance[target]
+        if node in done:
+            continue
+        done.add(node)
+        base = distance[node]
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[edge]
+            candidate = base + weights[edge]
+            if candidate < distance.get(neighbour, float("inf")):
+                distance[neighbour] = candidate
+                predecessors[neighbour] = node
+                heapq.heappush(heap, (candidate + heuristic[neighbour], neighbour))
+    return None, float("inf")
+
+def shortest_path_tree(graph, source, targets=None):
+    # Dijkstra from source; stops once every node in targets is settled. Returns predecessors and distances.
+    indptr, indices, weights = graph.adjacency()
+    distance = np.full(graph.node_count, np.inf)
+    predecessors = np.full(graph.node_count, -1, dtype=np.int64)
+    distance_list = distance.tolist()
+    predecessor_list = predecessors.tolist()
+    remaining = set(targets) if targets is not None else None
+    done = bytearray(graph.node_count)
+    distance_list[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        base, node = heapq.heappop(heap)
+        if done[node]:
+            continue
+        done[node] = 1
+        if remaining is not None:
+            remaining.discard(node)
+            if not remaining:
+                break
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[edge]
+            candidate = base + weights[edge]
+            if candidate < distance_list[neighbour]:
+                distance_list[neighbour] = candidate
+                predecessor_list[neighbour] = node
+                heapq.heappush(heap, (candidate, neighbour))
+    return np.array(predecessor_list, dtype=np.int64), np.array(distance_list)
+
+def _shortest_path_trees(graph, origins, targets):
+    # (predecessors, distances) per origin, in order. scipy solves a chunk of origins per call; the
+    # chunks are sized so their (origins x nodes) result arrays stay around SCIPY_CHUNK_BYTES.
+    if scipy_dijkstra is not None:
+        matrix = csr_matrix((graph.weights, graph.indices, graph.indptr), shape=(graph.node_count, graph.node_count))
+        chunk = max(1, SCIPY_CHUNK_BYTES // (16 * graph.node_count))
+        for start in range(0, len(origins), chunk):
+            distances, predecessors = scipy_dijkstra(matrix, indices=origins[start:start + chunk], return_predecessors=True)
+            yield from zip(predecessors, distances)
+    else:
+        for origin, origin_targets in zip(origins.tolist(), targets):
+            yield shortest_path_tree(graph, origin, origin_targets)
+
+def solve_routes(graph, pairs):
+    # Batch of (origin node, destination node) pairs: one shortest-path tree per distinct origin serves
+    # all of its destinations, and is dropped once they are walked. Returns (nodes or None, length)
+    # per pair, in order.
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    origins, origin_row = np.unique(pairs[:, 0], return_inverse=True)
+    by_origin = [[] for origin in origins]
+    for index, row in enumerate(origin_row.ravel().tolist()):
+        by_origin[row].append(index)
+    destinations = pairs[:, 1].tolist()
+
+    routes = [None] * len(pairs)
+    trees = _shortest_path_trees(graph, origins, [[destinations[index] for index in indices] for indices in by_origin])
+    for origin, indices, (predecessors, distances) in zip(origins.tolist(), by_origin, trees):
+        for index in indices:
+            length = float(distances[destinations[index]])
+            routes[index] = (_walk_back(predecessors, origin, destinations[index]) if np.isfinite(length) else None, length)
+    return routes
+
+def route_points(graph, nodes, start=None, end=None):
+    # Node coordinates along a route, with the picked points (off the network) as first/last points
+    points = graph.coords[nodes]
+    if start is not None:
+        points = np.vstack([start, points])
+    if end is not None:
+        points = np.vstack([points, end])
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-6
+    return points[keep]
+
+def create_route_curve(name, points, speed, collection=None):
+    # Timestamps at the given travel speed, so the rig runs over the real travel time
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    return create_track_curve(name, points, lengths / speed, collection)
+
+def read_od_pairs(filepath):
+    # CSV rows of origin and destination coordinates: ox, oy, [oz,] dx, dy, [dz]
+    pairs = []
+    with open(filepath, newline="", encoding="utf-8-sig") as stream:
+        for line, row in enumerate(csv.reader(stream), 1):
+            try:
+                values = [float(value) for value in row if value.strip()]
+            except ValueError:
+                continue  # header
+            if len(values) == 4:
+                pairs.append(((values[0], values[1], 0.0), (values[2], values[3], 0.0)))
+            elif len(values) >= 6:
+                pairs.append((tuple(values[0:3]), tuple(values[3:6])))
+            elif values:
+                raise ValueError(f"line {line} has {len(values)} coordinates, expected 4 or 6")
+    return pairs
+
+def write_route_table(filepath, pairs, routes, names):
+    with open(filepath, "w", newline="", encoding="utf-8") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(("origin_x", "origin_y", "origin_z", "destination_x", "destination_y", "destination_z", "length", "nodes", "curve"))
+        for (origin, destination), (nodes, length), name in zip(pairs, routes, names):
+            writer.writerow((*origin, *destination, round(length, 3) if nodes else "", len(nodes) if nodes else 0, name or ""))
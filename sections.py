@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import sys
+import bpy
+import numpy as np
+from . import workers
+
+# Stacks of parallel section cuts through the scene from one orthographic camera. The camera object
+# stays where it is; each slice only moves its clip range along the view axis, so the cut plane sweeps
+# through the block while the scene is evaluated once. Slices are viewport renders in this session, or
+# final renders in this session or split across background workers, and are written as a numbered
+# image sequence with an index of slice depths.
+
+INDEX_NAME = "cito_sections.json"
+MIN_CLIP = 0.001
+
+def slice_filename(index):
+    return f"section_{index:04d}.png"
+
+def section_slices(start, step, count, depth):
+    # (clip_start, clip_end) per slice: the cut plane at start + i * step, looking depth beyond it
+    clip_start = np.maximum(start + step * np.arange(count, dtype=np.float64), MIN_CLIP)
+    return np.stack([clip_start, clip_start + depth], axis=1)
+
+def write_index(directory, camera, slices, step, depth):
+    # Slice depths along the view axis, plus the world position of every cut plane
+    matrix = np.array(camera.matrix_world, dtype=np.float64)
+    origin = matrix[:3, 3]
+    axis = -matrix[:3, 2] / np.linalg.norm(matrix[:3, 2])
+    index = {
+        "camera": camera.name,
+        "ortho_scale": camera.data.ortho_scale,
+        "step": step,
+        "depth": depth,
+        "origin": origin.tolist(),
+        "axis": axis.tolist(),
+        "slices": [
+            {"index": i, "file": slice_filename(i), "clip_start": near, "clip_end": far,
+             "plane_point": (origin + axis * near).tolist()}
+            for i, (near, far) in enumerate(slices.tolist())
+        ],
+    }
+    os.makedirs(directory, exist_ok=True)
+    filepath = os.path.join(directory, INDEX_NAME)
+    with open(filepath, "w", encoding="utf-8") as stream:
+        json.dump(index, stream, indent=2)
+    return filepath
+
+def render_slices(scene, camera, slices, directory, render_slice, indices=None, on_slice=None):
+    # Draws the given slices through camera, restoring its clip range and the scene camera afterwards
+    cam = camera.data
+    saved = scene.camera, cam.clip_start, cam.clip_end
+    scene.camera = camera
+    try:
+        for i in (range(len(slices)) if indices is None else indices):
+            cam.clip_start, cam.clip_end = slices[i]
+            render_slice(os.path.join(directory, slice_filename(i)))
+            if on_slice is not None:
+                on_slice(i)
+    finally:
+        scene.camera, cam.clip_start, cam.clip_end = saved
+
+def render_viewport_slice(scene, filepath):
+    # Through the scene camera, whatever the viewport is looking at
+    bpy.ops.render.opengl(view_context=False)
+    bpy.data.images["Render Result"].save_render(filepath, scene=scene)
+
+def render_final_slice(scene, filepath):
+    # Background workers have no viewport; they render with the file's render engine
+    scene.render.filepath = filepath
+    bpy.ops.render.render(write_still=True)
+
+def render_section_stack(context, camera, start, step, count, depth, directory, worker_count=1, renderer='VIEWPORT'):
+    # renderer: 'VIEWPORT' (OpenGL, in this session; background workers have no viewport) or 'FINAL'
+    # (the file's render engine, in this session or across workers). The worker count never changes
+    # how the slices look.
+    scene = context.scene
+    slices = section_slices(start, step, count, depth)
+    index_path = write_index(directory, camera, slices, step, depth)
+    scene.render.image_settings.file_format = 'PNG'
+
+    if renderer == 'VIEWPORT':
+        render_slices(scene, camera, slices, directory, lambda filepath: render_viewport_slice(scene, filepath))
+        return index_path, count
+    if worker_count <= 1 or count < 2 * worker_count:
+        render_slices(scene, camera, slices, directory, lambda filepath: render_final_slice(scene, filepath))
+        return index_path, count
+
+    with workers.blend_copy("cito_sections_") as blendfile:
+        jobs = []
+        for chunk in np.array_split(np.arange(count), worker_count):
+            command = workers.blender_command("sections", [
+                "--camera", camera.name, "--index", index_path, "--range", int(chunk[0]), int(chunk[-1]) + 1,
+            ], blendfile)
+            jobs.append((command, {"range": (int(chunk[0]), int(chunk[-1]) + 1)}))
+        results = workers.run_workers(jobs, worker_count)
+
+    failed = [result["job"]["range"] for result in results if result["returncode"] != 0]
+    if failed:
+        raise RuntimeError(f"Section workers failed for slices {', '.join(f'{a}-{b - 1}' for a, b in failed)}")
+    return index_path, sum(1 for result in results for event in result["events"] if event["event"] == "slice")
+
+def parse_worker_args(argv=None):
+    parser = argparse.ArgumentParser(prog="sections")
+    parser.add_argument("--camera", required=True)
+    parser.add_argument("--index", required=True)
+    parser.add_argument("--range", type=int, nargs=2, required=True)
+    return parser.parse_args(workers.script_args(argv))
+
+def main(argv=None):
+    # Worker entry point for render_section_stack(); not meant to be run by hand
+    args = parse_worker_args(argv)
+    with open(args.index, encoding="utf-8") as stream:
+        index = json.load(stream)
+    scene = bpy.context.scene
+    camera = bpy.data.objects.get(args.camera)
+    if camera is None:
+        workers.emit("error", message=f"Camera {args.camera} not found")
+        sys.exit(1)
+    slices = [(entry["clip_start"], entry["clip_end"]) for entry in index["slices"]]
+    scene.render.image_settings.file_format = 'PNG'
+    render_slices(scene, camera, slices, os.path.dirname(args.index),
+                  lambda filepath: render_final_slice(scene, filepath),
+                  range(*args.range), on_slice=lambda i: workers.emit("slice", index=i))
+    workers.emit("done", slices=args.range[1] - args.range[0])
+    sys.exit(0)
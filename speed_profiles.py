@@ -0,0 +1,130 @@
+import numpy as np
+from . import curves
+
+# Speed profiles for Follow Path rigs. A profile is a speed limit along the path (cruise speed, or
+# the speeds recorded by a GPS track), zero-speed stops with a dwell time, and acceleration/braking
+# limits. It is integrated into the distance travelled at every frame, which drive_at_distances()
+# writes to the offset_factor F-curve in one go; the frame range is the real travel time.
+#
+# Stops are stored on the curve datablock as distances along the path, in scene units:
+#   curve["cito_stops"]
+
+STOPS_PROP = "cito_stops"
+GRID_SPACING = 0.25   # scene units between the samples the profile is solved on
+
+def path_stops(curve_obj):
+    return sorted(float(distance) for distance in curve_obj.data.get(STOPS_PROP, []))
+
+def add_path_stop(curve_obj, point, oversample=8):
+    # Stop at the path point closest to point (world space); returns its distance along the path
+    table = curves.arc_length_table(curve_obj, oversample)
+    matrix = np.array(curve_obj.matrix_world)
+    world = table.points @ matrix[:3, :3].T + matrix[:3, 3]
+    nearest = int(np.argmin(np.linalg.norm(world - np.asarray(point), axis=1)))
+    distance = float(table.lengths[nearest]) * curves.world_length_scale(curve_obj)
+    curve_obj.data[STOPS_PROP] = sorted(path_stops(curve_obj) + [distance])
+    return distance
+
+def clear_path_stops(curve_obj):
+    if STOPS_PROP in curve_obj.data:
+        del curve_obj.data[STOPS_PROP]
+
+def profile_grid(length, stops=(), spacing=GRID_SPACING):
+    # Evenly spaced distances, with every stop inserted as an exact sample
+    count = max(2, int(np.ceil(length / spacing)) + 1)
+    return np.union1d(np.linspace(0.0, length, count), np.clip(np.asarray(stops, dtype=np.float64), 0.0, length))
+
+def limit_acceleration(distances, limits, acceleration, braking):
+    # Fastest speeds that stay under the limits and change at most by the given accelerations:
+    #   forward  v(s)^2 <= min_{j <= i} (limit_j^2 + 2 a (s - s_j))
+    #   backward v(s)^2 <= min_{j >= i} (limit_j^2 + 2 b (s_j - s))
+    # Both envelopes are running minima, so the whole profile is a few array passes.
+    squared = np.square(limits)
+    speed_squared = squared
+    if acceleration > 0.0:
+        forward = 2.0 * acceleration * distances + np.minimum.accumulate(squared - 2.0 * acceleration * distances)
+        speed_squared = np.minimum(speed_squared, forward)
+    if braking > 0.0:
+        backward = -2.0 * braking * distances + np.minimum.accumulate((squared + 2.0 * braking * distances)[::-1])[::-1]
+        speed_squared = np.minimum(speed_squared, backward)
+    return np.sqrt(np.maximum(speed_squared, 0.0))
+
+def travel_times(distances, speeds):
+    # Time at each grid distance; each segment takes its length over its mean speed. Mean speeds are
+    # floored so a segment between two standstills (a stop right at the start) stays finite.
+    mean_speed = 0.5 * (speeds[1:] + speeds[:-1])
+    floor = max(float(speeds.max()) * 1e-3, 1e-6)
+    return np.concatenate([[0.0], np.cumsum(np.diff(distances) / np.maximum(mean_speed, floor))])
+
+# Profiles are (times, distances, speeds) samples of the trip. Between two samples the acceleration
+# is constant, which frame_distances() uses to place every frame exactly; speeds is None for a plain
+# replay, which is interpolated linearly.
+
+def cruise_profile(length, speed, stops=(), stop_seconds=0.0, acceleration=0.0, braking=0.0, from_rest=True):
+    # A trip at cruise speed, halting stop_seconds at every stop
+    stops = [stop for stop in stops if 0.0 <= stop <= length]
+    grid = profile_grid(length, stops)
+    limits = np.full(len(grid), float(speed))
+    stop_index = np.searchsorted(grid, stops)
+    limits[stop_index] = 0.0
+    if from_rest:
+        limits[[0, -1]] = 0.0
+    speeds = limit_acceleration(grid, limits, acceleration, braking)
+    return _with_dwells(travel_times(grid, speeds), grid, speeds, stop_index, stop_seconds)
+
+def _with_dwells(times, distances, speeds, stop_index, seconds):
+    # Halts seconds (one value, or one per stop) at the given grid samples. Every sample becomes an
+    # arrival and a departure sample, which only differ in time at the stops.
+    if not len(stop_index) or np.all(np.asarray(seconds) <= 0.0):
+        return times, distances, speeds
+    dwell = np.zeros(len(distances))
+    np.add.at(dwell, stop_index, seconds)
+    departures = times + np.cumsum(dwell)
+    arrivals = departures - dwell
+    return np.stack([arrivals, departures], axis=1).ravel(), np.repeat(distances, 2), np.repeat(speeds, 2)
+
+def gps_profile(curve_obj, acceleration=0.0, braking=0.0):
+    # Profile from the per-point timestamps of an imported track (a POLY curve). Without
+    # acceleration limits this replays the recording; with them, the recorded segment speeds become
+    # speed limits and pauses in the recording (time passing without movement) become stops.
+    timestamps = np.asarray(curve_obj.data.get("cito_timestamps", []), dtype=np.float64)
+    spline = curve_obj.data.splines[0] if curve_obj.data.splines else None
+    if spline is None or len(timestamps) != len(spline.points) or len(timestamps) < 2:
+        raise ValueError("The path has no per-point timestamps (import it as a GPS track)")
+    matrix = np.array(curve_obj.matrix_world)
+    points = curves.spline_control_points(spline) @ matrix[:3, :3].T
+    distances = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    if acceleration <= 0.0 and braking <= 0.0:
+        return timestamps - timestamps[0], distances, None
+
+    segment_seconds = np.diff(timestamps)
+    segment_length = np.diff(distances)
+    moving = segment_length > 1e-6
+    if not moving.any():
+        raise ValueError("The recorded track never moves")
+    # Speed limit from the middle of every moving segment, standing still where the recording pauses
+    middles = distances[:-1][moving] + 0.5 * segment_length[moving]
+    speed = segment_length[moving] / np.maximum(segment_seconds[moving], 1e-6)
+    pauses = distances[:-1][~moving]
+    grid = profile_grid(distances[-1], pauses)
+    limits = np.interp(grid, middles, speed)
+    stop_index = np.searchsorted(grid, pauses)
+    limits[stop_index] = 0.0
+    limits[[0, -1]] = 0.0
+    speeds = limit_acceleration(grid, limits, acceleration, braking)
+    return _with_dwells(travel_times(grid, speeds), grid, speeds, stop_index, segment_seconds[~moving])
+
+def frame_distances(times, distances, speeds, fps, frame_start):
+    # Distance along the path at every frame of the trip; the last frame is the arrival
+    frame_end = frame_start + max(1, int(np.ceil(times[-1] * fps)))
+    frames = np.arange(frame_start, frame_end + 1)
+    t = (frames - frame_start) / fps
+    if speeds is None:
+        return frames, np.interp(t, times, distances)
+    # s = s0 + v0 tau + a tau^2 / 2 within the sample interval each frame falls in
+    i = np.clip(np.searchsorted(times, t, side="right") - 1, 0, len(times) - 2)
+    span = times[i + 1] - times[i]
+    tau = np.clip(t - times[i], 0.0, span)
+    acceleration = np.divide(speeds[i + 1] - speeds[i], span, out=np.zeros(len(i)), where=span > 0.0)
+    travelled = distances[i] + speeds[i] * tau + 0.5 * acceleration * tau * tau
+    return frames, np.clip(travelled, distances[i], distances[i + 1])
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+import numpy as np
+from cito.agents import AgentSimulation
+
+def _simulation(count=60, min_gap=1.0, seed=3):
+    # Two open paths and one loop; gaps() and step() only need the lengths and cyclic flags
+    network = SimpleNamespace(lengths=np.array([40.0, 25.0, 30.0]), cyclic=np.array([False, False, True]))
+    return AgentSimulation(network, count, min_gap=min_gap, seed=seed)
+
+def _brute_force_gaps(simulation):
+    gaps = np.full(len(simulation.path), np.inf)
+    for i in range(len(gaps)):
+        path = simulation.path[i]
+        length = simulation.network.lengths[path]
+        for j in range(len(gaps)):
+            if j == i or simulation.path[j] != path:
+                continue
+            ahead = simulation.distance[j] - simulation.distance[i]
+            if ahead < 0.0 and simulation.network.cyclic[path]:
+                ahead += length
+            if ahead >= 0.0:
+                gaps[i] = min(gaps[i], ahead)
+    return gaps
+
+def test_gaps_match_brute_force():
+    simulation = _simulation()
+    # Distinct distances, so the order of agents on a path is unambiguous
+    assert len(np.unique(simulation.distance)) == len(simulation.distance)
+    assert np.allclose(simulation.gaps(), _brute_force_gaps(simulation))
+
+def test_gaps_of_lone_agents():
+    simulation = _simulation(count=2)
+    simulation.path = np.array([0, 2])
+    simulation.distance = np.array([5.0, 12.0])
+    gaps = simulation.gaps()
+    # Nobody ahead on the open path; around the whole loop on the cyclic one
+    assert gaps[0] == np.inf
+    assert np.isclose(gaps[1], 30.0)
+
+def test_steps_keep_the_minimum_gap():
+    simulation = _simulation(count=40, min_gap=1.0)
+    # Spread the agents out first so every one starts at least min_gap behind the next
+    for path, length in enumerate(simulation.network.lengths):
+        on_path = np.flatnonzero(simulation.path == path)
+        simulation.distance[on_path] = np.arange(len(on_path)) * (length / max(len(on_path), 1))
+    lengths = simulation.network.lengths
+    for _ in range(500):
+        simulation.step(0.1)
+        moving = simulation.distance < lengths[simulation.path]
+        gaps = simulation.gaps()
+        assert np.all(gaps[moving & np.isfinite(gaps)] >= 1.0 - 1e-6)
+        assert np.all(simulation.distance <= lengths[simulation.path])
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from cito import curves
+from cito.curves import ArcLengthTable, drive_at_distances
+from cito.utilities import BAKE_GROUP, PATH_GROUP, bake_navigation, unbake_navigation
+
+# Just enough of Blender's F-curve, constraint and object API for baking a rig outside Blender
+
+class KeyframePoints:
+
+    def __init__(self):
+        self.co = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.co) // 2
+
+    def clear(self):
+        self.co = np.zeros(0, dtype=np.float32)
+
+    def add(self, count):
+        self.co = np.zeros(len(self.co) + 2 * count, dtype=np.float32)
+
+    def foreach_set(self, attribute, values):
+        if attribute == "co":
+            self.co[:] = values
+
+    def foreach_get(self, attribute, values):
+        values[:] = self.co
+
+class FCurves(list):
+
+    def find(self, data_path, index=0):
+        return next((fc for fc in self if fc.data_path == data_path and fc.array_index == index), None)
+
+    def new(self, data_path, index=0, action_group=""):
+        fcurve = SimpleNamespace(data_path=data_path, array_index=index, keyframe_points=KeyframePoints(),
+                                 group=SimpleNamespace(name=action_group) if action_group else None, update=lambda: None)
+        self.append(fcurve)
+        return fcurve
+
+class Constraints(list):
+
+    def get(self, name):
+        return next((constraint for constraint in self if constraint.name == name), None)
+
+class RigObject(dict):
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.parent = None
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.rotation_mode = 'XYZ'
+        self.matrix_world = np.eye(4)
+        self.constraints = Constraints([SimpleNamespace(name="Follow Path", mute=False, use_fixed_location=False)])
+        self.animation_data = SimpleNamespace(action=SimpleNamespace(fcurves=FCurves()))
+
+def _curves(obj, group, data_path="location"):
+    return {fc.array_index: fc for fc in obj.animation_data.action.fcurves
+            if fc.data_path == data_path and fc.group is not None and fc.group.name == group}
+
+@pytest.fixture
+def rig(monkeypatch):
+    # A camera at 2 units/frame along a 20 unit open path along X, its target 5 units ahead on the same path
+    camera, target = RigObject("Cam"), RigObject("Cam_Target")
+    points = np.column_stack((np.linspace(0.0, 20.0, 21), np.zeros(21), np.zeros(21)))
+    table = ArcLengthTable(points, points[:, 0].copy(), points[:, 0] / 20.0, False)
+    monkeypatch.setattr(curves, "arc_length_table", lambda curve_obj, oversample=8: table)
+    monkeypatch.setattr(curves, "world_length_scale", lambda curve_obj: 1.0)
+    monkeypatch.setattr(curves, "path_target_follower", lambda camera, curve_obj: (target, target.constraints[0]))
+    frames = np.arange(1, 11)
+    distances = 2.0 * (frames - 1) + 2.0
+    constraint = camera.constraints[0]
+    constraint.target = None
+    target.constraints[0].forward_axis = 'FORWARD_Y'
+    target.constraints[0].use_curve_follow = False
+    drive_at_distances(camera, constraint, frames, distances, target_lead=5.0)
+
+    def frame_set(frame):
+        # The live rig: Follow Path at the keyed distance, the target carried on past the end
+        distance = np.interp(frame, frames, distances)
+        camera.matrix_world = np.eye(4)
+        camera.matrix_world[0, 3] = min(distance, 20.0)
+        target.matrix_world = np.eye(4)
+        target.matrix_world[0, 3] = distance + 5.0
+        scene.frame_current = frame
+
+    scene = SimpleNamespace(frame_start=1, frame_end=10, frame_current=1, frame_set=frame_set)
+    return scene, camera, target, frames, distances
+
+def test_drive_writes_overshoot_past_the_open_end(rig):
+    scene, camera, target, frames, distances = rig
+    overshoot = _curves(target, PATH_GROUP)
+    assert sorted(overshoot) == [0, 1, 2]
+    # Tangent of the path end is +X; the lead passes the 20 unit end from frame 8 on
+    assert np.allclose(overshoot[0].keyframe_points.co[1::2], np.maximum(distances + 5.0 - 20.0, 0.0))
+    assert np.allclose(overshoot[1].keyframe_points.co[1::2], 0.0)
+
+def test_bake_covers_the_path_target_and_unbake_restores_its_keys(rig):
+    scene, camera, target, frames, distances = rig
+    path_keys = {index: fc.keyframe_points.co.copy() for index, fc in _curves(target, PATH_GROUP).items()}
+
+    baked = bake_navigation(scene, [camera, target])
+    assert baked == [camera, target]
+    assert all(constraint.mute for obj in baked for constraint in obj.constraints)
+    # The overshoot keys are set aside; the baked location carries the target past the end
+    assert not _curves(target, PATH_GROUP)
+    assert np.allclose(_curves(target, BAKE_GROUP)[0].keyframe_points.co[1::2], distances + 5.0)
+    assert np.allclose(_curves(camera, BAKE_GROUP)[0].keyframe_points.co[1::2], np.minimum(distances, 20.0))
+
+    assert unbake_navigation([camera, target]) == [camera, target]
+    assert not _curves(target, BAKE_GROUP) and not _curves(camera, BAKE_GROUP)
+    assert not _curves(target, BAKE_GROUP, "rotation_euler")
+    restored = _curves(target, PATH_GROUP)
+    assert sorted(restored) == sorted(path_keys)
+    assert all(np.allclose(restored[index].keyframe_points.co, co) for index, co in path_keys.items())
+    assert not any(constraint.mute for obj in (camera, target) for constraint in obj.constraints)
+    assert "cito_prebake_path_keys" not in target
+
+def test_hand_keyed_objects_stay_live(rig):
+    scene, camera, target, frames, distances = rig
+    camera.animation_data.action.fcurves.new("location", 2, action_group="Object Transforms")
+    assert bake_navigation(scene, [camera, target]) == [target]
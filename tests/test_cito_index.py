@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+import pytest
+from cito import utilities
+from cito.utilities import CitoIndex
+
+class FakeID:
+    # A tagged datablock; like bpy, every access raises ReferenceError once it is removed
+
+    _next_pointer = 1
+
+    def __init__(self, name, role, kind=None):
+        self._name = name
+        self._props = {"cito_role": role, "cito_camera_kind": kind}
+        self._pointer = FakeID._next_pointer
+        FakeID._next_pointer += 1
+        self.removed = False
+
+    def _check(self):
+        if self.removed:
+            raise ReferenceError("StructRNA of type Object has been removed")
+
+    @property
+    def name(self):
+        self._check()
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._check()
+        self._name = value
+
+    def get(self, key, default=None):
+        self._check()
+        value = self._props.get(key)
+        return default if value is None else value
+
+    def as_pointer(self):
+        return self._pointer
+
+@pytest.fixture
+def index(monkeypatch):
+    objects = [FakeID("Cam_B", 'CAMERA', 'ANIMATED'), FakeID("Cam_A", 'CAMERA', 'TOP_ORTHO'), FakeID("Path", 'PATH')]
+    monkeypatch.setattr(utilities.bpy, "data", SimpleNamespace(objects=objects, collections=[]), raising=False)
+    index = CitoIndex()
+    return index, objects
+
+def _names(items):
+    return [id_data.name for id_data in items]
+
+def test_items_are_sorted_and_filtered(index):
+    index, objects = index
+    assert _names(index.items('CAMERA')) == ["Cam_A", "Cam_B"]
+    assert _names(index.items('CAMERA', 'TOP_ORTHO')) == ["Cam_A"]
+    assert index.count('PATH') == 1
+
+def test_sorted_view_is_reused_until_something_changes(index):
+    index, objects = index
+    index.items('CAMERA')
+    view = index._views[('CAMERA', None)]
+    assert _names(index.items('CAMERA')) == ["Cam_A", "Cam_B"]
+    # Repeated depsgraph updates of an indexed camera keep the view too
+    index.add(objects[0])
+    assert index._views[('CAMERA', None)] is view
+    # A new camera drops it
+    index.add(FakeID("Cam_C", 'CAMERA', 'ANIMATED'))
+    assert ('CAMERA', None) not in index._views
+    assert _names(index.items('CAMERA')) == ["Cam_A", "Cam_B", "Cam_C"]
+
+def test_rename_delete_and_add_in_one_go(index):
+    index, objects = index
+    assert index.count('CAMERA') == 2
+    # bpy.data keeps its size: one camera renamed, one removed, one added
+    objects[0].name = "Cam_0"
+    objects[1].removed = True
+    new = FakeID("Cam_C", 'CAMERA', 'ANIMATED')
+    index.add(new)
+    assert index.count('CAMERA') == 2
+    assert _names(index.items('CAMERA')) == ["Cam_0", "Cam_C"]
+    assert _names(index.items('CAMERA', 'TOP_ORTHO')) == []
+
+def test_rename_reorders_a_cached_view(index):
+    index, objects = index
+    assert _names(index.items('CAMERA')) == ["Cam_A", "Cam_B"]
+    objects[1].name = "Cam_Z"
+    assert _names(index.items('CAMERA')) == ["Cam_B", "Cam_Z"]
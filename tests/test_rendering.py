@@ -0,0 +1,68 @@
+import struct
+import zlib
+import numpy as np
+import pytest
+from cito.rendering import FrameManifest, encode_png, render_incremental, write_png
+
+def _decode_png(data):
+    # Minimal reader for the 8-bit RGBA, filter-free PNGs the writers produce
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset, idat, header = 8, b"", None
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(kind + body) & 0xffffffff
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat += body
+        offset += 12 + length
+    width, height = header[:2]
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert np.all(rows[:, 0] == 0)
+    return rows[:, 1:].reshape(height, width, 4)
+
+@pytest.mark.parametrize("band_rows", [1, 7, 256])
+def test_write_png_round_trip(tmp_path, band_rows):
+    pixels = np.random.default_rng(4).integers(0, 256, size=(37, 23, 4), dtype=np.uint8)
+    path = tmp_path / "frame.png"
+    write_png(str(path), pixels, band_rows=band_rows)
+    assert np.array_equal(_decode_png(path.read_bytes()), pixels)
+    assert np.array_equal(_decode_png(encode_png(pixels)), pixels)
+
+def test_write_png_from_memory_map(tmp_path):
+    pixels = np.lib.format.open_memmap(str(tmp_path / "image.npy"), mode="w+", dtype=np.uint8, shape=(300, 40, 4))
+    pixels[:] = np.arange(300, dtype=np.uint8)[:, None, None]
+    path = tmp_path / "image.png"
+    write_png(str(path), pixels, band_rows=64)
+    assert np.array_equal(_decode_png(path.read_bytes()), pixels)
+
+def _render_into(directory, frames, keys, rendered):
+    manifest = FrameManifest(str(directory))
+
+    def render_frame(frame, filepath):
+        rendered.append(frame)
+        with open(filepath, "wb") as stream:
+            stream.write(f"{keys[frame]}".encode())
+
+    return render_incremental(manifest, frames, render_frame, lambda frame: str(directory / f"{frame:04d}.png"), keys=keys)
+
+def test_render_incremental_links_repeated_states(tmp_path):
+    frames = range(1, 9)
+    # A held pose: frames 3-6 look the same
+    keys = {frame: "held" if 3 <= frame <= 6 else f"k{frame}" for frame in frames}
+    rendered = []
+    stats = _render_into(tmp_path, frames, keys, rendered)
+    assert rendered == [1, 2, 3, 7, 8]
+    assert stats == {"rendered": 5, "linked": 3, "skipped": 0}
+    assert all((tmp_path / f"{frame:04d}.png").read_bytes() == keys[frame].encode() for frame in frames)
+
+    # Unchanged keys skip everything; a changed held frame renders alone and leaves the others intact
+    rendered.clear()
+    assert _render_into(tmp_path, frames, keys, rendered)["skipped"] == 8 and rendered == []
+    keys[3] = "changed"
+    stats = _render_into(tmp_path, frames, keys, rendered)
+    assert rendered == [3] and stats["skipped"] == 7
+    assert (tmp_path / "0003.png").read_bytes() == b"changed"
+    assert all((tmp_path / f"{frame:04d}.png").read_bytes() == b"held" for frame in (4, 5, 6))
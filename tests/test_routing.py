@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from cito import routing
+from cito.routing import RouteGraph, build_csr, solve_routes
+
+# A 4 x 4 street grid, 10 m blocks, with one long diagonal shortcut
+SIDE = 4
+
+def _grid():
+    coords = np.array([(x * 10.0, y * 10.0, 0.0) for y in range(SIDE) for x in range(SIDE)])
+    edges = []
+    for y in range(SIDE):
+        for x in range(SIDE):
+            node = y * SIDE + x
+            if x + 1 < SIDE:
+                edges.append((node, node + 1))
+            if y + 1 < SIDE:
+                edges.append((node, node + SIDE))
+    edges.append((0, SIDE * SIDE - 1))
+    return coords, np.array(edges)
+
+def _graph(coords, edges):
+    return RouteGraph(coords, *build_csr(coords, edges))
+
+def test_build_csr_is_symmetric_and_deduplicated():
+    coords = np.array([(0.0, 0.0, 0.0), (3.0, 4.0, 0.0), (6.0, 8.0, 0.0)])
+    # A duplicate edge (both directions), and a self loop that must be dropped
+    edges = np.array([(0, 1), (1, 0), (1, 2), (2, 2)])
+    indptr, indices, weights = build_csr(coords, edges)
+    assert indptr.tolist() == [0, 1, 3, 4]
+    assert indices.tolist() == [1, 0, 2, 1]
+    assert np.allclose(weights, 5.0)
+
+@pytest.fixture(params=["scipy", "heapq"])
+def solver(request, monkeypatch):
+    if request.param == "scipy":
+        if routing.scipy_dijkstra is None:
+            pytest.skip("scipy is not installed")
+        # Several chunks of origins per batch
+        monkeypatch.setattr(routing, "SCIPY_CHUNK_BYTES", 16 * SIDE * SIDE)
+    else:
+        monkeypatch.setattr(routing, "scipy_dijkstra", None)
+    return request.param
+
+def test_solve_routes_matches_single_searches(solver):
+    graph = _graph(*_grid())
+    rng = np.random.default_rng(2)
+    pairs = rng.integers(0, graph.node_count, size=(40, 2))
+    routes = solve_routes(graph, pairs)
+    assert len(routes) == len(pairs)
+    for (origin, destination), (nodes, length) in zip(pairs.tolist(), routes):
+        expected_nodes, expected_length = routing.shortest_path(graph, origin, destination)
+        assert np.isclose(length, expected_length)
+        assert nodes[0] == origin and nodes[-1] == destination
+        steps = np.linalg.norm(np.diff(graph.coords[nodes], axis=0), axis=1)
+        assert np.isclose(steps.sum(), length)
+
+def test_solve_routes_takes_the_shortcut(solver):
+    graph = _graph(*_grid())
+    (nodes, length), = solve_routes(graph, [(0, SIDE * SIDE - 1)])
+    assert nodes == [0, SIDE * SIDE - 1]
+    assert np.isclose(length, np.hypot(30.0, 30.0))
+
+def test_solve_routes_unreachable(solver):
+    coords = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (5.0, 0.0, 0.0), (6.0, 0.0, 0.0)])
+    graph = _graph(coords, np.array([(0, 1), (2, 3)]))
+    routes = solve_routes(graph, [(0, 3), (0, 1), (2, 2)])
+    assert routes[0] == (None, float("inf"))
+    assert routes[1][0] == [0, 1] and np.isclose(routes[1][1], 1.0)
+    assert routes[2] == ([2], 0.0)
+
+def test_read_od_pairs(tmp_path):
+    path = tmp_path / "pairs.csv"
+    path.write_text("ox,oy,dx,dy\n0,0,10,10\n1,2,3,4,5,6\n\n", encoding="utf-8")
+    assert routing.read_od_pairs(str(path)) == [((0.0, 0.0, 0.0), (10.0, 10.0, 0.0)), ((1.0, 2.0, 3.0), (4.0, 5.0, 6.0))]
+    path.write_text("0,0,10,10\n1,2,3\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 2"):
+        routing.read_od_pairs(str(path))
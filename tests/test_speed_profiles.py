@@ -0,0 +1,41 @@
+import numpy as np
+from cito.speed_profiles import cruise_profile, frame_distances, limit_acceleration
+
+def test_limit_acceleration_respects_limits_and_rates():
+    distances = np.linspace(0.0, 100.0, 201)
+    limits = np.full(len(distances), 10.0)
+    limits[[0, 100, -1]] = 0.0
+    speeds = limit_acceleration(distances, limits, 1.0, 2.0)
+    assert np.all(speeds <= limits + 1e-9)
+    squared = np.square(speeds)
+    step = np.diff(distances)
+    # v^2 grows by at most 2 a ds and shrinks by at most 2 b ds
+    assert np.all(np.diff(squared) <= 2.0 * 1.0 * step + 1e-9)
+    assert np.all(-np.diff(squared) <= 2.0 * 2.0 * step + 1e-9)
+    # Accelerating from the start is the only limit on the first few metres
+    assert np.isclose(speeds[10], np.sqrt(2.0 * 1.0 * distances[10]))
+
+def test_limit_acceleration_without_rates_is_the_limits():
+    distances = np.linspace(0.0, 10.0, 11)
+    limits = np.linspace(5.0, 1.0, 11)
+    assert np.allclose(limit_acceleration(distances, limits, 0.0, 0.0), limits)
+
+def test_frame_distances_linear_replay():
+    frames, distances = frame_distances(np.array([0.0, 2.0]), np.array([0.0, 10.0]), None, 24, 1)
+    assert frames[0] == 1 and frames[-1] == 49
+    assert np.allclose(distances, np.linspace(0.0, 10.0, 49))
+
+def test_frame_distances_constant_acceleration():
+    # From rest at 2 m/s^2 for 3 s: s = t^2
+    times, distances, speeds = np.array([0.0, 3.0]), np.array([0.0, 9.0]), np.array([0.0, 6.0])
+    frames, travelled = frame_distances(times, distances, speeds, 10, 0)
+    t = frames / 10.0
+    assert np.allclose(travelled, t * t)
+
+def test_cruise_profile_arrives_and_never_goes_back():
+    times, distances, speeds = cruise_profile(50.0, 5.0, stops=[20.0], stop_seconds=3.0, acceleration=1.0, braking=1.0)
+    frames, travelled = frame_distances(times, distances, speeds, 25, 1)
+    assert np.all(np.diff(travelled) >= -1e-9)
+    assert np.isclose(travelled[-1], 50.0)
+    # The stop holds the camera for its dwell time
+    assert np.count_nonzero(np.isclose(travelled, 20.0)) >= 3.0 * 25 - 1
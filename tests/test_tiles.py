@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from cito.tiles import tile_layout
+
+def _camera(ortho_scale=20.0, shift_x=0.0, shift_y=0.0, sensor_fit='AUTO'):
+    data = SimpleNamespace(ortho_scale=ortho_scale, shift_x=shift_x, shift_y=shift_y, sensor_fit=sensor_fit)
+    return SimpleNamespace(name="Plan", data=data)
+
+@pytest.mark.parametrize("width, height, columns, rows", [(1000, 600, 3, 2), (1920, 1080, 4, 4), (640, 640, 1, 1)])
+@pytest.mark.parametrize("shift", [(0.0, 0.0), (0.25, -0.1)])
+def test_tiles_cover_the_frame(width, height, columns, rows, shift):
+    camera = _camera(shift_x=shift[0], shift_y=shift[1])
+    layout = tile_layout(camera, width, height, columns, rows)
+    cam = camera.data
+    pixel_size = cam.ortho_scale / max(width, height)
+
+    covered = np.zeros((height, width), dtype=np.int32)
+    for tile in layout["tiles"]:
+        x, y = tile["x"], tile["y"]
+        covered[y:y + tile["crop_height"], x:x + tile["crop_width"]] += 1
+        # The tile's left/top edge in camera space is where that pixel sits in the full frame
+        assert np.isclose(tile["ortho_scale"], layout["tile_width"] * pixel_size)
+        left = tile["shift_x"] * tile["ortho_scale"] - tile["ortho_scale"] / 2
+        top = tile["shift_y"] * tile["ortho_scale"] + layout["tile_height"] * pixel_size / 2
+        assert np.isclose(left, cam.shift_x * cam.ortho_scale + (x - width / 2) * pixel_size)
+        assert np.isclose(top, cam.shift_y * cam.ortho_scale + (height / 2 - y) * pixel_size)
+    assert np.all(covered == 1)
+    assert [tile["index"] for tile in layout["tiles"]] == list(range(len(layout["tiles"])))
+
+def test_overhanging_grid_skips_empty_tiles():
+    # ceil(9 / 4) = 3 pixel columns per tile, so the fourth column of tiles would start past the frame
+    layout = tile_layout(_camera(), 9, 10, 4, 1)
+    assert layout["tile_width"] == 3 and len(layout["tiles"]) == 3
+    # ... while ceil(10 / 4) = 3 leaves the last tile one pixel wide
+    layout = tile_layout(_camera(), 10, 10, 4, 1)
+    assert len(layout["tiles"]) == 4 and layout["tiles"][-1]["crop_width"] == 1
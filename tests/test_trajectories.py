@@ -0,0 +1,99 @@
+import threading
+import time
+import numpy as np
+import pytest
+from cito.trajectories import TrackImport, douglas_peucker, read_gpx
+
+def _reference(points, tolerance, start, end, keep):
+    # Textbook recursive Douglas-Peucker, to compare the vectorized version against
+    if end - start < 2:
+        return
+    a, b = points[start], points[end]
+    ab = b - a
+    length_squared = ab @ ab
+    best, farthest = -1.0, None
+    for index in range(start + 1, end):
+        ap = points[index] - a
+        t = np.clip(ap @ ab / length_squared, 0.0, 1.0) if length_squared > 0 else 0.0
+        distance = np.linalg.norm(ap - t * ab)
+        if distance > best:
+            best, farthest = distance, index
+    if best > tolerance:
+        keep.add(farthest)
+        _reference(points, tolerance, start, farthest, keep)
+        _reference(points, tolerance, farthest, end, keep)
+
+def test_straight_line_keeps_the_ends():
+    points = np.column_stack((np.linspace(0.0, 10.0, 50), np.zeros(50), np.zeros(50)))
+    assert douglas_peucker(points, 0.01).tolist() == [0, 49]
+
+def test_short_tracks_and_zero_tolerance_keep_everything():
+    points = np.random.default_rng(0).normal(size=(20, 3))
+    assert douglas_peucker(points[:2], 1.0).tolist() == [0, 1]
+    assert douglas_peucker(points, 0.0).tolist() == list(range(20))
+
+def test_matches_recursive_simplification():
+    rng = np.random.default_rng(1)
+    points = np.cumsum(rng.normal(size=(500, 3)), axis=0)
+    for tolerance in (0.5, 2.0, 8.0):
+        keep = {0, len(points) - 1}
+        _reference(points, tolerance, 0, len(points) - 1, keep)
+        assert douglas_peucker(points, tolerance).tolist() == sorted(keep)
+
+def test_dropped_points_stay_within_tolerance():
+    t = np.linspace(0.0, 4.0 * np.pi, 1000)
+    points = np.column_stack((t, np.sin(t), np.zeros_like(t)))
+    keep = douglas_peucker(points, 0.05)
+    assert len(keep) < len(points) // 4
+    for start, end in zip(keep[:-1], keep[1:]):
+        a, ab = points[start], points[end] - points[start]
+        ap = points[start:end + 1] - a
+        t = np.clip(ap @ ab / (ab @ ab), 0.0, 1.0)
+        assert np.linalg.norm(ap - t[:, None] * ab, axis=1).max() <= 0.05 + 1e-9
+
+def _write_gpx(path, count):
+    with open(path, "w", encoding="utf-8") as stream:
+        stream.write('<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><name>Walk</name><trkseg>')
+        for i in range(count):
+            stream.write(f'<trkpt lat="{50.0 + i * 1e-5}" lon="20.0"><ele>{i}</ele><time>2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z</time></trkpt>')
+        stream.write("</trkseg></trk></gpx>")
+
+def test_read_gpx(tmp_path):
+    path = tmp_path / "walk.gpx"
+    _write_gpx(path, 3000)
+    tracks = list(read_gpx(str(path)))
+    assert len(tracks) == 1 and tracks[0].name == "Walk" and len(tracks[0]) == 3000
+    assert np.allclose(tracks[0].lat[:2], [50.0, 50.00001]) and tracks[0].ele[-1] == 2999.0
+    assert np.allclose(np.diff(tracks[0].times), 1.0)
+
+def test_read_gpx_stops_when_cancelled(tmp_path):
+    path = tmp_path / "walk.gpx"
+    _write_gpx(path, 100)
+    stop = threading.Event()
+    stop.set()
+    assert list(read_gpx(str(path), stop)) == []
+
+def _import(paths, **options):
+    track_import = TrackImport(paths, **options)
+    tracks = []
+    deadline = time.monotonic() + 10.0
+    while not track_import.done and time.monotonic() < deadline:
+        tracks += list(track_import.finished_tracks(0.1))
+    assert track_import.done
+    return track_import, tracks
+
+@pytest.mark.parametrize("scale", [0.01, 100.0])
+def test_tolerance_is_in_metres_whatever_the_scale(tmp_path, scale):
+    # A zigzag walk with 2 m sideways steps: a 1 m tolerance keeps some corners, not all points
+    path = tmp_path / "zigzag.gpx"
+    with open(path, "w", encoding="utf-8") as stream:
+        stream.write('<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>')
+        for i in range(400):
+            lon = 20.0 + 3e-5 * np.sin(i / 7.0)
+            stream.write(f'<trkpt lat="{50.0 + i * 1e-5}" lon="{lon}"><ele>0</ele></trkpt>')
+        stream.write("</trkseg></trk></gpx>")
+    reference, tracks = _import([str(path)], tolerance=1.0)
+    assert 2 < reference.stats["kept"] < reference.stats["points"]
+    scaled, scaled_tracks = _import([str(path)], tolerance=1.0, scale=scale)
+    assert scaled.stats["kept"] == reference.stats["kept"]
+    assert np.allclose(scaled_tracks[0][1], tracks[0][1] * scale)
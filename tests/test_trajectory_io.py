@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from cito.trajectory_io import ALIGNMENT, TrajectoryFile, create_trajectory_file, quaternion_matrices
+
+def _rig(name, target=None):
+    return {"name": name, "type": 'PERSP', "sensor_width": 36.0, "sensor_fit": 'AUTO', "clip_start": 0.1,
+            "clip_end": 1000.0, "scale": [1.0, 1.0, 1.0], "target": target}
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "rigs.citotraj")
+    rigs = [_rig("Street", target="Street_Target"), _rig("Drone")]
+    rng = np.random.default_rng(5)
+    frames = np.arange(10, 47, dtype=np.float32)
+    written = {}
+    trajectory = create_trajectory_file(path, rigs, 10, len(frames), 25.0)
+    trajectory.frames()[:] = frames
+    for rig, name, width in [("Street", "location", 3), ("Street", "rotation", 4), ("Street", "target", 3),
+                             ("Drone", "location", 3), ("Drone", "lens", 1)]:
+        written[rig, name] = rng.normal(size=(len(frames), width)).astype(np.float32)
+        trajectory.column(rig, name)[:] = written[rig, name]
+    trajectory.data.flush()
+    del trajectory
+
+    trajectory = TrajectoryFile(path)
+    assert trajectory.header["frame_start"] == 10 and trajectory.header["fps"] == 25.0
+    assert [rig["name"] for rig in trajectory.rigs] == ["Street", "Drone"]
+    assert np.array_equal(trajectory.frames(), frames)
+    for (rig, name), values in written.items():
+        assert np.array_equal(trajectory.column(rig, name), values)
+    assert trajectory.has_column("Street", "target") and not trajectory.has_column("Drone", "target")
+    # Every column starts on an aligned offset in the file
+    assert trajectory.data_offset % ALIGNMENT == 0
+    assert all(column["offset"] % ALIGNMENT == 0 for column in trajectory.header["columns"])
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"NOTATRAJ" + bytes(64))
+    with pytest.raises(ValueError):
+        TrajectoryFile(str(path))
+
+def test_quaternion_matrices():
+    angle = np.radians(90.0)
+    quaternions = np.array([(1.0, 0.0, 0.0, 0.0), (np.cos(angle / 2), 0.0, 0.0, np.sin(angle / 2))])
+    matrices = quaternion_matrices(quaternions)
+    assert np.allclose(matrices[0], np.eye(3))
+    # 90 degrees about Z takes X to Y
+    assert np.allclose(matrices[1] @ (1.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+    rotations = quaternion_matrices(np.random.default_rng(6).normal(size=(20, 4)))
+    assert np.allclose(rotations @ rotations.transpose(0, 2, 1), np.eye(3))
@@ -0,0 +1,165 @@
+import hashlib
+import time
+from collections import OrderedDict
+import bpy
+import bpy.utils.previews
+import numpy as np
+from bpy.app.handlers import persistent
+from . import profiling
+from .rendering import OffscreenCapture, render_size
+
+# Small previews of every Cito camera's view for the camera list. Each thumbnail is a preview icon
+# keyed by a hash of the camera's transform and lens, so moving a camera (or changing its lens)
+# makes it render again while unchanged cameras stay cached. Rendering happens in a timer, a few
+# cameras per tick, and the cache evicts the least recently shown thumbnails once it is over budget.
+
+THUMBNAIL_SIZE = 128      # longest side in pixels
+TICK_BUDGET = 0.03        # seconds of drawing per timer tick
+TICK_INTERVAL = 0.05
+
+def camera_view_key(camera, scene):
+    # Everything that changes what the camera sees, except the scene contents
+    cam = camera.data
+    digest = hashlib.sha1(np.array(camera.matrix_world, dtype=np.float32).tobytes())
+    digest.update(repr((cam.type, cam.lens, cam.ortho_scale, cam.shift_x, cam.shift_y, cam.clip_start, cam.clip_end,
+                        cam.sensor_width, cam.sensor_fit, render_size(scene))).encode())
+    return digest.hexdigest()
+
+def thumbnail_size(scene):
+    width, height = render_size(scene)
+    scale = THUMBNAIL_SIZE / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+class ThumbnailCache:
+    # Preview icons by view key, least recently shown first. pending holds the names of the cameras
+    # waiting for the render timer, once each however often the panel redraws while one moves.
+
+    def __init__(self):
+        self.previews = None
+        self.entries = OrderedDict()   # key -> bytes held
+        self.by_camera = {}            # camera name -> key of its latest thumbnail
+        self.pending = OrderedDict()   # camera name -> None, oldest first
+        self.bytes = 0
+
+    def open(self):
+        if self.previews is None:
+            self.previews = bpy.utils.previews.new()
+
+    def close(self):
+        self.clear()
+        if self.previews is not None:
+            bpy.utils.previews.remove(self.previews)
+            self.previews = None
+
+    def clear(self):
+        if self.previews is not None:
+            self.previews.clear()
+        self.entries.clear()
+        self.by_camera.clear()
+        self.pending.clear()
+        self.bytes = 0
+
+    def icon(self, camera, scene):
+        # icon_id of the camera's current thumbnail, or 0 after queueing it for rendering
+        if self.previews is None:
+            return 0
+        key = camera_view_key(camera, scene)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.previews[key].icon_id
+        self.pending[camera.name] = None
+        if not bpy.app.timers.is_registered(_render_pending):
+            bpy.app.timers.register(_render_pending, first_interval=TICK_INTERVAL)
+        return 0
+
+    def store(self, key, camera_name, pixels, max_bytes):
+        height, width = pixels.shape[:2]
+        preview = self.previews.new(key) if key not in self.previews else self.previews[key]
+        preview.image_size = (width, height)
+        # Same bottom-row-first layout as the offscreen read-back
+        preview.image_pixels_float.foreach_set(pixels.ravel().astype(np.float32) / 255.0)
+        if key not in self.entries:
+            self.bytes += width * height * 4
+        self.entries[key] = width * height * 4
+        self.entries.move_to_end(key)
+
+        # The camera moved away from its previous view; nothing will show that thumbnail again
+        previous = self.by_camera.get(camera_name)
+        self.by_camera[camera_name] = key
+        if previous is not None and previous != key and previous not in self.by_camera.values():
+            self.evict(previous)
+        while self.bytes > max_bytes and len(self.entries) > 1:
+            self.evict(next(iter(self.entries)))
+
+    def evict(self, key):
+        size = self.entries.pop(key, None)
+        if size is None:
+            return
+        self.bytes -= size
+        del self.previews[key]
+
+thumbnail_cache = ThumbnailCache()
+
+def _view3d_window():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                return window, area
+    return None, None
+
+def _redraw_sidebars():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+@profiling.traced("timer")
+def _render_pending():
+    cache = thumbnail_cache
+    if not cache.pending or cache.previews is None:
+        return None
+    window, area = _view3d_window()
+    if window is None:
+        # Nothing to draw with until a 3D Viewport is open again
+        cache.pending.clear()
+        return None
+
+    scene = window.scene
+    max_bytes = scene.camera_thumbnail_cache_mb * 1024 * 1024
+    width, height = thumbnail_size(scene)
+    started = time.perf_counter()
+    with bpy.context.temp_override(window=window, area=area):
+        capture = OffscreenCapture(bpy.context, width, height)
+        try:
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            while cache.pending and time.perf_counter() - started < TICK_BUDGET:
+                camera_name, _ = cache.pending.popitem(last=False)
+                camera = scene.objects.get(camera_name)
+                if camera is None or camera.type != 'CAMERA':
+                    continue
+                # The key of what the camera sees now, not when it was queued
+                key = camera_view_key(camera, scene)
+                with profiling.span("thumbnail", "render", camera=camera_name):
+                    pixels = capture.draw(scene, window.view_layer, camera, depsgraph)
+                cache.store(key, camera_name, pixels, max_bytes)
+        finally:
+            capture.free()
+    _redraw_sidebars()
+    return TICK_INTERVAL if cache.pending else None
+
+@persistent
+def _on_load_post(*args):
+    # Keys only cover the camera view, so thumbnails of another file must not be reused
+    thumbnail_cache.clear()
+
+def register():
+    thumbnail_cache.open()
+    if _on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_on_load_post)
+
+def unregister():
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    if bpy.app.timers.is_registered(_render_pending):
+        bpy.app.timers.unregister(_render_pending)
+    thumbnail_cache.close()
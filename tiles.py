@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import bpy
+import numpy as np
+from mathutils import Vector
+from . import rendering, workers
+
+# Tiled rendering of orthographic cameras, for plan maps larger than one render can hold. The frame
+# is split into a columns x rows grid; each tile is the same camera with a smaller ortho scale and a
+# shift onto its part of the frame, rendered by background workers. Tile keys include the render
+# engine settings and materials (see rendering.compute_frame_keys). Tiles are recorded in a frame
+# manifest (the tile index as frame number) with a key of the scene state and tile settings, so a
+# re-run only renders tiles that are missing or changed. The stitcher copies one tile at a time into
+# a memory-mapped image and streams that out as PNG, so peak RAM is about one tile.
+
+LAYOUT_NAME = "cito_tiles.json"
+MAX_SHIFT = 10.0
+
+def tile_filename(row, column):
+    return f"tile_r{row:03d}_c{column:03d}.png"
+
+def tile_layout(camera, width, height, columns, rows):
+    # Tiles of the width x height frame, top-left first. All tiles share one pixel size; the last
+    # column/row is cropped where the grid overhangs the frame.
+    cam = camera.data
+    fit_pixels = {'HORIZONTAL': width, 'VERTICAL': height}.get(cam.sensor_fit, max(width, height))
+    pixel_size = cam.ortho_scale / fit_pixels
+    tile_width = math.ceil(width / columns)
+    tile_height = math.ceil(height / rows)
+    tile_scale = pixel_size * tile_width
+    # The camera's own shift moves the whole frame, in units of its ortho scale
+    center_x = cam.shift_x * cam.ortho_scale
+    center_y = cam.shift_y * cam.ortho_scale
+
+    tiles = []
+    for row in range(rows):
+        for column in range(columns):
+            x0, y0 = column * tile_width, row * tile_height
+            if x0 >= width or y0 >= height:
+                continue
+            offset_x = center_x + ((x0 + tile_width / 2) - width / 2) * pixel_size
+            offset_y = center_y + (height / 2 - (y0 + tile_height / 2)) * pixel_size
+            tiles.append({
+                "index": len(tiles), "row": row, "column": column, "file": tile_filename(row, column),
+                "x": x0, "y": y0, "crop_width": min(tile_width, width - x0), "crop_height": min(tile_height, height - y0),
+                # Horizontal sensor fit, so ortho scale and shift are both in tile widths
+                "ortho_scale": tile_scale, "shift_x": offset_x / tile_scale, "shift_y": offset_y / tile_scale,
+            })
+    return {"camera": camera.name, "width": width, "height": height, "columns": columns, "rows": rows,
+            "tile_width": tile_width, "tile_height": tile_height, "tiles": tiles}
+
+def tile_keys(scene, camera, layout, view_layer=None):
+    # Scene state at the current frame, plus what makes each tile differ
+    scene_key = rendering.compute_frame_keys(scene, camera, [scene.frame_current], view_layer)[scene.frame_current]
+    for tile in layout["tiles"]:
+        spec = (scene_key, layout["tile_width"], layout["tile_height"], tile["ortho_scale"], tile["shift_x"], tile["shift_y"])
+        tile["key"] = hashlib.blake2b(repr(spec).encode(), digest_size=16).hexdigest()
+
+def pending_tiles(directory, layout):
+    manifest = rendering.FrameManifest(directory)
+    return [tile for tile in layout["tiles"]
+            if manifest.frames.get(tile["index"], {}).get("key") != tile["key"] or not manifest.verify(tile["index"], checksum=False)]
+
+def tile_camera(scene, camera):
+    # A free-standing copy of the camera where it is now: no parent, constraints or animation that
+    # would override the sideways slide of render_tile() during evaluation
+    matrix = camera.evaluated_get(bpy.context.evaluated_depsgraph_get()).matrix_world.copy()
+    copy = camera.copy()
+    copy.data = camera.data.copy()
+    copy.animation_data_clear()
+    copy.data.animation_data_clear()
+    copy.constraints.clear()
+    copy.parent = None
+    scene.collection.objects.link(copy)
+    copy.matrix_world = matrix
+    return copy
+
+def render_tile(scene, camera, base_location, layout, tile, filepath):
+    # Background workers have no viewport; tiles render with the file's render engine. camera is
+    # a tile_camera(), so its location is its world position.
+    cam = camera.data
+    scene.render.resolution_x = layout["tile_width"]
+    scene.render.resolution_y = layout["tile_height"]
+    scene.render.resolution_percentage = 100
+    cam.sensor_fit = 'HORIZONTAL'
+    cam.ortho_scale = tile["ortho_scale"]
+    # Blender caps the shift at 10 frame widths; large grids slide the camera sideways for the rest,
+    # which is the same picture for an orthographic view
+    cam.shift_x = max(-MAX_SHIFT, min(MAX_SHIFT, tile["shift_x"]))
+    cam.shift_y = max(-MAX_SHIFT, min(MAX_SHIFT, tile["shift_y"]))
+    excess = Vector(((tile["shift_x"] - cam.shift_x) * cam.ortho_scale, (tile["shift_y"] - cam.shift_y) * cam.ortho_scale, 0.0))
+    camera.location = base_location + camera.matrix_world.to_3x3().normalized() @ excess
+    scene.render.filepath = filepath
+    bpy.ops.render.render(write_still=True)
+
+def stitch_tiles(directory, layout, filepath, png_level=6):
+    # One tile in memory at a time; the full image only ever exists as a memory map on disk
+    width, height = layout["width"], layout["height"]
+    tile_width, tile_height = layout["tile_width"], layout["tile_height"]
+    buffer_path = os.path.join(directory, "cito_stitch.npy")
+    image = np.lib.format.open_memmap(buffer_path, mode="w+", dtype=np.uint8, shape=(height, width, 4))
+    pixels = np.empty(tile_width * tile_height * 4, dtype=np.float32)
+    try:
+        for tile in layout["tiles"]:
+            tile_image = bpy.data.images.load(os.path.join(directory, tile["file"]), check_existing=False)
+            try:
+                tile_image.pixels.foreach_get(pixels)
+            finally:
+                bpy.data.images.remove(tile_image)
+            # Blender images are stored bottom row first
+            block = pixels.reshape(tile_height, tile_width, 4)[::-1]
+            crop_height, crop_width = tile["crop_height"], tile["crop_width"]
+            image[tile["y"]:tile["y"] + crop_height, tile["x"]:tile["x"] + crop_width] = \
+                np.rint(block[:crop_height, :crop_width] * 255.0).astype(np.uint8)
+        image.flush()
+        rendering.write_png(filepath, image, png_level)
+    finally:
+        del image
+        os.remove(buffer_path)
+    return filepath
+
+def render_tiled(context, camera, scale, columns, rows, directory, filepath, worker_count=None, restart=False):
+    # Renders the tiles that are missing or out of date, then stitches all of them into filepath
+    scene = context.scene
+    width, height = rendering.render_size(scene)
+    layout = tile_layout(camera, width * scale, height * scale, columns, rows)
+    tile_keys(scene, camera, layout, context.view_layer)
+    os.makedirs(directory, exist_ok=True)
+    layout_path = os.path.join(directory, LAYOUT_NAME)
+    with open(layout_path, "w", encoding="utf-8") as stream:
+        json.dump(layout, stream, indent=2)
+
+    # Workers append new manifest records, which replace the old ones on load
+    pending = list(layout["tiles"]) if restart else pending_tiles(directory, layout)
+    if pending:
+        chunks = [chunk for chunk in np.array_split(np.array([tile["index"] for tile in pending]), worker_count or workers.default_worker_count()) if len(chunk)]
+        with workers.blend_copy("cito_tiles_") as blendfile:
+            jobs = [(workers.blender_command("tiles", ["--camera", camera.name, "--layout", layout_path, "--tiles", *chunk.tolist()], blendfile),
+                     {"tiles": chunk.tolist()}) for chunk in chunks]
+            results = workers.run_workers(jobs, len(jobs))
+        failed = [index for result in results if result["returncode"] != 0 for index in result["job"]["tiles"]]
+        if failed:
+            raise RuntimeError(f"{len(failed)} tile(s) failed to render, first: {failed[0]}")
+
+    missing = pending_tiles(directory, layout)
+    if missing:
+        raise RuntimeError(f"{len(missing)} tile(s) missing after rendering, first: {missing[0]['file']}")
+    stitch_tiles(directory, layout, filepath, scene.render_png_compression)
+    return filepath, len(pending), len(layout["tiles"])
+
+def parse_worker_args(argv=None):
+    parser = argparse.ArgumentParser(prog="tiles")
+    parser.add_argument("--camera", required=True)
+    parser.add_argument("--layout", required=True)
+    parser.add_argument("--tiles", type=int, nargs="+", required=True)
+    return parser.parse_args(workers.script_args(argv))
+
+def main(argv=None):
+    # Worker entry point for render_tiled(); not meant to be run by hand
+    args = parse_worker_args(argv)
+    with open(args.layout, encoding="utf-8") as stream:
+        layout = json.load(stream)
+    directory = os.path.dirname(args.layout)
+    scene = bpy.context.scene
+    camera = bpy.data.objects.get(args.camera)
+    if camera is None:
+        workers.emit("error", message=f"Camera {args.camera} not found")
+        sys.exit(1)
+    camera = tile_camera(scene, camera)
+    scene.camera = camera
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.image_settings.color_mode = 'RGBA'
+    manifest = rendering.FrameManifest(directory)
+    base_location = camera.location.copy()
+    for index in args.tiles:
+        tile = layout["tiles"][index]
+        filepath = os.path.join(directory, tile["file"])
+        render_tile(scene, camera, base_location, layout, tile, filepath)
+        manifest.record(index, filepath, key=tile["key"])
+        workers.emit("tile", index=index)
+    workers.emit("done", tiles=len(args.tiles))
+    sys.exit(0)
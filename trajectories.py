@@ -0,0 +1,360 @@
+import csv
+import json
+import math
+import os
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+import bpy
+import numpy as np
+from . import curves
+from .utilities import cito_unique_name, create_curve_rig, name_registry, tag_cito
+
+# GPS tracks (GPX, CSV, GeoJSON) become Cito path curves. Files are streamed into flat arrays,
+# projected onto a local plane around a geographic origin stored on the scene (so later imports line
+# up with earlier ones), simplified with Douglas-Peucker and written into POLY splines with one
+# foreach_set call per track.
+
+EARTH_RADIUS = 6378137.0
+TRACK_EXTENSIONS = (".gpx", ".csv", ".txt", ".geojson", ".json")
+
+class Track:
+    #   lat, lon: (n,) degrees
+    #   ele:      (n,) metres
+    #   times:    (n,) seconds since the epoch (NaN where a point has none), or None without timestamps
+    def __init__(self, name, lat, lon, ele=None, times=None):
+        self.name = name
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.ele = np.zeros(len(self.lat)) if ele is None else np.asarray(ele, dtype=np.float64)
+        self.times = None if times is None or np.isnan(times).all() else np.asarray(times, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.lat)
+
+class _TrackBuffer:
+    # Preallocated (capacity, 4) block of lat, lon, ele, seconds rows, doubled when full, so a track of
+    # hundreds of thousands of points never becomes Python objects
+
+    def __init__(self, name, capacity=4096):
+        self.name = name
+        self.rows = np.empty((capacity, 4), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, lat, lon, ele, seconds):
+        if self.count == len(self.rows):
+            self.rows = np.concatenate((self.rows, np.empty_like(self.rows)))
+        self.rows[self.count] = (lat, lon, ele, seconds)
+        self.count += 1
+
+    def track(self):
+        lat, lon, ele, times = self.rows[:self.count].T.copy()
+        return Track(self.name, lat, lon, ele, times)
+
+def parse_time(value):
+    # Seconds since the epoch from ISO 8601 text or a plain number; NaN when missing or unreadable
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        stamp = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return math.nan
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+def _file_name(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def read_gpx(filepath, stop=None):
+    # Every <trkseg> and <rte> is one track. iterparse plus clear() keeps memory flat: points are
+    # dropped from the tree as soon as they are read. Reading ends early once stop (an Event) is set.
+    track_name = _file_name(filepath)
+    buffer = None
+    stack = []
+    for event, element in ElementTree.iterparse(filepath, events=("start", "end")):
+        if stop is not None and stop.is_set():
+            return
+        tag = _local_name(element.tag)
+        if event == "start":
+            stack.append(tag)
+            if tag in ("trkseg", "rte"):
+                buffer = _TrackBuffer(track_name)
+            continue
+
+        stack.pop()
+        if tag in ("trkpt", "rtept"):
+            if buffer is not None:
+                ele = seconds = None
+                for child in element:
+                    child_tag = _local_name(child.tag)
+                    if child_tag == "ele":
+                        ele = child.text
+                    elif child_tag == "time":
+                        seconds = child.text
+                buffer.append(float(element.get("lat")), float(element.get("lon")), float(ele) if ele else 0.0, parse_time(seconds))
+            element.clear()
+        elif tag == "name" and stack and stack[-1] in ("trk", "rte"):
+            track_name = (element.text or "").strip() or track_name
+        elif tag in ("trkseg", "rte"):
+            if buffer is not None and len(buffer) >= 2:
+                buffer.name = track_name
+                yield buffer.track()
+            buffer = None
+            element.clear()
+        elif tag == "trk":
+            track_name = _file_name(filepath)
+            element.clear()
+
+_CSV_COLUMNS = {
+    "lat": ("lat", "latitude"),
+    "lon": ("lon", "lng", "long", "longitude"),
+    "ele": ("ele", "elevation", "alt", "altitude"),
+    "time": ("time", "timestamp", "datetime", "date_time"),
+    "track": ("track", "track_id", "trip", "trip_id", "segment"),
+}
+
+def read_csv(filepath, stop=None):
+    # One row per point; a track/trip column splits the file into tracks wherever its value changes
+    with open(filepath, newline="", encoding="utf-8-sig") as stream:
+        reader = csv.reader(stream)
+        header = [column.strip().lower() for column in next(reader, [])]
+        columns = {key: next((index for index, column in enumerate(header) if column in names), None)
+                   for key, names in _CSV_COLUMNS.items()}
+        if columns["lat"] is None or columns["lon"] is None:
+            raise ValueError("the CSV needs latitude and longitude columns")
+
+        lat, lon, ele, seconds, track = (columns[key] for key in ("lat", "lon", "ele", "time", "track"))
+        buffer = None
+        current = None
+        for row in reader:
+            if stop is not None and stop.is_set():
+                return
+            if not row:
+                continue
+            key = row[track] if track is not None and track < len(row) else None
+            if buffer is None or key != current:
+                if buffer is not None and len(buffer) >= 2:
+                    yield buffer.track()
+                buffer = _TrackBuffer(key or _file_name(filepath))
+                current = key
+            try:
+                buffer.append(float(row[lat]), float(row[lon]),
+                              float(row[ele]) if ele is not None and row[ele] else 0.0,
+                              parse_time(row[seconds]) if seconds is not None else math.nan)
+            except (ValueError, IndexError):
+                # Header repeats, empty fixes and other malformed rows
+                continue
+        if buffer is not None and len(buffer) >= 2:
+            yield buffer.track()
+
+def _geojson_features(data):
+    if data.get("type") == "FeatureCollection":
+        return data.get("features", [])
+    if data.get("type") == "Feature":
+        return [data]
+    return [{"geometry": data, "properties": {}}]
+
+def read_geojson(filepath):
+    # A GeoJSON file is one JSON document, so it is loaded whole; each LineString (and each part of a
+    # MultiLineString) is one track. Timestamps are read from the common "coordTimes"/"times" property.
+    with open(filepath, encoding="utf-8") as stream:
+        data = json.load(stream)
+    for index, feature in enumerate(_geojson_features(data)):
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        if geometry.get("type") == "LineString":
+            lines, times = [geometry["coordinates"]], [properties.get("coordTimes") or properties.get("times")]
+        elif geometry.get("type") == "MultiLineString":
+            lines = geometry["coordinates"]
+            times = properties.get("coordTimes") or properties.get("times") or [None] * len(lines)
+        else:
+            continue
+        name = str(properties.get("name") or f"{_file_name(filepath)}_{index + 1}")
+        for line, line_times in zip(lines, times):
+            if len(line) < 2:
+                continue
+            coordinates = np.array([point[:3] + [0.0] * (3 - len(point[:3])) for point in line], dtype=np.float64)
+            seconds = np.array([parse_time(value) for value in line_times], dtype=np.float64) if line_times else None
+            yield Track(name, coordinates[:, 1], coordinates[:, 0], coordinates[:, 2], seconds)
+
+def read_tracks(filepath, stop=None):
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == ".gpx":
+        return read_gpx(filepath, stop)
+    if extension in (".csv", ".txt"):
+        return read_csv(filepath, stop)
+    if extension in (".geojson", ".json"):
+        return read_geojson(filepath)
+    raise ValueError(f"unsupported track file '{os.path.basename(filepath)}'")
+
+def project(track, origin, scale=1.0, use_elevation=True):
+    # Equirectangular projection around origin (lat, lon, ele) into scene units: metres * scale,
+    # X east, Y north. Accurate to well under a metre over the extent of a city.
+    lat0, lon0, ele0 = origin
+    lon = (track.lon - lon0 + 180.0) % 360.0 - 180.0
+    points = np.empty((len(track), 3), dtype=np.float64)
+    points[:, 0] = np.radians(lon) * EARTH_RADIUS * math.cos(math.radians(lat0))
+    points[:, 1] = np.radians(track.lat - lat0) * EARTH_RADIUS
+    points[:, 2] = track.ele - ele0 if use_elevation else 0.0
+    return points * scale
+
+def douglas_peucker(points, tolerance):
+    # Indices of the points kept by Douglas-Peucker simplification. Instead of recursing segment by
+    # segment, every open segment of one refinement level is processed in a single vectorized pass.
+    count = len(points)
+    if count < 3 or tolerance <= 0.0:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    starts = np.array([0])
+    ends = np.array([count - 1])
+    while len(starts):
+        interior = ends - starts - 1
+        open_segments = interior > 0
+        starts, ends, interior = starts[open_segments], ends[open_segments], interior[open_segments]
+        if not len(starts):
+            break
+
+        # Flat index of every interior point, and the segment it belongs to
+        segment = np.repeat(np.arange(len(starts)), interior)
+        first = np.cumsum(interior) - interior
+        index = np.repeat(starts + 1, interior) + np.arange(interior.sum()) - np.repeat(first, interior)
+
+        a = points[starts][segment]
+        ab = points[ends][segment] - a
+        ap = points[index] - a
+        length_squared = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", ap, ab) / np.where(length_squared > 0, length_squared, 1.0), 0.0, 1.0)
+        distance = np.linalg.norm(ap - t[:, None] * ab, axis=1)
+
+        # Farthest point of each segment: sort by (segment, -distance) and take each group's head
+        farthest = np.lexsort((-distance, segment))[first]
+        split = distance[farthest] > tolerance
+        pivots = index[farthest][split]
+        keep[pivots] = True
+        starts, ends = np.concatenate((starts[split], pivots)), np.concatenate((pivots, ends[split]))
+    return np.flatnonzero(keep)
+
+def geo_origin(scene):
+    origin = scene.get("cito_geo_origin")
+    return tuple(origin) if origin is not None else None
+
+def track_curve_name(track_name):
+    return cito_unique_name(f"Cito_Track_{bpy.path.clean_name(track_name)}")
+
+def create_track_curve(name, points, times=None, collection=None):
+    # POLY curve through points (scene space) in one foreach_set call. Timestamps, relative to the
+    # first point, are stored per spline point in curve["cito_timestamps"].
+    collection = collection or bpy.context.scene.collection
+    curve = bpy.data.curves.new(name, 'CURVE')
+    curve.dimensions = '3D'
+    spline = curve.splines.new('POLY')
+    spline.points.add(len(points) - 1)
+    co = np.ones((len(points), 4), dtype=np.float32)
+    co[:, :3] = points
+    spline.points.foreach_set("co", co.ravel())
+    if times is not None and np.isfinite(times).all():
+        curve["cito_timestamps"] = (times - times[0]).tolist()
+        curve["cito_track_start"] = float(times[0])
+
+    obj = bpy.data.objects.new(name, curve)
+    tag_cito(obj, 'PATH')
+    collection.objects.link(obj)
+    name_registry.note(obj.name)
+    return obj
+
+def track_duration(curve_obj):
+    timestamps = curve_obj.data.get("cito_timestamps")
+    return float(timestamps[-1]) if timestamps else 0.0
+
+def rig_track(curve_obj, scene):
+    # Camera rig along an imported track, at constant true speed over the recorded travel time
+    # (or over the scene frame range when the track has no timestamps)
+    fps = scene.render.fps / scene.render.fps_base
+    duration = track_duration(curve_obj)
+    frame_start = scene.frame_start
+    frame_end = frame_start + max(1, round(duration * fps)) if duration > 0 else scene.frame_end
+    collection, camera, target, follow_path = create_curve_rig(curve_obj, scene, frame_start, frame_end)
+
+    table = curves.arc_length_table(curve_obj)
+    frames = np.arange(frame_start, frame_end + 1)
+    length = table.total_length * curves.world_length_scale(curve_obj)
+    curves.drive_at_distances(camera, follow_path, frames, np.linspace(0.0, length, len(frames)))
+    return collection, frame_end
+
+class TrackImport:
+    # Reads, projects and simplifies tracks on a worker thread. The main thread only turns finished
+    # tracks into curves (bpy data must not be touched from other threads), a time budget per tick.
+
+    def __init__(self, filepaths, origin=None, tolerance=1.0, scale=1.0, use_elevation=True):
+        self.origin = origin
+        self.done = False
+        self.stats = {"files": 0, "tracks": 0, "points": 0, "kept": 0, "errors": []}
+        self._queue = queue.Queue(maxsize=32)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(list(filepaths), tolerance, scale, use_elevation), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Blocks while the main thread is behind, but never past a cancel
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, filepaths, tolerance, scale, use_elevation):
+        try:
+            for filepath in filepaths:
+                if self._stop.is_set():
+                    return
+                try:
+                    for track in read_tracks(filepath, self._stop):
+                        if self.origin is None:
+                            self.origin = (float(track.lat[0]), float(track.lon[0]), float(track.ele[0]))
+                        points = project(track, self.origin, scale, use_elevation)
+                        # The tolerance is in metres, the points in scene units
+                        keep = douglas_peucker(points, tolerance * scale)
+                        times = track.times[keep] if track.times is not None else None
+                        self.stats["points"] += len(track)
+                        self.stats["kept"] += len(keep)
+                        if not self._put((track.name, points[keep], times)):
+                            return
+                except (OSError, ValueError, ElementTree.ParseError) as error:
+                    self.stats["errors"].append(f"{os.path.basename(filepath)}: {error}")
+                self.stats["files"] += 1
+        finally:
+            self._put(None)
+
+    def finished_tracks(self, budget):
+        # (name, points, times) of tracks ready to be built, until budget seconds are used up
+        started = time.perf_counter()
+        while not self.done and time.perf_counter() - started < budget:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                self.done = True
+                return
+            self.stats["tracks"] += 1
+            yield item
+
+    def cancel(self):
+        self._stop.set()
+        self._thread.join()
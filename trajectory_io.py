@@ -0,0 +1,191 @@
+import json
+import os
+import struct
+import bpy
+import numpy as np
+from .analysis import track_target
+from .utilities import cito_unique_name, ensure_action, matrices_to_loc_euler, tag_cito, write_fcurve_samples
+
+# Baked camera trajectories in one binary, columnar file, for other tools and for moving rigs
+# between scenes:
+#
+#   b"CITOTRJ1"  uint32 header length  JSON header (space padded)  float32 columns
+#
+# The header lists the rigs (camera settings that do not change per frame) and the columns with
+# their byte offsets; every column holds all frames of one value (frame, or a rig's location,
+# rotation, lens, ortho_scale, target), so a tool can read one column without touching the rest.
+# Columns start on 64-byte boundaries. Rotations are world-space quaternions (w, x, y, z), kept
+# sign-continuous so they interpolate without flips.
+
+MAGIC = b"CITOTRJ1"
+EXTENSION = ".citotraj"
+ALIGNMENT = 64
+
+RIG_COLUMNS = (("location", 3), ("rotation", 4), ("lens", 1), ("ortho_scale", 1))
+TARGET_COLUMN = ("target", 3)
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _layout(rigs, frame_count):
+    # Columns with byte offsets relative to the start of the data block
+    columns = [{"rig": None, "name": "frame", "width": 1}]
+    for rig in rigs:
+        names = RIG_COLUMNS + ((TARGET_COLUMN,) if rig["target"] else ())
+        columns += [{"rig": rig["name"], "name": name, "width": width} for name, width in names]
+    offset = 0
+    for column in columns:
+        column["offset"] = offset
+        offset = _align(offset + frame_count * column["width"] * 4)
+    return columns, offset
+
+def _rig_header(camera):
+    cam = camera.data
+    target = track_target(camera)
+    return {
+        "name": camera.name,
+        "type": cam.type,
+        "sensor_width": cam.sensor_width,
+        "sensor_fit": cam.sensor_fit,
+        "clip_start": cam.clip_start,
+        "clip_end": cam.clip_end,
+        "scale": list(camera.matrix_world.to_scale()),
+        "target": target.name if target is not None else None,
+    }
+
+class TrajectoryFile:
+    # Memory-mapped view of a trajectory file; column() returns (frames, width) float32 arrays
+
+    def __init__(self, filepath, mode="r"):
+        with open(filepath, "rb") as stream:
+            if stream.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{os.path.basename(filepath)} is not a Cito trajectory file")
+            header_length = struct.unpack("<I", stream.read(4))[0]
+            self.header = json.loads(stream.read(header_length).decode("utf-8"))
+        self.data_offset = _align(len(MAGIC) + 4 + header_length)
+        self.frame_count = self.header["frame_count"]
+        self.data = np.memmap(filepath, dtype=np.float32, mode=mode, offset=self.data_offset,
+                              shape=(self.header["data_bytes"] // 4,))
+        self._columns = {(column["rig"], column["name"]): column for column in self.header["columns"]}
+
+    @property
+    def rigs(self):
+        return self.header["rigs"]
+
+    def frames(self):
+        return self.column(None, "frame")[:, 0]
+
+    def has_column(self, rig, name):
+        return (rig, name) in self._columns
+
+    def column(self, rig, name):
+        column = self._columns[(rig, name)]
+        start = column["offset"] // 4
+        return self.data[start:start + self.frame_count * column["width"]].reshape(self.frame_count, column["width"])
+
+def create_trajectory_file(filepath, rigs, frame_start, frame_count, fps):
+    columns, data_bytes = _layout(rigs, frame_count)
+    header = {"version": 1, "frame_start": frame_start, "frame_count": frame_count, "fps": fps,
+              "rigs": rigs, "columns": columns, "data_bytes": data_bytes}
+    encoded = json.dumps(header).encode("utf-8")
+    # Pad the header so the data block starts aligned
+    encoded += b" " * (_align(len(MAGIC) + 4 + len(encoded)) - (len(MAGIC) + 4 + len(encoded)))
+    with open(filepath, "wb") as stream:
+        stream.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        stream.truncate(len(MAGIC) + 4 + len(encoded) + data_bytes)
+    return TrajectoryFile(filepath, mode="r+")
+
+def export_trajectories(scene, cameras, filepath, frame_start, frame_end):
+    # Evaluates the scene once per frame and writes that frame's row of every column straight into
+    # the memory-mapped file, so memory use does not grow with the frame range
+    frame_count = frame_end - frame_start + 1
+    rigs = [_rig_header(camera) for camera in cameras]
+    trajectory = create_trajectory_file(filepath, rigs, frame_start, frame_count, scene.render.fps / scene.render.fps_base)
+    columns = [{name: trajectory.column(rig["name"], name) for name, width in RIG_COLUMNS} for rig in rigs]
+    targets = [track_target(camera) for camera in cameras]
+    for rig_columns, rig, target in zip(columns, rigs, targets):
+        if target is not None:
+            rig_columns["target"] = trajectory.column(rig["name"], "target")
+    frames = trajectory.frames()
+    previous = [None] * len(cameras)
+
+    frame_current = scene.frame_current
+    try:
+        for row, frame in enumerate(range(frame_start, frame_end + 1)):
+            scene.frame_set(frame)
+            frames[row] = frame
+            for i, (camera, target, rig_columns) in enumerate(zip(cameras, targets, columns)):
+                matrix = camera.matrix_world
+                rotation = matrix.to_quaternion()
+                if previous[i] is not None and previous[i].dot(rotation) < 0.0:
+                    rotation.negate()
+                previous[i] = rotation
+                rig_columns["location"][row] = matrix.translation
+                rig_columns["rotation"][row] = rotation
+                rig_columns["lens"][row] = camera.data.lens
+                rig_columns["ortho_scale"][row] = camera.data.ortho_scale
+                if target is not None:
+                    rig_columns["target"][row] = target.matrix_world.translation
+    finally:
+        scene.frame_set(frame_current)
+    trajectory.data.flush()
+    return frame_count
+
+def quaternion_matrices(quaternions):
+    # (n, 4) unit quaternions (w, x, y, z) -> (n, 3, 3) rotation matrices
+    q = quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+def _write_keys(id_data, data_path, frames, values, group):
+    action = ensure_action(id_data)
+    for index in range(values.shape[1]):
+        write_fcurve_samples(action, data_path, index if values.shape[1] > 1 else 0, frames, values[:, index], group=group)
+
+def import_trajectories(filepath, scene, collection=None):
+    # One camera (and target empty) per rig in the file, keyed at every frame through foreach_set.
+    # Returns the new cameras and the file's frame range.
+    trajectory = TrajectoryFile(filepath)
+    frames = np.asarray(trajectory.frames(), dtype=np.float64)
+    if collection is None:
+        collection = bpy.data.collections.new(cito_unique_name("Cito_Trajectories", kind="collections"))
+        scene.collection.children.link(collection)
+
+    cameras = []
+    for rig in trajectory.rigs:
+        name = cito_unique_name(rig["name"], bare_first=True)
+        cam = bpy.data.cameras.new(name)
+        cam.type = rig["type"]
+        cam.sensor_width = rig["sensor_width"]
+        cam.sensor_fit = rig["sensor_fit"]
+        cam.clip_start = rig["clip_start"]
+        cam.clip_end = rig["clip_end"]
+        camera = bpy.data.objects.new(name, cam)
+        camera.scale = rig["scale"]
+        collection.objects.link(camera)
+        tag_cito(camera, 'CAMERA', 'ANIMATED')
+
+        # Baked like Bake Navigation does it: location and XYZ euler keys on the object
+        matrices = np.zeros((trajectory.frame_count, 4, 4))
+        matrices[:, :3, :3] = quaternion_matrices(np.asarray(trajectory.column(rig["name"], "rotation"), dtype=np.float64))
+        matrices[:, :3, 3] = trajectory.column(rig["name"], "location")
+        matrices[:, 3, 3] = 1.0
+        location, euler = matrices_to_loc_euler(matrices)
+        camera.rotation_mode = 'XYZ'
+        _write_keys(camera, "location", frames, location, "Cito Trajectory")
+        _write_keys(camera, "rotation_euler", frames, euler, "Cito Trajectory")
+        lens_path = "ortho_scale" if cam.type == 'ORTHO' else "lens"
+        _write_keys(cam, lens_path, frames, trajectory.column(rig["name"], lens_path), "Cito Trajectory")
+
+        if trajectory.has_column(rig["name"], "target"):
+            target = bpy.data.objects.new(cito_unique_name(rig["target"] or "Cito_Target", bare_first=True), None)
+            target.empty_display_type = 'PLAIN_AXES'
+            collection.objects.link(target)
+            tag_cito(target, 'TARGET')
+            _write_keys(target, "location", frames, trajectory.column(rig["name"], "target"), "Cito Trajectory")
+        cameras.append(camera)
+    return cameras, int(frames[0]), int(frames[-1])
@@ -1,6 +1,13 @@
 import addon_utils #to activate a check function
+import csv
+import json
+import math
 import os
+import re
 import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from . import profiling
 
 def enable_addon(addon_name):
     # check if the addon is enabled
@@ -10,28 +17,776 @@ def enable_addon(addon_name):
         addon_utils.enable(addon_name)
     return {'FINISHED'} 
 
+# Broadcast: slider changes can go to every selected or grouped Cito camera. Values are coalesced
+# during a drag and written in one batch once the slider has settled for BROADCAST_DELAY seconds,
+# so the depsgraph is rebuilt once per settled value rather than once per mouse move.
+BROADCAST_DELAY = 0.15
+_pending_camera_updates = {}
+
+def is_cito_camera(obj):
+    return obj is not None and obj.type == 'CAMERA' and cito_role(obj) == 'CAMERA'
+
+def is_iphone_camera(obj):
+    return is_cito_camera(obj) and cito_camera_kind(obj) == 'IPHONE'
+
+def broadcast_targets(context):
+    scene = context.scene
+    cam = scene.camera
+    mode = scene.camera_broadcast_mode
+    if mode == 'SELECTED':
+        cameras = [obj for obj in context.selected_objects if is_cito_camera(obj)]
+        return cameras or ([cam] if cam else [])
+    if mode == 'GROUP' and cam is not None:
+        # Every Cito camera sharing a collection with the active camera
+        cameras = {obj for collection in cam.users_collection if collection != scene.collection
+                   for obj in collection.all_objects if is_cito_camera(obj)}
+        return list(cameras | {cam})
+    return [cam] if cam else []
+
+def view_through_camera(context):
+    # Looks through the scene camera in the 3D view the operator was called from. Scripts and
+    # background runs have no 3D view, and the camera is still set as the scene camera.
+    # Not view3d.object_as_camera(): that one switches to the active object, whatever it is.
+    space = context.space_data
+    if context.area is None or context.area.type != 'VIEW_3D' or space is None:
+        return
+    if space.use_local_camera:
+        space.camera = context.scene.camera
+    space.region_3d.view_perspective = 'CAMERA'
+
+def iphone_lens(scene):
+    return {
+        'WIDE': scene.iphone_camera_wide_zoom,
+        'ULTRA_WIDE': scene.iphone_camera_ultra_wide_zoom,
+        'TELEPHOTO': scene.iphone_camera_telephoto_zoom,
+    }[scene.iphone_camera_zoom_mode]
+
+def _apply_camera_data(attribute, value, cameras):
+    # Direct writes on the targets' camera data, once per datablock; a foreach over bpy.data.cameras
+    # would read and write every camera of the file for a handful of targets
+    for data in {cam.data for cam in cameras}:
+        setattr(data, attribute, value)
+        data.update_tag()
+
+@profiling.traced("timer")
+def _apply_pending_camera_updates():
+    updates = dict(_pending_camera_updates)
+    _pending_camera_updates.clear()
+    for attribute, (value, names) in updates.items():
+        cameras = [obj for obj in map(bpy.data.objects.get, names) if obj is not None and obj.type == 'CAMERA']
+        if attribute == "ortho_scale":
+            _apply_camera_data("ortho_scale", value, [cam for cam in cameras if cam.data.type == 'ORTHO'])
+        elif attribute == "lens":
+            _apply_camera_data("lens", value, cameras)
+        else:
+            # Transforms too are direct writes on the targets only. They still land in the same single
+            # depsgraph update.
+            for cam in cameras:
+                if attribute == "location_z":
+                    cam.location.z = value
+                elif attribute == "rotation_z":
+                    cam.rotation_euler[2] = value
+    return None  # one-shot timer
+
+def _queue_camera_update(attribute, value, cameras):
+    _pending_camera_updates[attribute] = (value, [cam.name for cam in cameras])
+    # Restart the settle timer on every drag event
+    if bpy.app.timers.is_registered(_apply_pending_camera_updates):
+        bpy.app.timers.unregister(_apply_pending_camera_updates)
+    bpy.app.timers.register(_apply_pending_camera_updates, first_interval=BROADCAST_DELAY)
+
+@profiling.traced("update")
 def update_camera_ortho_scale(self, context):
-    cam = context.scene.camera
+    scene = context.scene
+    if scene.camera_broadcast_mode != 'ACTIVE':
+        _queue_camera_update("ortho_scale", scene.camera_ortho_scale, broadcast_targets(context))
+        return
+    cam = scene.camera
     if cam and cam.type == 'CAMERA' and cam.data.type == 'ORTHO':
-        cam.data.ortho_scale = context.scene.camera_ortho_scale
+        cam.data.ortho_scale = scene.camera_ortho_scale
 
+@profiling.traced("update")
 def update_camera_z_position(self, context):
-    cam = context.scene.camera
+    scene = context.scene
+    if scene.camera_broadcast_mode != 'ACTIVE':
+        _queue_camera_update("location_z", scene.camera_z_position, broadcast_targets(context))
+        return
+    cam = scene.camera
     if cam and cam.type == 'CAMERA':
-        cam.location.z = context.scene.camera_z_position
+        cam.location.z = scene.camera_z_position
 
+@profiling.traced("update")
 def update_camera_rotation(self, context):
-    cam = context.scene.camera
+    scene = context.scene
+    if scene.camera_broadcast_mode != 'ACTIVE':
+        _queue_camera_update("rotation_z", scene.camera_rotation, broadcast_targets(context))
+        return
+    cam = scene.camera
     if cam and cam.type == 'CAMERA':
-        cam.rotation_euler[2] = context.scene.camera_rotation  # Z-axis rotation
+        cam.rotation_euler[2] = scene.camera_rotation  # Z-axis rotation
         
+@profiling.traced("update")
 def zoom_update(self, context):
-    # Check if a camera named "Cito_iPhone_Camera" exists
-    cam = bpy.context.scene.camera
-    if cam and "Cito_iPhone_Camera" in cam.name:
-        if bpy.context.scene.iphone_camera_zoom_mode == 'WIDE':
-            cam.data.lens = bpy.context.scene.iphone_camera_wide_zoom
-        elif bpy.context.scene.iphone_camera_zoom_mode == 'ULTRA_WIDE':
-            cam.data.lens = bpy.context.scene.iphone_camera_ultra_wide_zoom
-        elif bpy.context.scene.iphone_camera_zoom_mode == 'TELEPHOTO':
-            cam.data.lens = bpy.context.scene.iphone_camera_telephoto_zoom
+    scene = context.scene
+    if scene.camera_broadcast_mode != 'ACTIVE':
+        _queue_camera_update("lens", iphone_lens(scene), [cam for cam in broadcast_targets(context) if is_iphone_camera(cam)])
+        return
+    # Only iPhone cameras follow the zoom settings
+    cam = scene.camera
+    if is_iphone_camera(cam):
+        cam.data.lens = iphone_lens(scene)
+
+# Matches names such as "Cito_Camera_Setup_012" -> ("Cito_Camera_Setup", "012")
+_NAME_INDEX_PATTERN = re.compile(r"^(.*)_(\d+)$")
+
+class CitoNameRegistry:
+    # Keeps a per-prefix high-water index for every datablock collection we name into
+    # (bpy.data.objects, bpy.data.collections, ...), so finding a free name is O(1)
+    # instead of probing "_000", "_001", ... on every creation.
+    #
+    # Each collection is scanned once, lazily (and again after a file load). After that the
+    # index only moves forward: names handed out here are recorded immediately, names taken
+    # behind our back (user renames, appends, other add-ons) are stepped over by the probe in
+    # next_index(), and deletions keep the high-water mark, so a deleted "Cito_Target_004" is
+    # never recycled under a stale reference. Nothing here depends on msgbus, which does not
+    # run in background (-b) sessions.
+
+    def __init__(self):
+        self._high_water = {}
+        self._scanned = set()
+
+    def reset(self, kind=None):
+        if kind is None:
+            self._high_water.clear()
+            self._scanned.clear()
+        else:
+            self._high_water = {key: value for key, value in self._high_water.items() if key[0] != kind}
+            self._scanned.discard(kind)
+
+    def _scan(self, kind):
+        for name in getattr(bpy.data, kind).keys():
+            self._record(kind, name)
+        self._scanned.add(kind)
+
+    def _record(self, kind, name):
+        match = _NAME_INDEX_PATTERN.match(name)
+        base, index = (match.group(1), int(match.group(2))) if match else (name, 0)
+        key = (kind, base)
+        if index > self._high_water.get(key, -1):
+            self._high_water[key] = index
+
+    def note(self, name, kind="objects"):
+        # Record a name that was created outside of next_name()
+        if kind in self._scanned:
+            self._record(kind, name)
+
+    def next_index(self, base, kind="objects", start=1):
+        if kind not in self._scanned:
+            self._scan(kind)
+        datablocks = getattr(bpy.data, kind)
+        index = max(self._high_water.get((kind, base), start - 1) + 1, start)
+        # Names created behind our back (appends, other add-ons) are caught here;
+        # the probe only runs past indices that are genuinely taken.
+        while datablocks.get(f"{base}_{index:03}") is not None:
+            index += 1
+        self._high_water[(kind, base)] = index
+        return index
+
+    def next_block(self, base, kind="objects", count=1, start=1):
+        # Reserve `count` consecutive indices with a single probe, for bulk creation
+        first = self.next_index(base, kind, start)
+        self._high_water[(kind, base)] = first + max(count, 1) - 1
+        return first
+
+    def next_name(self, base, kind="objects", start=1, bare_first=False):
+        # bare_first hands out the plain base name first ("Cito_camera"), then "_001", ...
+        if bare_first and getattr(bpy.data, kind).get(base) is None:
+            if kind not in self._scanned:
+                self._scan(kind)
+            if (kind, base) not in self._high_water:
+                self._high_water[(kind, base)] = 0
+                return base
+        return f"{base}_{self.next_index(base, kind, start):03}"
+
+name_registry = CitoNameRegistry()
+
+def cito_unique_name(base, kind="objects", start=1, bare_first=False):
+    return name_registry.next_name(base, kind, start, bare_first)
+
+def cito_unique_index(base, kind="objects", start=1):
+    return name_registry.next_index(base, kind, start)
+
+# Roles of Cito datablocks are stored as custom properties instead of being inferred from names:
+#   obj["cito_role"]        'CAMERA' | 'TARGET' | 'PATH' | 'OVERLAY'   (collections: 'SETUP')
+#   obj["cito_camera_kind"] 'SCALED' | 'SECTION_ORTHO' | 'TOP_ORTHO' | 'IPHONE' | 'ANIMATED'
+#   obj["cito_follow_path"] name of the rig's Follow Path constraint
+CITO_ROLES = ('CAMERA', 'TARGET', 'PATH', 'OVERLAY', 'SETUP')
+
+# Name prefixes of files made before roles were stored, checked longest first
+_LEGACY_ROLES = (
+    ("Cito_Animated_Curve_Camera", 'CAMERA', 'ANIMATED'),
+    ("Cito_Animated_Camera", 'CAMERA', 'ANIMATED'),
+    ("Cito_section_camera", 'CAMERA', 'SECTION_ORTHO'),
+    ("Cito_top_camera", 'CAMERA', 'TOP_ORTHO'),
+    ("Cito_iPhone_Camera", 'CAMERA', 'IPHONE'),
+    ("Cito_camera", 'CAMERA', 'SCALED'),
+    ("Cito_Target", 'TARGET', None),
+    ("Cito_Camera_Path", 'PATH', None),
+    ("Cito_Camera_Setup", 'SETUP', None),
+    ("Cito_Curve_Animation_Setup", 'SETUP', None),
+)
+
+def _legacy_role(id_data):
+    for prefix, role, kind in _LEGACY_ROLES:
+        if id_data.name.startswith(prefix):
+            if role == 'CAMERA' and getattr(id_data, "type", None) != 'CAMERA':
+                return None, None
+            if role == 'SETUP' and not isinstance(id_data, bpy.types.Collection):
+                return None, None
+            return role, kind
+    return None, None
+
+def cito_role(id_data):
+    if id_data is None:
+        return None
+    role = id_data.get("cito_role")
+    return role if role is not None else _legacy_role(id_data)[0]
+
+def cito_camera_kind(obj):
+    if obj is None:
+        return None
+    kind = obj.get("cito_camera_kind")
+    return kind if kind is not None else _legacy_role(obj)[1]
+
+class CitoIndex:
+    # Cito cameras, targets, paths and setups keyed by role, so panels and operators never scan
+    # bpy.data. Built once (lazily), then kept current incrementally: depsgraph updates add new or
+    # re-tagged datablocks, a msgbus subscription follows Follow Path targets (new paths), and deleted
+    # datablocks are dropped when bpy.data shrinks or on access. ID references do not survive undo or file loads, so those
+    # handlers mark the index for a rebuild. Sorted views are cached per role and kind, dropped when
+    # entries come or go, and re-sorted when a name in them changed.
+
+    def __init__(self):
+        self._entries = {role: {} for role in CITO_ROLES}
+        self._views = {}   # (role, kind) -> [(name, id_data)] sorted by name
+        self._valid = False
+        self._sizes = (0, 0)
+
+    def invalidate(self):
+        self._valid = False
+
+    def drop_views(self):
+        self._views.clear()
+
+    def rebuild(self):
+        for entries in self._entries.values():
+            entries.clear()
+        self._views.clear()
+        for obj in bpy.data.objects:
+            self.add(obj)
+        for collection in bpy.data.collections:
+            self.add(collection)
+        self._sizes = (len(bpy.data.objects), len(bpy.data.collections))
+        self._valid = True
+
+    def add(self, id_data, role=None):
+        role = role or cito_role(id_data)
+        if role not in self._entries:
+            return
+        key = id_data.as_pointer()
+        if key in self._entries[role]:
+            # Already indexed (depsgraph updates repeat for every edit); the views stay valid
+            self._entries[role][key] = id_data
+            return
+        for entries in self._entries.values():
+            entries.pop(key, None)
+        self._entries[role][key] = id_data
+        self._views.clear()
+
+    def prune(self):
+        # Drops datablocks removed since they were indexed
+        for entries in self._entries.values():
+            for key, id_data in list(entries.items()):
+                try:
+                    id_data.name
+                except ReferenceError:
+                    del entries[key]
+                    self._views.clear()
+
+    def _view_current(self, view):
+        try:
+            return all(id_data.name == name for name, id_data in view)
+        except ReferenceError:
+            return False
+
+    def items(self, role, kind=None):
+        if not self._valid:
+            self.rebuild()
+        view = self._views.get((role, kind))
+        if view is not None:
+            if self._view_current(view):
+                return [id_data for name, id_data in view]
+            # A rename or a removal since the view was sorted
+        entries = self._entries[role]
+        items = []
+        for key, id_data in list(entries.items()):
+            try:
+                if kind is None or cito_camera_kind(id_data) == kind:
+                    items.append((id_data.name, id_data))
+            except ReferenceError:
+                # Removed since it was indexed
+                del entries[key]
+        items.sort(key=lambda item: item[0])
+        self._views[(role, kind)] = items
+        return [id_data for name, id_data in items]
+
+    def count(self, role):
+        # Size of the checked view, so removals that bpy.data's size did not reveal are not counted
+        return len(self.items(role))
+
+    def on_depsgraph_update(self, depsgraph):
+        if not self._valid:
+            return
+        for update in depsgraph.updates:
+            id_data = getattr(update.id, "original", update.id)
+            if isinstance(id_data, (bpy.types.Object, bpy.types.Collection)) and cito_role(id_data) is not None:
+                self.add(id_data)
+        # Removals do not show up in depsgraph.updates; a shrinking bpy.data is the cue to prune
+        sizes = (len(bpy.data.objects), len(bpy.data.collections))
+        if sizes[0] < self._sizes[0] or sizes[1] < self._sizes[1]:
+            self.prune()
+        self._sizes = sizes
+
+cito_index = CitoIndex()
+
+def tag_cito(id_data, role, kind=None):
+    # Stores the role on the datablock and indexes it right away
+    id_data["cito_role"] = role
+    if kind is not None:
+        id_data["cito_camera_kind"] = kind
+    cito_index.add(id_data, role)
+    # The kind may have changed, which moves the datablock between the per-kind views
+    cito_index.drop_views()
+    return id_data
+
+def tag_follow_path(obj, constraint):
+    obj["cito_follow_path"] = constraint.name
+    if constraint.target is not None and cito_role(constraint.target) is None:
+        tag_cito(constraint.target, 'PATH')
+
+def follow_path_constraint(obj):
+    # O(1) through the stored constraint name; falls back to scanning the (short) constraint stack
+    name = obj.get("cito_follow_path")
+    constraint = obj.constraints.get(name) if name else None
+    if constraint is not None and constraint.type == 'FOLLOW_PATH':
+        return constraint
+    return next((constraint for constraint in obj.constraints if constraint.type == 'FOLLOW_PATH'), None)
+
+def tag_legacy_datablocks():
+    # Files from before roles were stored: write the roles once, where writing ID data is allowed
+    for id_data in list(bpy.data.objects) + list(bpy.data.collections):
+        if "cito_role" not in id_data:
+            role, kind = _legacy_role(id_data)
+            if role is not None:
+                tag_cito(id_data, role, kind)
+
+# Owner token for our msgbus subscriptions, so they can be cleared together
+_msgbus_owner = object()
+
+def _on_follow_path_target_changed():
+    # A curve just became (or stopped being) a path; cheap enough to re-read on next access
+    cito_index.invalidate()
+
+def subscribe_msgbus():
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.FollowPathConstraint, "target"),
+        owner=_msgbus_owner,
+        args=(),
+        notify=_on_follow_path_target_changed,
+    )
+
+@persistent
+def _on_load_post(*args):
+    # A different file means different datablocks; msgbus subscriptions are dropped on load too
+    name_registry.reset()
+    cito_index.invalidate()
+    tag_legacy_datablocks()
+    subscribe_msgbus()
+
+@persistent
+def _on_undo_redo(*args):
+    cito_index.invalidate()
+
+@persistent
+def _on_depsgraph_update_post(scene, depsgraph):
+    cito_index.on_depsgraph_update(depsgraph)
+
+_handlers = (
+    ("load_post", _on_load_post),
+    ("undo_post", _on_undo_redo),
+    ("redo_post", _on_undo_redo),
+    ("depsgraph_update_post", _on_depsgraph_update_post),
+)
+
+def register():
+    name_registry.reset()
+    cito_index.invalidate()
+    subscribe_msgbus()
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    if bpy.app.timers.is_registered(_apply_pending_camera_updates):
+        bpy.app.timers.unregister(_apply_pending_camera_updates)
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    name_registry.reset()
+    cito_index.invalidate()
+
+# Camera settings per station type, mirroring the single-camera operators
+CAMERA_STATION_TYPES = {
+    'SCALED': {"base_name": "Cito_camera", "z": 200.0, "tilt": 0.0, "ortho": False},
+    'SECTION_ORTHO': {"base_name": "Cito_section_camera", "z": 0.0, "tilt": 1.5708, "ortho": True},
+    'TOP_ORTHO': {"base_name": "Cito_top_camera", "z": 200.0, "tilt": 0.0, "ortho": True},
+    'IPHONE': {"base_name": "Cito_iPhone_Camera", "z": 5.0, "tilt": 1.5708, "ortho": False},
+}
+
+_STATION_TYPE_ALIASES = {
+    "SCALED": 'SCALED',
+    "CAMERA": 'SCALED',
+    "SECTION": 'SECTION_ORTHO',
+    "SECTION_ORTHO": 'SECTION_ORTHO',
+    "TOP": 'TOP_ORTHO',
+    "TOP_ORTHO": 'TOP_ORTHO',
+    "IPHONE": 'IPHONE',
+    "IPHONE_CAMERA": 'IPHONE',
+}
+
+def station_type(value):
+    key = str(value or "SCALED").strip().upper().replace("-", "_").replace(" ", "_")
+    if key not in _STATION_TYPE_ALIASES:
+        raise ValueError(f"Unknown camera station type '{value}'")
+    return _STATION_TYPE_ALIASES[key]
+
+def _station_rows(filepath):
+    if filepath.lower().endswith(".json"):
+        with open(filepath, encoding="utf-8") as stream:
+            data = json.load(stream)
+        yield from (data.get("stations", []) if isinstance(data, dict) else data)
+    else:
+        with open(filepath, newline="", encoding="utf-8") as stream:
+            yield from csv.DictReader(stream)
+
+def read_camera_stations(filepath):
+    # Yields one dict per station: x, y, z, heading (degrees around Z), type, and optional name/lens.
+    # CSV is read row by row; JSON may be a list of stations or {"stations": [...]}.
+    for row in _station_rows(bpy.path.abspath(filepath)):
+        row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+        kind = station_type(row.get("type"))
+        z = row.get("z")
+        lens = row.get("lens")
+        yield {
+            "x": float(row.get("x") or 0.0),
+            "y": float(row.get("y") or 0.0),
+            "z": float(z) if z not in (None, "") else CAMERA_STATION_TYPES[kind]["z"],
+            "heading": float(row.get("heading") or 0.0),
+            "type": kind,
+            "name": str(row.get("name") or "").strip() or None,
+            "lens": float(lens) if lens not in (None, "") else None,
+        }
+
+def create_camera_stations(stations, scene=None, collection=None, ortho_scale=50.0, iphone_lens=26.0):
+    # Builds camera objects straight through bpy.data (no bpy.ops, no view-layer update per camera),
+    # so it works in background mode and for thousands of stations at once.
+    scene = scene or bpy.context.scene
+    stations = list(stations)
+    if collection is None:
+        collection = bpy.data.collections.new(cito_unique_name("Cito_Camera_Stations", kind="collections"))
+        scene.collection.children.link(collection)
+
+    # Reserve a block of indices per base name so naming costs one probe per type, not per camera
+    counts = {}
+    for station in stations:
+        if station.get("name") is None:
+            base_name = CAMERA_STATION_TYPES[station["type"]]["base_name"]
+            counts[base_name] = counts.get(base_name, 0) + 1
+    next_index = {base_name: name_registry.next_block(base_name, count=count) for base_name, count in counts.items()}
+
+    objects = []
+    for station in stations:
+        settings = CAMERA_STATION_TYPES[station["type"]]
+        name = station.get("name")
+        if name is None:
+            name = f"{settings['base_name']}_{next_index[settings['base_name']]:03}"
+            next_index[settings['base_name']] += 1
+        else:
+            name_registry.note(name)
+
+        cam_data = bpy.data.cameras.new(name)
+        if settings["ortho"]:
+            cam_data.type = 'ORTHO'
+            cam_data.ortho_scale = ortho_scale
+        elif station["type"] == 'IPHONE':
+            cam_data.lens = iphone_lens
+        if station.get("lens") is not None:
+            cam_data.lens = station["lens"]
+
+        cam = bpy.data.objects.new(name, cam_data)
+        tag_cito(cam, 'CAMERA', station["type"])
+        cam.location = (station["x"], station["y"], station["z"])
+        cam.rotation_euler = (settings["tilt"], 0.0, math.radians(station["heading"]))
+        if station["type"] != 'IPHONE':
+            cam.scale = (100, 100, 100)
+        objects.append(cam)
+
+    # Link everything in one pass once all objects exist
+    link = collection.objects.link
+    for cam in objects:
+        link(cam)
+    return objects
+
+def create_curve_rig(curve_obj, scene=None, frame_start=1, frame_end=250):
+    # Camera riding curve_obj and looking at a target slightly ahead on the same path, in a new
+    # Cito_Curve_Animation_Setup_### collection. Built through bpy.data like the camera stations, so
+    # importers can call it once per track. Returns (collection, camera, target, follow_path).
+    scene = scene or bpy.context.scene
+    suffix = cito_unique_index("Cito_Curve_Animation_Setup", kind="collections")
+    collection = bpy.data.collections.new(f"Cito_Curve_Animation_Setup_{suffix:03}")
+    tag_cito(collection, 'SETUP')
+    scene.collection.children.link(collection)
+
+    camera_name = f"Cito_Animated_Curve_Camera_{suffix:03}"
+    camera = bpy.data.objects.new(camera_name, bpy.data.cameras.new(camera_name))
+    tag_cito(camera, 'CAMERA', 'ANIMATED')
+    target = bpy.data.objects.new(f"Cito_Target_Curve_{suffix:03}", None)
+    target.empty_display_type = 'PLAIN_AXES'
+    tag_cito(target, 'TARGET')
+    collection.objects.link(camera)
+    collection.objects.link(target)
+    name_registry.note(camera.name)
+    name_registry.note(target.name)
+
+    # The camera follows the curve orientation ...
+    follow_path = camera.constraints.new(type='FOLLOW_PATH')
+    follow_path.target = curve_obj
+    follow_path.use_curve_follow = True
+    follow_path.forward_axis = 'FORWARD_X'
+    follow_path.up_axis = 'UP_Y'
+    tag_follow_path(camera, follow_path)
+
+    # ... and tracks a target riding the same path slightly in front of it
+    target_constraint = target.constraints.new(type='FOLLOW_PATH')
+    target_constraint.target = curve_obj
+    target_constraint.use_curve_follow = True
+    target_constraint.offset = -0.1
+    tag_follow_path(target, target_constraint)
+
+    track_to = camera.constraints.new(type='TRACK_TO')
+    track_to.target = target
+    track_to.track_axis = 'TRACK_NEGATIVE_Z'
+    track_to.up_axis = 'UP_Y'
+
+    # One trip along the path over the frame range
+    curve_obj.data.path_duration = frame_end - frame_start + 1
+    follow_path.offset_factor = 0
+    follow_path.keyframe_insert(data_path="offset_factor", frame=frame_start)
+    follow_path.offset_factor = 1
+    follow_path.keyframe_insert(data_path="offset_factor", frame=frame_end)
+    return collection, camera, target, follow_path
+
+def sample_world_matrices(scene, objects, frames):
+    # Evaluates the scene once per frame and reads every object's world matrix from that single evaluation.
+    # Returns an array of shape (objects, frames, 4, 4).
+    frames = list(frames)
+    matrices = np.empty((len(objects), len(frames), 4, 4), dtype=np.float64)
+    frame_current = scene.frame_current
+    try:
+        for j, frame in enumerate(frames):
+            scene.frame_set(frame)
+            for i, obj in enumerate(objects):
+                matrices[i, j] = obj.matrix_world
+    finally:
+        scene.frame_set(frame_current)
+    return matrices
+
+def matrices_to_loc_euler(matrices):
+    # Vectorized matrix -> (location, XYZ euler) for an (n, 4, 4) stack, same convention as Blender's to_euler('XYZ').
+    # Angles are unwrapped along the stack so consecutive keys never jump by 2*pi.
+    location = matrices[:, :3, 3]
+    rotation = matrices[:, :3, :3] / np.linalg.norm(matrices[:, :3, :3], axis=1, keepdims=True)
+    cos_y = np.hypot(rotation[:, 0, 0], rotation[:, 1, 0])
+    euler = np.stack((
+        np.arctan2(rotation[:, 2, 1], rotation[:, 2, 2]),
+        np.arctan2(-rotation[:, 2, 0], cos_y),
+        np.arctan2(rotation[:, 1, 0], rotation[:, 0, 0]),
+    ), axis=1)
+    return location, np.unwrap(euler, axis=0)
+
+# Enum values of FCurve keyframe interpolation, for foreach_set
+KEYFRAME_INTERPOLATION = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+
+def write_fcurve_samples(action, data_path, index, frames, values, group="", interpolation='LINEAR'):
+    # Replaces the keys of one F-curve with (frame, value) samples in a single foreach_set call
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    else:
+        fcurve.keyframe_points.clear()
+
+    count = len(frames)
+    co = np.empty(count * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    fcurve.keyframe_points.add(count)
+    fcurve.keyframe_points.foreach_set("co", co)
+    fcurve.keyframe_points.foreach_set("interpolation", np.full(count, KEYFRAME_INTERPOLATION[interpolation], dtype=np.int32))
+    fcurve.update()
+    return fcurve
+
+def ensure_action(id_data, name=None):
+    if id_data.animation_data is None:
+        id_data.animation_data_create()
+    if id_data.animation_data.action is None:
+        id_data.animation_data.action = bpy.data.actions.new(name or f"{id_data.name}Action")
+    return id_data.animation_data.action
+
+# Action groups of the keys the add-on writes itself: the bake, and the path timing (offset factors
+# and the target's overshoot past the end of open paths)
+BAKE_GROUP = "Cito Bake"
+PATH_GROUP = "Cito Path"
+BAKE_PATHS = {"location", "rotation_euler"}
+
+def is_navigation_baked(obj):
+    return "cito_baked_constraints" in obj
+
+def _transform_fcurves(action, groups):
+    # Location/rotation curves in one of the groups (None stands for curves outside the add-on's groups)
+    def group(fc):
+        name = fc.group.name if fc.group is not None else None
+        return name if name in (BAKE_GROUP, PATH_GROUP) else None
+    return [fc for fc in action.fcurves if fc.data_path in BAKE_PATHS and group(fc) in groups]
+
+def _has_own_transform_keys(obj):
+    action = obj.animation_data.action if obj.animation_data else None
+    return action is not None and bool(_transform_fcurves(action, (None,)))
+
+def _keyframe_co(fcurve):
+    co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+    fcurve.keyframe_points.foreach_get("co", co)
+    return co
+
+def parent_relative_matrices(obj, world, parent_world):
+    # (frames, 4, 4) world matrices -> the matrices location/rotation keys must hold under the parent
+    if parent_world is None:
+        return world
+    return np.linalg.inv(parent_world @ np.array(obj.matrix_parent_inverse)) @ world
+
+def bake_navigation(scene, objects, frame_start=None, frame_end=None):
+    # Evaluates the constraint rig once over the frame range, writes dense location/rotation keys in bulk
+    # and mutes the constraints, so playback and renders no longer pay for constraint evaluation.
+    # Keys are relative to the object's parent. Objects whose location or rotation is keyed by hand
+    # are left live, since the bake would overwrite those keys; the add-on's own path keys are set
+    # aside and come back with unbake_navigation().
+    frame_start = scene.frame_start if frame_start is None else frame_start
+    frame_end = scene.frame_end if frame_end is None else frame_end
+    frames = np.arange(frame_start, frame_end + 1)
+    objects = [obj for obj in objects if not is_navigation_baked(obj) and not _has_own_transform_keys(obj)]
+    if not objects or len(frames) == 0:
+        return []
+
+    # Parents are sampled in the same pass
+    sampled = list(objects)
+    for obj in objects:
+        if obj.parent is not None and obj.parent not in sampled:
+            sampled.append(obj.parent)
+    matrices = sample_world_matrices(scene, sampled, frames)
+
+    for i, obj in enumerate(objects):
+        parent_world = matrices[sampled.index(obj.parent)] if obj.parent is not None else None
+        obj_matrices = parent_relative_matrices(obj, matrices[i], parent_world)
+        # Remember the live rig so it can be restored by unbake_navigation()
+        obj["cito_prebake_location"] = list(obj.location)
+        obj["cito_prebake_rotation"] = list(obj.rotation_euler)
+        obj["cito_prebake_rotation_mode"] = obj.rotation_mode
+        obj["cito_baked_constraints"] = [constraint.name for constraint in obj.constraints if not constraint.mute]
+
+        location, euler = matrices_to_loc_euler(obj_matrices)
+        action = ensure_action(obj)
+        path_curves = _transform_fcurves(action, (PATH_GROUP,))
+        obj["cito_prebake_path_keys"] = {f"{fc.data_path}:{fc.array_index}": _keyframe_co(fc).tolist() for fc in path_curves}
+        for fcurve in path_curves:
+            action.fcurves.remove(fcurve)
+        for index in range(3):
+            write_fcurve_samples(action, "location", index, frames, location[:, index], group=BAKE_GROUP)
+            write_fcurve_samples(action, "rotation_euler", index, frames, euler[:, index], group=BAKE_GROUP)
+
+        obj.rotation_mode = 'XYZ'
+        for constraint in obj.constraints:
+            constraint.mute = True
+    return objects
+
+def unbake_navigation(objects):
+    restored = []
+    for obj in objects:
+        if not is_navigation_baked(obj):
+            continue
+        action = obj.animation_data.action if obj.animation_data else None
+        if action is not None:
+            for fcurve in _transform_fcurves(action, (BAKE_GROUP,)):
+                action.fcurves.remove(fcurve)
+            for key, co in obj.get("cito_prebake_path_keys", {}).items():
+                data_path, index = key.rsplit(":", 1)
+                co = np.array(list(co), dtype=np.float64)
+                write_fcurve_samples(action, data_path, int(index), co[0::2], co[1::2], group=PATH_GROUP)
+
+        for name in obj["cito_baked_constraints"]:
+            constraint = obj.constraints.get(name)
+            if constraint is not None:
+                constraint.mute = False
+
+        obj.rotation_mode = obj["cito_prebake_rotation_mode"]
+        obj.location = obj["cito_prebake_location"]
+        obj.rotation_euler = obj["cito_prebake_rotation"]
+        for key in ("cito_baked_constraints", "cito_prebake_location", "cito_prebake_rotation", "cito_prebake_rotation_mode",
+                    "cito_prebake_path_keys"):
+            if key in obj:
+                del obj[key]
+        restored.append(obj)
+    return restored
+
+def navigation_rig_objects(objects):
+    # The cameras plus any Track To targets that are themselves driven by constraints (e.g. a target on the path)
+    rig = []
+    for obj in objects:
+        if obj.constraints and obj not in rig:
+            rig.append(obj)
+        for constraint in obj.constraints:
+            target = getattr(constraint, "target", None)
+            if constraint.type == 'TRACK_TO' and target is not None and target.constraints and target not in rig:
+                rig.append(target)
+    return rig
+
+# Collections created by the animation setup operators
+CITO_SETUP_PREFIXES = ("Cito_Camera_Setup_", "Cito_Curve_Animation_Setup_")
+
+def find_cito_setups():
+    # (collection, camera) for every Cito animation setup in the file
+    setups = []
+    for collection in cito_index.items('SETUP'):
+        if collection.name.startswith(CITO_SETUP_PREFIXES):
+            camera = next((obj for obj in collection.objects if obj.type == 'CAMERA'), None)
+            if camera is not None:
+                setups.append((collection, camera))
+    return setups
+
+def split_frame_range(frame_start, frame_end, chunk_size):
+    # [(start, end), ...] inclusive chunks; chunk_size <= 0 keeps the range whole
+    if chunk_size <= 0:
+        return [(frame_start, frame_end)]
+    return [(start, min(start + chunk_size - 1, frame_end)) for start in range(frame_start, frame_end + 1, chunk_size)]
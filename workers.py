@@ -0,0 +1,86 @@
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bpy
+
+# Worker processes are background Blender instances (`blender -b`). They report back to the
+# coordinator with one JSON object per stdout line, prefixed so ordinary Blender output is ignored.
+PROGRESS_PREFIX = "CITO_PROGRESS "
+
+def emit(event, **payload):
+    payload["event"] = event
+    sys.stdout.write(PROGRESS_PREFIX + json.dumps(payload) + "\n")
+    sys.stdout.flush()
+
+def script_args(argv=None):
+    # Blender passes everything after "--" through to the script
+    argv = sys.argv if argv is None else argv
+    return argv[argv.index("--") + 1:] if "--" in argv else []
+
+def blender_command(module, args, blendfile=None, factory_startup=False):
+    # Command line that runs `<this add-on>.<module>.main()` in a background Blender.
+    # factory_startup skips user preferences and add-ons, for workers that only crunch arrays.
+    command = [bpy.app.binary_path, "-b"]
+    if factory_startup:
+        command.append("--factory-startup")
+    if blendfile:
+        command.append(blendfile)
+    # The add-on's parent folder goes on sys.path, so workers import it even when it is not enabled
+    addon_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command += [
+        "--python-expr", f"import sys; sys.path.insert(0, {addon_parent!r}); import {__package__}.{module} as module; module.main()",
+        "--", *[str(arg) for arg in args],
+    ]
+    return command
+
+@contextlib.contextmanager
+def work_directory(prefix):
+    # Temporary folder for the files handed to workers, removed once they are done
+    directory = tempfile.mkdtemp(prefix=prefix)
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+@contextlib.contextmanager
+def blend_copy(prefix):
+    # Workers open a copy of the current state, so unsaved edits are part of their work too. The copy
+    # is a full scene, so it is deleted when the with-block ends.
+    with work_directory(prefix) as directory:
+        blendfile = os.path.join(directory, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blendfile, copy=True)
+        yield blendfile
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def _run_one(command, job, on_event, lock):
+    events = []
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        if not line.startswith(PROGRESS_PREFIX):
+            continue
+        try:
+            event = json.loads(line[len(PROGRESS_PREFIX):])
+        except ValueError:
+            continue
+        events.append(event)
+        if on_event is not None:
+            with lock:
+                on_event(job, event)
+    return {"job": job, "returncode": process.wait(), "events": events}
+
+def run_workers(jobs, max_workers=None, on_event=None):
+    # jobs: list of (command, job) pairs. Runs at most max_workers processes at a time;
+    # on_event(job, event) is called for every progress line, serialized by a lock so the
+    # caller can aggregate progress in one place.
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max_workers or default_worker_count()) as pool:
+        futures = [pool.submit(_run_one, command, job, on_event, lock) for command, job in jobs]
+        return [future.result() for future in futures]